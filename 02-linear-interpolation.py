@@ -44,8 +44,7 @@ For matrices, the function should return the lerp between two matrices.
 """
 
 from typing import Union
-from math import fma
-from lib import Vector, Matrix
+from lib import Vector, Matrix, fma_for
 
 
 Scalar = Union[float, int, complex]
@@ -61,8 +60,9 @@ def lerp(
     Uses the formula: f(u, v, t) = u + t * (v - u).
     """
     # For scalars
-    if isinstance(u, (float, int)) and isinstance(v, (float, int)):
-        # Using fused multiply-add
+    if isinstance(u, Scalar) and isinstance(v, Scalar):
+        # Using fused multiply-add (plain multiply-add for complex numbers)
+        fma = fma_for([u, v, t])
         return fma(t, v - u, u)  # (t * (v - u)) + u
 
     # For vectors
@@ -72,6 +72,7 @@ def lerp(
             raise ValueError("Vectors must have the same size.")
 
         # Linear interpolation between vectors using FMA
+        fma = fma_for(u.values, v.values, [t])
         return Vector([fma(t, v[i] - u[i], u[i]) for i in range(u.size())])
 
     # For matrices
@@ -80,6 +81,7 @@ def lerp(
         if u.shape() != v.shape():
             raise ValueError("Matrices must have the same shape.")
         rows, cols = u.shape()
+        fma = fma_for(u.values, v.values, [t])
         # Linear interpolation between matrices
         for i in range(rows):
             for j in range(cols):
@@ -112,6 +114,12 @@ def test_lerp():
     )
     assert res == Matrix([[11.0, 5.5], [16.5, 22.0]])
 
+    res = lerp(1 + 2j, 3 + 6j, 0.5)
+    assert res == 2 + 4j
+
+    res = lerp(Vector([0j, 2.0]), Vector([2j, 4.0]), 0.5)
+    assert res == Vector([1j, 3.0])
+
 
 def main():
     try:
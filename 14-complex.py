@@ -0,0 +1,127 @@
+"""
+                Complex Vector Spaces
+
+Every operation seen so far also works when the scalars are complex
+numbers z = a + bi instead of real numbers.
+
+Two things change compared to real vector spaces:
+
+    1. The dot product becomes the Hermitian (inner) product:
+        <u, v> = conj(u1) * v1 + conj(u2) * v2 + ... + conj(un) * vn
+
+       Conjugating the first vector makes <u, u> a real, positive number:
+        <u, u> = |u1|^2 + |u2|^2 + ... + |un|^2
+
+    2. The transpose becomes the conjugate transpose (Hermitian adjoint):
+        A^H = conj(A)^T
+
+       A matrix equal to its own conjugate transpose (A = A^H)
+       is called Hermitian, the complex equivalent of a symmetric matrix.
+
+Norms:
+    |z| = sqrt(a^2 + b^2) is the modulus of z = a + bi,
+    so norms always return real numbers, even for complex-valued vectors.
+
+            FMA and complex numbers
+
+math.fma only accepts real numbers. lib.fma_for() picks the kernel
+once per operation: math.fma for real data, a plain multiply-add
+as soon as one operand is complex.
+"""
+
+import cmath
+import lib
+from lib import Matrix, Vector
+
+
+def same_det(det, expected) -> bool:
+    if lib.get_backend() == "numpy":
+        return cmath.isclose(det, expected, rel_tol=1e-12, abs_tol=1e-12)
+    return det == expected
+
+
+def test_complex_dot():
+    print("--- Hermitian dot product ---")
+    u = Vector([1 + 1j, 2 - 1j])
+    v = Vector([3j, 1 + 0j])
+    # conj(1 + i) * 3i + conj(2 - i) * 1 = (3 + 3i) + (2 + i)
+    assert u.dot(v) == 5 + 4j
+    # <u, u> is real: |1 + i|^2 + |2 - i|^2 = 2 + 5
+    assert u.dot(u) == 7
+
+    # Real vectors keep the usual dot product
+    assert Vector([1, 2, 3]).dot(Vector([4, 5, 6])) == 32
+
+
+def test_complex_norms():
+    print("--- Complex norms ---")
+    u = Vector([3 + 4j, 0j])
+    assert u.norm() == 5.0
+    assert u.norm_1() == 5.0
+    assert u.norm_inf() == 5.0
+
+    u = Vector([1j, 1 + 0j, -1j])
+    assert u.norm_1() == 3.0
+    assert abs(u.norm() - 3 ** 0.5) < 1e-12
+    assert isinstance(u.norm(), float)
+
+
+def test_conj_transpose():
+    print("--- Conjugate transpose ---")
+    A = Matrix([[1 + 1j, 2],
+                [3j, 4 - 2j]])
+    assert A.conj_transpose() == Matrix([[1 - 1j, -3j],
+                                         [2, 4 + 2j]])
+    # Same as the transpose for real matrices
+    A = Matrix([[1, 2, 3],
+                [4, 5, 6]])
+    assert A.conj_transpose() == A.transpose()
+
+
+def test_complex_mul():
+    print("--- Complex multiplication ---")
+    A = Matrix([[1j, 0],
+                [0, 1j]])
+    assert A.mul_vec(Vector([1, 2])) == Vector([1j, 2j])
+    assert A.mul_mat(A) == Matrix([[-1, 0],
+                                   [0, -1]])
+
+
+def test_complex_elimination():
+    print("--- Complex determinant / inverse / rank ---")
+    A = Matrix([[1j, 2],
+                [1, 1j]])
+    # i * i - 2 * 1
+    assert same_det(A.determinant(), -3)
+
+    A = Matrix([[2j, 0, 0],
+                [0, 1, 1j],
+                [0, 1j, 2]])
+    # 2i * (1 * 2 - i * i) = 2i * 3
+    assert abs(A.determinant() - 6j) < 1e-12
+    ID = A.identity_matrix(3)
+    assert A.mul_mat(A.inverse()) == ID
+
+    A = Matrix([[1j, 2j],
+                [1, 2],
+                [1 + 1j, 2 + 2j]])
+    assert A.rank() == 1
+    A = Matrix([[1j, 1],
+                [1, 1j]])
+    assert A.rank() == 2
+
+
+def main():
+    try:
+        test_complex_dot()
+        test_complex_norms()
+        test_conj_transpose()
+        test_complex_mul()
+        test_complex_elimination()
+        print("All tests passed.")
+    except AssertionError:
+        print("Some tests failed.")
+
+
+if __name__ == "__main__":
+    main()
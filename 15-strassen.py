@@ -0,0 +1,148 @@
+"""
+                Strassen Matrix Multiplication
+
+The classic product of two n x n matrices computes n^2 dot products
+of length n: O(n^3) multiplications.
+
+Strassen (and its Winograd variant) splits each matrix in 4 blocks:
+
+    A = | A11 A12 |    B = | B11 B12 |
+        | A21 A22 |        | B21 B22 |
+
+and computes the 4 blocks of C = A ⋅ B with only 7 block products
+instead of 8, at the cost of more block additions:
+
+    S1 = A21 + A22    T1 = B12 - B11
+    S2 = S1 - A11     T2 = B22 - T1
+    S3 = A11 - A21    T3 = B22 - B12
+    S4 = A12 - S2     T4 = T2 - B21
+
+    P1 = A11 B11    P2 = A12 B21    P3 = S4 B22    P4 = A22 T4
+    P5 = S1 T1      P6 = S2 T2      P7 = S3 T3
+
+    C11 = P1 + P2             C12 = P1 + P6 + P5 + P3
+    C21 = P1 + P6 + P7 - P4   C22 = P1 + P6 + P7 + P5
+
+Applied recursively this gives O(n^log2(7)) ≈ O(n^2.807).
+
+In practice:
+    - Odd sizes are padded with a zero row and column.
+    - Small blocks are faster with the classic kernel, so the recursion
+      stops below a cutoff (lib.STRASSEN_CUTOFF).
+    - The extra additions make the rounding error a bit larger than
+      the classic kernel for float inputs.
+
+    A.mul_mat(B, mode="strassen")
+    A.mul_mat(B, mode="strassen", cutoff=32)
+
+Run `python3 15-strassen.py --bench` to find the crossover size and
+compare the accuracy with the classic kernel.
+"""
+
+import random
+import sys
+import time
+from lib import Matrix
+
+
+def random_matrix(rows: int, cols: int) -> Matrix:
+    return Matrix([
+        [random.uniform(-1.0, 1.0) for _ in range(cols)]
+        for _ in range(rows)
+    ])
+
+
+def max_error(A: Matrix, B: Matrix) -> float:
+    return max(
+        abs(x - y)
+        for ra, rb in zip(A.values, B.values)
+        for x, y in zip(ra, rb)
+    )
+
+
+def test_strassen():
+    print("--- Strassen multiplication ---")
+    A = Matrix([[1, 2],
+                [3, 4]])
+    B = Matrix([[5, 6],
+                [7, 8]])
+    assert A.mul_mat(B, mode="strassen", cutoff=1) == \
+        Matrix([[19.0, 22.0], [43.0, 50.0]])
+
+    # Odd sizes are padded at every level of the recursion
+    for n in (3, 5, 7, 12):
+        A = random_matrix(n, n)
+        B = random_matrix(n, n)
+        assert A.mul_mat(B, mode="strassen", cutoff=1) == A.mul_mat(B)
+        assert A.mul_mat(B, mode="strassen", cutoff=2) == A.mul_mat(B)
+
+    # Complex data goes through the same recursion
+    A = Matrix([[1j, 2], [3, 4j]])
+    assert A.mul_mat(A, mode="strassen", cutoff=1) == A.mul_mat(A)
+
+    # Non-square products use the classic kernel
+    A = Matrix([[1, 2, 3],
+                [4, 5, 6]])
+    B = Matrix([[1, 0],
+                [0, 1],
+                [1, 1]])
+    assert A.mul_mat(B, mode="strassen") == Matrix([[4, 5], [10, 11]])
+
+    try:
+        A.mul_mat(B, mode="unknown")
+        assert False
+    except ValueError:
+        pass
+
+
+def bench_crossover(
+    sizes=(32, 64, 128, 192, 256),
+    cutoffs=(16, 32, 64, 128),
+):
+    """Time classic vs Strassen for several sizes and cutoffs."""
+    print("--- Crossover (seconds) ---")
+    print(f"{'n':>5} {'classic':>9} " +
+          " ".join(f"{'cut=' + str(c):>9}" for c in cutoffs))
+    for n in sizes:
+        A = random_matrix(n, n)
+        B = random_matrix(n, n)
+        start = time.perf_counter()
+        A.mul_mat(B)
+        classic = time.perf_counter() - start
+        timings = []
+        for cutoff in cutoffs:
+            start = time.perf_counter()
+            A.mul_mat(B, mode="strassen", cutoff=cutoff)
+            timings.append(time.perf_counter() - start)
+        best = cutoffs[timings.index(min(timings))]
+        print(f"{n:>5} {classic:>9.3f} " +
+              " ".join(f"{t:>9.3f}" for t in timings) +
+              f"   best cutoff={best}" +
+              ("  <- strassen wins" if min(timings) < classic else ""))
+
+
+def bench_accuracy(sizes=(64, 128, 256), cutoff=16):
+    """Max absolute difference between Strassen and classic results."""
+    print("--- Accuracy vs classic kernel ---")
+    for n in sizes:
+        A = random_matrix(n, n)
+        B = random_matrix(n, n)
+        err = max_error(A.mul_mat(B, mode="strassen", cutoff=cutoff),
+                        A.mul_mat(B))
+        print(f"n={n:>4} cutoff={cutoff:>3} max |error| = {err:.3e}")
+
+
+def main():
+    try:
+        test_strassen()
+        print("All tests passed.")
+    except AssertionError:
+        print("Some tests failed.")
+
+    if "--bench" in sys.argv:
+        bench_crossover()
+        bench_accuracy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+                Matrix Power
+
+A^k is A multiplied by itself k times. Instead of k - 1 products,
+repeated squaring only needs O(log k) of them:
+
+    A^13 = A^8 ⋅ A^4 ⋅ A^1          (13 = 0b1101)
+
+    A^1 -> A^2 -> A^4 -> A^8       square at every step
+    keep the squares whose bit is set in k
+
+By convention A^0 = In, and A^-k = (A^-1)^k.
+
+Use cases:
+    - Applying the same linear map k times (rotations, Markov chains).
+    - Fibonacci numbers: [[1, 1], [1, 0]]^n = [[F(n+1), F(n)], [F(n), F(n-1)]]
+
+                Chained Products
+
+Matrix multiplication is associative, (A⋅B)⋅C = A⋅(B⋅C), but the cost
+is not. Multiplying an m x n matrix by an n x p matrix costs m⋅n⋅p
+multiplications:
+
+    A: 10 x 100    B: 100 x 5    C: 5 x 50
+
+    (A⋅B)⋅C = 10⋅100⋅5 + 10⋅5⋅50   =  7 500
+    A⋅(B⋅C) = 100⋅5⋅50 + 10⋅100⋅50 = 75 000
+
+multi_dot([A, B, C, ...]) finds the cheapest parenthesisation with
+dynamic programming over the operand shapes (the "matrix chain" problem),
+then multiplies in that order.
+
+Run `python3 16-matrix-power.py --bench` to compare with naive evaluation.
+"""
+
+import random
+import sys
+import time
+from fractions import Fraction
+from lib import Matrix, multi_dot
+
+
+def random_matrix(rows: int, cols: int) -> Matrix:
+    return Matrix([
+        [random.uniform(-1.0, 1.0) for _ in range(cols)]
+        for _ in range(rows)
+    ])
+
+
+def test_pow():
+    print("--- Matrix power ---")
+    F = Matrix([[1, 1],
+                [1, 0]])
+    assert F.pow(10) == Matrix([[89, 55], [55, 34]])
+    assert F.pow(1) == F
+    assert F.pow(0) == Matrix([[1, 0], [0, 1]])
+    # The original matrix is left untouched
+    assert F == Matrix([[1, 1], [1, 0]])
+
+    A = Matrix([[2., 0.],
+                [0., 2.]])
+    assert A.pow(-2) == Matrix([[0.25, 0.0], [0.0, 0.25]])
+    # A^0 has the element type and the dtype of A
+    assert A.pow(0).values == [[1., 0.], [0., 1.]]
+    assert all(type(x) is float for row in A.pow(0).values for x in row)
+    assert type(Matrix([[2j]]).pow(0)[0, 0]) is complex
+    assert type(Matrix([[Fraction(1, 3)]]).pow(0)[0, 0]) is Fraction
+    for dtype in ("float32", "int32"):
+        T = Matrix([[1, 1], [1, 0]], dtype=dtype)
+        for k in (0, 1, 10):
+            P = T.pow(k)
+            assert P.dtype == dtype and P == F.pow(k)
+            assert P.values[0].typecode == T.values[0].typecode
+
+    A = random_matrix(4, 4)
+    naive = A
+    for _ in range(6):
+        naive = naive.mul_mat(A)
+    assert A.pow(7) == naive
+
+    try:
+        Matrix([[1, 2, 3]]).pow(2)
+        assert False
+    except ValueError:
+        pass
+
+
+def test_multi_dot():
+    print("--- Chained products ---")
+    A = random_matrix(10, 30)
+    B = random_matrix(30, 5)
+    C = random_matrix(5, 60)
+    D = random_matrix(60, 2)
+    assert multi_dot([A, B, C, D]) == \
+        A.mul_mat(B).mul_mat(C).mul_mat(D)
+    assert multi_dot([A, B]) == A.mul_mat(B)
+    assert multi_dot([A]) == A
+
+    try:
+        multi_dot([A, C])
+        assert False
+    except ValueError:
+        pass
+
+
+def bench():
+    print("--- A^k: repeated product vs pow ---")
+    A = random_matrix(40, 40)
+    for k in (8, 32, 100):
+        start = time.perf_counter()
+        naive = A
+        for _ in range(k - 1):
+            naive = naive.mul_mat(A)
+        t_naive = time.perf_counter() - start
+        start = time.perf_counter()
+        A.pow(k)
+        t_pow = time.perf_counter() - start
+        print(f"k={k:>4} naive={t_naive:.3f}s pow={t_pow:.3f}s")
+
+    print("--- A.B.C.D: left to right vs multi_dot ---")
+    ops = [random_matrix(120, 10), random_matrix(10, 150),
+           random_matrix(150, 8), random_matrix(8, 100)]
+    start = time.perf_counter()
+    res = ops[0]
+    for op in ops[1:]:
+        res = res.mul_mat(op)
+    t_naive = time.perf_counter() - start
+    start = time.perf_counter()
+    multi_dot(ops)
+    t_chain = time.perf_counter() - start
+    print(f"left to right={t_naive:.3f}s multi_dot={t_chain:.3f}s")
+
+
+def main():
+    try:
+        test_pow()
+        test_multi_dot()
+        print("All tests passed.")
+    except AssertionError:
+        print("Some tests failed.")
+
+    if "--bench" in sys.argv:
+        bench()
+
+
+if __name__ == "__main__":
+    main()
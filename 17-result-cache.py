@@ -0,0 +1,128 @@
+"""
+                Memoized determinant / inverse / rank
+
+determinant() (cofactor expansion, O(n!)), inverse() and rank()
+(Gaussian elimination, O(n^3)) recompute everything on every call.
+When the same matrices are queried again and again, the results can be
+remembered instead.
+
+    lib.enable_result_cache(maxsize=256)   opt-in, off by default
+    lib.result_cache_info()                CacheInfo(hits, misses, ...)
+    lib.disable_result_cache()
+
+How it works:
+    - The key is the operation name and the content of the matrix
+      (values and their types, backend, dtype), so two matrices
+      holding the same values share their results, while an int
+      matrix and its float twin do not.
+    - LRU (Least Recently Used): when the cache is full, the entry
+      that was not used for the longest time is evicted.
+    - Invalidation: the key is rebuilt from the values on every call
+      (O(n^2)), so any mutation, m[y, x] = v, m[y][x] = v, add, sub
+      or scl, looks up (or computes) the result for the new values.
+"""
+
+import math
+import sys
+import time
+import lib
+from lib import (
+    Matrix,
+    disable_result_cache,
+    enable_result_cache,
+    result_cache_info,
+)
+
+
+def same_det(det, expected) -> bool:
+    if lib.get_backend() == "numpy":
+        return math.isclose(det, expected, rel_tol=1e-12, abs_tol=1e-12)
+    return det == expected
+
+
+def test_result_cache():
+    print("--- Result cache ---")
+    disable_result_cache()
+    A = Matrix([[8., 5., -2.],
+                [4., 7., 20.],
+                [7., 6., 1.]])
+    assert same_det(A.determinant(), -174.0)
+    assert result_cache_info().hits == 0
+
+    enable_result_cache(maxsize=2)
+    assert same_det(A.determinant(), -174.0)
+    assert same_det(A.determinant(), -174.0)
+    info = result_cache_info()
+    assert info.hits == 1 and info.misses == 1 and info.currsize == 1
+
+    # Same content, different object: served from the cache
+    B = Matrix([row[:] for row in A.values])
+    assert same_det(B.determinant(), -174.0)
+    assert result_cache_info().hits == 2
+
+    # Cached inverses cannot be modified by the caller
+    inv = A.inverse()
+    inv.scl(0)
+    assert A.inverse() == Matrix([
+        [0.649425287, 0.097701149, -0.655172414],
+        [-0.781609195, -0.126436782, 0.965517241],
+        [0.143678160, 0.0747126436, -0.2068965517],
+    ])
+
+    # Mutations invalidate the key
+    A[0, 0] = 0.
+    # -174 - 8 * (7 * 1 - 20 * 6)
+    assert same_det(A.determinant(), 730.)
+    A.scl(2)
+    assert same_det(A.determinant(), 8 * 730.)
+    A.sub(A)
+    assert A.rank() == 0
+
+    # Writes through the row lists are seen too
+    C = Matrix([[1., 2.], [3., 4.]])
+    assert same_det(C.determinant(), -2.)
+    C[0][0] = 10.
+    assert same_det(C.determinant(), 34.)
+    C.values[0][0] = 1.
+    assert same_det(C.determinant(), -2.)
+
+    # An int matrix does not get the result of its float twin
+    exact = Matrix([[1, 2], [3, 4]]).determinant()
+    assert exact == -2 and isinstance(exact, int)
+    assert isinstance(Matrix([[1., 2.], [3., 4.]]).determinant(), float)
+
+    # LRU eviction keeps at most maxsize entries
+    assert result_cache_info().currsize == 2
+    assert Matrix([[1.]], "python").content_key() != \
+        Matrix([[1.]], "python", "float32").content_key()
+    disable_result_cache()
+
+
+def bench():
+    print("--- determinant() of the same 7x7 matrix, 20 calls ---")
+    A = Matrix([[float((i * 7 + j * 3) % 11) for j in range(7)]
+                for i in range(7)])
+    for label in ("no cache", "cache"):
+        if label == "cache":
+            enable_result_cache()
+        start = time.perf_counter()
+        for _ in range(20):
+            A.determinant()
+        print(f"{label:>8}: {time.perf_counter() - start:.3f}s")
+    print(result_cache_info())
+    disable_result_cache()
+
+
+def main():
+    try:
+        test_result_cache()
+        print("All tests passed.")
+    except AssertionError:
+        print("Some tests failed.")
+
+    if "--bench" in sys.argv:
+        bench()
+
+
+if __name__ == "__main__":
+    main()
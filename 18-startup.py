@@ -0,0 +1,117 @@
+"""
+                Import time and lazy backends
+
+Short-lived scripts pay the import time of lib.py on every run.
+Importing NumPy, multiprocessing, mmap or sockets at the top of lib.py
+would make every one of them slower, even the ones that only need
+Vector.dot.
+
+Layout:
+    lib.py          core Vector / Matrix, standard library only
+    matrix/         optional backends, one submodule each
+
+lib.py lists the names provided by the backends in _LAZY_ATTRS.
+A module level __getattr__ (PEP 562) imports the backend the first time
+one of those names is used:
+
+    import lib                       fast, no backend imported
+    lib.module_available("numpy")    imports matrix._optional now
+
+Measuring:
+    python3 -X importtime -c "import lib"
+
+prints, for every imported module, its own and cumulative import time
+in microseconds. IMPORT_BUDGET_US is the budget enforced by the tests.
+"""
+
+import os
+import subprocess
+import sys
+import lib
+
+# Cumulative import time allowed for `import lib`, in microseconds
+IMPORT_BUDGET_US = 20_000
+
+# Modules that must only be loaded by the backends that need them
+HEAVY_MODULES = (
+    "numpy",
+    "multiprocessing",
+    "mmap",
+    "asyncio",
+    "socket",
+    "concurrent.futures",
+    "matrix",
+)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_python(*args: str) -> subprocess.CompletedProcess:
+    """Run a fresh interpreter in the repository directory."""
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=HERE, capture_output=True, text=True, check=True,
+    )
+
+
+def lib_import_time_us() -> int:
+    """Cumulative import time of lib, as reported by -X importtime."""
+    best = None
+    # Keep the best of a few runs to ignore a noisy machine
+    for _ in range(5):
+        stderr = run_python("-X", "importtime", "-c", "import lib").stderr
+        for line in stderr.splitlines():
+            fields = [f.strip() for f in line.split("|")]
+            if len(fields) == 3 and fields[2] == "lib":
+                cumulative = int(fields[1])
+                best = cumulative if best is None else min(best, cumulative)
+    return best
+
+
+def test_no_heavy_import():
+    print("--- import lib loads no backend ---")
+    code = (
+        "import sys, lib\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    assert run_python("-c", code).stdout.strip() == ""
+
+
+def test_lazy_attribute():
+    print("--- backends load on first use ---")
+    code = (
+        "import sys, lib\n"
+        "assert 'matrix._optional' not in sys.modules\n"
+        "assert lib.module_available('sys')\n"
+        "assert 'matrix._optional' in sys.modules\n"
+        "from lib import module_available\n"
+        "assert not module_available('no_such_module_xyz')\n"
+    )
+    run_python("-c", code)
+
+    try:
+        lib.no_such_name
+        assert False
+    except AttributeError:
+        pass
+
+
+def test_import_budget():
+    print("--- import time budget ---")
+    us = lib_import_time_us()
+    print(f"import lib: {us} us (budget {IMPORT_BUDGET_US} us)")
+    assert us is not None and us <= IMPORT_BUDGET_US
+
+
+def main():
+    try:
+        test_no_heavy_import()
+        test_lazy_attribute()
+        test_import_budget()
+        print("All tests passed.")
+    except (AssertionError, subprocess.CalledProcessError):
+        print("Some tests failed.")
+
+
+if __name__ == "__main__":
+    main()
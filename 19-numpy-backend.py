@@ -0,0 +1,203 @@
+"""
+                NumPy backend
+
+Every Vector / Matrix operation of lib.py is a pure-Python loop.
+NumPy stores numbers in a contiguous C array (ndarray) and runs
+vectorised, compiled kernels (BLAS / LAPACK) over the whole array.
+
+When NumPy is installed, these methods are dispatched to
+matrix/numpy_backend.py:
+
+    dot, norm_1, norm, norm_inf                              (Vector)
+    mul_vec, mul_mat, transpose, determinant, inverse, rank,
+    solve, cholesky, gram                                    (Matrix)
+    pairwise, pairwise_blocks                                (functions)
+
+Selecting the backend:
+
+    lib.set_backend("auto")     default: NumPy for objects of at least
+                                lib.NUMPY_MIN_SIZE elements, if installed
+    lib.set_backend("numpy")    always NumPy
+    lib.set_backend("python")   always pure Python
+    Matrix(values, backend="numpy")   per object
+
+The pure-Python kernels stay the fallback when NumPy is missing.
+
+Numerical differences:
+    NumPy computes the determinant with an LU factorisation (O(n^3))
+    instead of the cofactor expansion (O(n!)), and the rank from the
+    singular values. Results can differ in the last bits: the scripts
+    compare determinants with a relative tolerance of 1e-12 on the
+    NumPy backend. Integer matrices keep the exact Bareiss
+    determinant and rank on both backends.
+
+Running this file runs every test_* function of the numbered scripts
+once per backend (parity suite). `--bench` prints the speedups.
+"""
+
+import contextlib
+import glob
+import importlib.util
+import io
+import os
+import random
+import sys
+import time
+import lib
+from lib import Matrix, Vector
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def load_script(path: str):
+    """Import a numbered script (its name is not a valid module name)."""
+    name = "script_" + os.path.basename(path)[:-3].replace("-", "_")
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def collect_tests():
+    """Return (script name, test name, function) for every test_*."""
+    tests = []
+    for path in sorted(glob.glob(os.path.join(HERE, "[0-9][0-9]-*.py"))):
+        if os.path.basename(path) == os.path.basename(__file__):
+            continue
+        module = load_script(path)
+        for name in dir(module):
+            if name.startswith("test_") and callable(getattr(module, name)):
+                tests.append((os.path.basename(path), name,
+                              getattr(module, name)))
+    return tests
+
+
+def run_parity(backends=("python", "numpy")):
+    """Run every test once per backend, return the failures."""
+    failures = []
+    tests = collect_tests()
+    for backend in backends:
+        lib.set_backend(backend)
+        passed = 0
+        for script, name, func in tests:
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    func()
+                ok = True
+            except Exception:
+                ok = False
+            finally:
+                lib.disable_result_cache()
+            if ok:
+                passed += 1
+            else:
+                failures.append((backend, script, name))
+        print(f"{backend:>6}: {passed}/{len(tests)} tests passed")
+    lib.set_backend("auto")
+    return failures
+
+
+def test_backend_selection():
+    print("--- Backend selection ---")
+    assert lib.get_backend() == "auto"
+    try:
+        lib.set_backend("fortran")
+        assert False
+    except ValueError:
+        pass
+
+    # Per object backend, results keep it
+    A = Matrix([[1., 2.], [3., 4.]], backend="numpy")
+    B = A.mul_mat(A)
+    assert B.backend == "numpy"
+    assert B == Matrix([[7., 10.], [15., 22.]])
+    assert isinstance(B.values, list)
+
+    # Mutations drop the cached ndarray
+    A[0, 0] = 0.
+    assert A.determinant() == -6.
+    v = Vector([3., 4.], backend="numpy")
+    assert v.norm() == 5.
+    v.scl(2)
+    assert v.norm() == 10.
+
+    # "auto" only switches for large enough objects
+    v = Vector([1.] * lib.NUMPY_MIN_SIZE)
+    assert v.dot(v) == lib.NUMPY_MIN_SIZE
+    assert v._array is not None
+    v = Vector([1., 2.])
+    assert v.dot(v) == 5.
+    assert v._array is None
+
+    try:
+        Matrix([[1., 2.], [2., 4.]], backend="numpy").inverse()
+        assert False
+    except ValueError:
+        pass
+
+
+def test_parity():
+    print("--- Parity suite ---")
+    failures = run_parity()
+    for failure in failures:
+        print("failed:", *failure)
+    assert not failures
+
+
+def random_matrix(n: int, backend: str) -> Matrix:
+    return Matrix([[random.uniform(-1., 1.) for _ in range(n)]
+                   for _ in range(n)], backend)
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def bench():
+    print("--- Speedup of the numpy backend ---")
+    for n in (16, 64, 128):
+        for backend in ("python", "numpy"):
+            random.seed(n)
+            A = random_matrix(n, backend)
+            B = random_matrix(n, backend)
+            v = Vector([random.uniform(-1., 1.) for _ in range(n * n)],
+                       backend)
+            row = {
+                "dot": timed(lambda: v.dot(v)),
+                "norm": timed(lambda: v.norm()),
+                "mul_vec": timed(
+                    lambda: A.mul_vec(Vector(A.values[0], backend))),
+                "mul_mat": timed(lambda: A.mul_mat(B)),
+                "inverse": timed(lambda: A.inverse()),
+                "rank": timed(lambda: A.rank()),
+            }
+            if backend == "python":
+                reference = row
+                continue
+            print(f"n={n:>4} " + " ".join(
+                f"{op}={reference[op] / row[op]:>6.1f}x" for op in row))
+    for n in (7, 8):
+        A = random_matrix(n, "python")
+        t_py = timed(lambda: A.determinant())
+        A.backend = "numpy"
+        print(f"determinant n={n}: {t_py / timed(A.determinant):.0f}x")
+
+
+def main():
+    if not lib.module_available("numpy"):
+        print("NumPy is not installed, skipping.")
+        return
+    try:
+        test_backend_selection()
+        test_parity()
+        print("All tests passed.")
+    except AssertionError:
+        print("Some tests failed.")
+
+    if "--bench" in sys.argv:
+        bench()
+
+
+if __name__ == "__main__":
+    main()
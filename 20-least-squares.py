@@ -0,0 +1,176 @@
+"""
+                QR Decomposition and Least Squares
+
+Any m x n matrix A with m >= n can be written as
+
+    A = Q ⋅ R
+
+    Q is m x n with orthonormal columns (Q^T ⋅ Q = In)
+    R is n x n upper triangular
+
+            Householder reflections
+
+A Householder reflection H = I - beta ⋅ v ⋅ v^T mirrors a vector over a
+hyperplane. Choosing v well sends a whole column to a multiple of e1,
+so n reflections turn A into R:
+
+    Hn-1 ⋅ ... ⋅ H1 ⋅ H0 ⋅ A = R        Q = H0 ⋅ H1 ⋅ ... ⋅ Hn-1
+
+The reflectors are computed one panel of lib.QR_BLOCK columns at a time,
+then applied to each remaining column while it is in hand.
+
+            Least squares
+
+A tall system A ⋅ x = b (more equations than unknowns) has usually no
+exact solution. The least-squares solution minimizes ||A ⋅ x - b||.
+
+    Normal equations: x = (A^T ⋅ A)^-1 ⋅ A^T ⋅ b
+        -> squares the condition number of A, loses precision
+    QR: R ⋅ x = Q^T ⋅ b
+        -> triangular system, solved by back substitution
+
+            Appending rows
+
+QRFactorization keeps R and Q^T ⋅ b. New rows (a new batch of data) are
+absorbed with reflectors that only touch one row of R and the new rows:
+O(k ⋅ n^2) for k rows instead of refactoring all m rows.
+
+    A.qr()                     -> Q, R
+    A.lstsq(b)                 -> x
+    qr = QRFactorization(A, b)
+    qr.append_rows(E, f)       -> same as QRFactorization([A; E], [b; f])
+    qr.solve()                 -> x
+"""
+
+import random
+import sys
+import time
+import lib
+from lib import Matrix, QRFactorization, Vector
+
+
+def random_matrix(rows: int, cols: int) -> Matrix:
+    return Matrix([
+        [random.uniform(-1.0, 1.0) for _ in range(cols)]
+        for _ in range(rows)
+    ])
+
+
+def close(u: Vector, v: Vector, eps: float = 1e-9) -> bool:
+    return all(abs(x - y) < eps for x, y in zip(u.values, v.values))
+
+
+def test_qr():
+    print("--- QR decomposition ---")
+    A = Matrix([[12., -51., 4.],
+                [6., 167., -68.],
+                [-4., 24., -41.]])
+    Q, R = A.qr()
+    assert Q.mul_mat(R) == A
+    assert Q.transpose().mul_mat(Q) == A.identity_matrix(3)
+    assert all(R[i, j] == 0 for i in range(3) for j in range(i))
+    assert abs(abs(R[0, 0]) - 14.) < 1e-9
+
+    # Tall matrices, with panels smaller than the matrix
+    default_block = lib.QR_BLOCK
+    for block in (1, 2, default_block):
+        lib.QR_BLOCK = block
+        A = random_matrix(9, 5)
+        Q, R = A.qr()
+        assert Q.shape() == (9, 5) and R.shape() == (5, 5)
+        assert Q.mul_mat(R) == A
+        assert Q.transpose().mul_mat(Q) == A.identity_matrix(5)
+    lib.QR_BLOCK = default_block
+
+    try:
+        Matrix([[1., 2., 3.]]).qr()
+        assert False
+    except ValueError:
+        pass
+
+
+def test_lstsq():
+    print("--- Least squares ---")
+    # Consistent system: exact solution
+    A = Matrix([[1., 1.],
+                [1., 2.],
+                [1., 3.]])
+    assert close(A.lstsq(Vector([3., 5., 7.])), Vector([1., 2.]))
+
+    # Line fit y = a + b * x through noisy points
+    b = Vector([1., 2., 2., 4.])
+    A = Matrix([[1., 0.], [1., 1.], [1., 2.], [1., 3.]])
+    x = A.lstsq(b)
+    At = A.transpose()
+    normal = At.mul_mat(A).inverse().mul_vec(At.mul_vec(b))
+    assert close(x, normal)
+    assert close(x, Vector([0.9, 0.9]))
+
+    # Residual norm is available without forming A * x - b
+    qr = QRFactorization(A, b)
+    r = A.mul_vec(x)
+    r.sub(b)
+    assert abs(qr.residual_norm() - r.norm()) < 1e-12
+
+    try:
+        Matrix([[1., 2.], [2., 4.], [3., 6.]]).lstsq(Vector([1., 2., 3.]))
+        assert False
+    except ValueError:
+        pass
+
+
+def test_append_rows():
+    print("--- Appending rows ---")
+    A = random_matrix(6, 3)
+    b = Vector([random.uniform(-1.0, 1.0) for _ in range(6)])
+    E = random_matrix(4, 3)
+    f = Vector([random.uniform(-1.0, 1.0) for _ in range(4)])
+
+    qr = QRFactorization(A, b)
+    qr.append_rows(E, f)
+    full = QRFactorization(Matrix(A.values + E.values),
+                           Vector(b.values + f.values))
+    assert close(qr.solve(), full.solve())
+    assert abs(qr.residual_norm() - full.residual_norm()) < 1e-12
+
+    # Rows can be appended to a square (even empty-rank) start
+    qr = QRFactorization(Matrix([[1., 0.], [0., 1.]]), Vector([1., 1.]))
+    qr.append_rows(Matrix([[1., 1.]]), Vector([2.]))
+    assert close(qr.solve(), Vector([1., 1.]))
+
+
+def bench():
+    print("--- Tall 2000 x 20 least squares ---")
+    A = random_matrix(2000, 20)
+    b = Vector([random.uniform(-1.0, 1.0) for _ in range(2000)])
+    start = time.perf_counter()
+    At = A.transpose()
+    At.mul_mat(A).inverse().mul_vec(At.mul_vec(b))
+    print(f"normal equations: {time.perf_counter() - start:.3f}s")
+    start = time.perf_counter()
+    A.lstsq(b)
+    print(f"QR lstsq:         {time.perf_counter() - start:.3f}s")
+    qr = QRFactorization(A, b)
+    E = random_matrix(50, 20)
+    f = Vector([random.uniform(-1.0, 1.0) for _ in range(50)])
+    start = time.perf_counter()
+    qr.append_rows(E, f)
+    qr.solve()
+    print(f"append 50 rows:   {time.perf_counter() - start:.3f}s")
+
+
+def main():
+    try:
+        test_qr()
+        test_lstsq()
+        test_append_rows()
+        print("All tests passed.")
+    except AssertionError:
+        print("Some tests failed.")
+
+    if "--bench" in sys.argv:
+        bench()
+
+
+if __name__ == "__main__":
+    main()
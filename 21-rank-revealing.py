@@ -0,0 +1,135 @@
+"""
+                Numerical Rank
+
+Matrix.rank() counts the non-zero rows of the row echelon form.
+With floating point data, a dependent row rarely cancels to exactly 0:
+it ends up as 1e-16 noise and is counted as independent.
+
+The numerical rank counts what is significantly non-zero,
+relative to a tolerance:
+
+    rank(A, tol) = number of directions of A larger than tol * (largest)
+
+            QR with column pivoting
+
+Householder QR, but at every step the column with the largest remaining
+norm is moved in front before being reduced:
+
+    A ⋅ P = Q ⋅ R      |R11| >= |R22| >= ... >= |Rnn|
+
+The diagonal of R decreases, so the rank is the number of pivots with
+|Rkk| > tol * |R11|, and the pivot columns are a set of linearly
+independent columns of A: the other columns (redundant features) can be
+dropped without a second pass.
+
+            Randomized estimation
+
+For a tall matrix with a small rank r, the same QR on a sketch S ⋅ A
+gives the same rank and independent columns with high probability, for
+much less work. S (CountSketch) adds every row of A, with a random sign,
+into one of a few rows: one pass over A. The sketch is grown until it
+has spare rows.
+
+    A.rank(tol=1e-10)
+    A.rank_revealing()                        -> (rank, columns)
+    A.rank_revealing(method="randomized")     -> (rank, columns)
+"""
+
+import random
+import sys
+import time
+import lib
+from lib import Matrix
+
+
+def low_rank_matrix(rows: int, cols: int, rank: int) -> Matrix:
+    """Random rows x cols matrix of the given rank (product of two)."""
+    U = Matrix([[random.uniform(-1., 1.) for _ in range(rank)]
+                for _ in range(rows)])
+    V = Matrix([[random.uniform(-1., 1.) for _ in range(cols)]
+                for _ in range(rank)])
+    return U.mul_mat(V)
+
+
+def test_rank_revealing():
+    print("--- Rank revealing QR ---")
+    A = Matrix([[1., 2., 3.],
+                [4., 5., 6.],
+                [7., 8., 9.]])
+    rank, columns = A.rank_revealing()
+    assert rank == 2 and len(columns) == 2
+    assert A.rank(tol=1e-12) == 2
+
+    # Feature redundancy: column 2 = column 0 + column 1,
+    # column 3 = 2 * column 0
+    A = Matrix([[1., 0., 1., 2.],
+                [0., 1., 1., 0.],
+                [1., 1., 2., 2.]])
+    rank, columns = A.rank_revealing()
+    assert rank == 2
+    kept = Matrix([[row[j] for j in columns] for row in A.values])
+    assert kept.rank() == 2
+
+    # Noise below the tolerance is not counted
+    A = Matrix([[1., 2.],
+                [2., 4. + 1e-13]])
+    assert A.rank(tol=1e-9) == 1
+    assert A.rank(tol=1e-15) == 2
+
+    assert Matrix([[0., 0.], [0., 0.]]).rank_revealing() == (0, [])
+
+    # Wide matrix: 5 samples of 12 features
+    A = low_rank_matrix(5, 12, 3)
+    assert A.rank_revealing()[0] == 3
+    assert A.rank(tol=1e-10) == 3
+
+    try:
+        Matrix([[1j]]).rank_revealing()
+        assert False
+    except ValueError:
+        pass
+
+
+def test_randomized_rank():
+    print("--- Randomized rank ---")
+    A = low_rank_matrix(200, 15, 4)
+    rank, columns = A.rank_revealing(method="randomized", seed=42)
+    assert rank == 4
+    kept = Matrix([[row[j] for j in columns] for row in A.values])
+    assert kept.rank_revealing()[0] == 4
+
+    A = low_rank_matrix(120, 40, 30)
+    assert A.rank_revealing(method="randomized", seed=1)[0] == 30
+
+
+def bench():
+    print("--- 2000 x 60 matrix of rank 5 (python backend) ---")
+    lib.set_backend("python")
+    A = low_rank_matrix(2000, 60, 5)
+    for label, func in (
+        ("row echelon", lambda: A.rank()),
+        ("pivoted QR", lambda: A.rank_revealing()),
+        ("randomized", lambda: A.rank_revealing(method="randomized")),
+    ):
+        start = time.perf_counter()
+        res = func()
+        rank = res if isinstance(res, int) else res[0]
+        print(f"{label:>12}: rank={rank:>3} "
+              f"{time.perf_counter() - start:.3f}s")
+    lib.set_backend("auto")
+
+
+def main():
+    try:
+        test_rank_revealing()
+        test_randomized_rank()
+        print("All tests passed.")
+    except AssertionError:
+        print("Some tests failed.")
+
+    if "--bench" in sys.argv:
+        bench()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+                Rank-one Updates
+
+Replacing one row (or column) of a matrix changes it by a rank-one
+matrix: A' = A + u ⋅ v^T. Its inverse and determinant can be updated
+from the old ones in O(n^2) instead of recomputed in O(n^3):
+
+    Sherman-Morrison formula:
+        (A + u⋅v^T)^-1 = A^-1 - (A^-1⋅u)(v^T⋅A^-1) / (1 + v^T⋅A^-1⋅u)
+
+    Matrix determinant lemma:
+        det(A + u⋅v^T) = det(A) ⋅ (1 + v^T⋅A^-1⋅u)
+
+    Replace row i:      u = e_i,                 v = new row - old row
+    Replace column j:   u = new col - old col,   v = e_j
+
+If 1 + v^T⋅A^-1⋅u = 0 the new matrix is singular.
+
+            Growing and shrinking
+
+Appending a row and a column borders the matrix:
+
+    A' = | A    c |      s = d - r⋅A^-1⋅c   (Schur complement)
+         | r    d |      det(A') = det(A) ⋅ s
+
+    A'^-1 = | A^-1 + A^-1⋅c⋅r⋅A^-1 / s    -A^-1⋅c / s |
+            | -r⋅A^-1 / s                  1 / s      |
+
+Removing a row and a column runs the same formula backwards.
+
+            Drift
+
+Every update adds rounding errors. IncrementalInverse recomputes the
+inverse from scratch every `refactor_every` updates, and drift() reports
+the largest entry of A⋅A^-1 - I.
+"""
+
+import random
+import sys
+import time
+import lib
+from lib import IncrementalInverse, Matrix
+
+
+def random_matrix(n: int) -> Matrix:
+    # Diagonally dominant, so that every update stays invertible
+    return Matrix([[random.uniform(-1., 1.) + (n if i == j else 0)
+                    for j in range(n)] for i in range(n)])
+
+
+def check(tracker: IncrementalInverse):
+    A = tracker.matrix()
+    assert tracker.inverse() == A.inverse()
+    assert abs(tracker.determinant() - A.determinant()) < 1e-8
+    assert tracker.drift() < 1e-10
+
+
+def test_replace():
+    print("--- Replacing rows and columns ---")
+    A = Matrix([[8., 5., -2.],
+                [4., 7., 20.],
+                [7., 6., 1.]])
+    tracker = IncrementalInverse(A)
+    assert abs(tracker.determinant() + 174.) < 1e-9
+    tracker.replace_row(0, [0., 5., -2.])
+    assert abs(tracker.determinant() - 730.) < 1e-9
+    check(tracker)
+    tracker.replace_column(2, [1., 2., 3.])
+    check(tracker)
+
+    # Updates that make the matrix singular are refused
+    try:
+        tracker.replace_row(1, tracker.matrix()[0])
+        assert False
+    except ValueError:
+        pass
+    check(tracker)
+
+
+def test_append_remove():
+    print("--- Appending and removing ---")
+    tracker = IncrementalInverse(Matrix([[2.]]))
+    tracker.append([1.], [1.], 3.)
+    assert tracker.matrix() == Matrix([[2., 1.], [1., 3.]])
+    check(tracker)
+    tracker.append([0., 1.], [4., 1.], 5.)
+    check(tracker)
+
+    tracker.remove(0)
+    assert tracker.matrix() == Matrix([[3., 1.], [1., 5.]])
+    check(tracker)
+    # Row and column with different indices
+    tracker.remove(0, 1)
+    assert tracker.matrix() == Matrix([[1.]])
+    check(tracker)
+
+
+def test_refactor():
+    print("--- Periodic refactorisation ---")
+    n = 6
+    tracker = IncrementalInverse(random_matrix(n), refactor_every=10)
+    for step in range(35):
+        i = random.randrange(n)
+        row = [random.uniform(-1., 1.) + (n if i == j else 0)
+               for j in range(n)]
+        tracker.replace_row(i, row)
+    assert tracker.updates == 5
+    check(tracker)
+
+
+def bench():
+    print("--- 100 row replacements on a 60 x 60 matrix (python) ---")
+    lib.set_backend("python")
+    n = 60
+    A = random_matrix(n)
+    rows = []
+    for _ in range(100):
+        i = random.randrange(n)
+        rows.append((i, [random.uniform(-1., 1.) + (n if i == j else 0)
+                         for j in range(n)]))
+    start = time.perf_counter()
+    tracker = IncrementalInverse(A, refactor_every=0)
+    for i, row in rows:
+        tracker.replace_row(i, row)
+    print(f"incremental: {time.perf_counter() - start:.3f}s "
+          f"drift={tracker.drift():.1e}")
+    start = time.perf_counter()
+    for i, row in rows:
+        A[i] = row
+        A.inverse()
+    print(f"recompute:   {time.perf_counter() - start:.3f}s")
+    lib.set_backend("auto")
+
+
+def main():
+    try:
+        test_replace()
+        test_append_remove()
+        test_refactor()
+        print("All tests passed.")
+    except AssertionError:
+        print("Some tests failed.")
+
+    if "--bench" in sys.argv:
+        bench()
+
+
+if __name__ == "__main__":
+    main()
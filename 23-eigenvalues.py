@@ -0,0 +1,187 @@
+"""
+                Eigenvalues and Eigenvectors
+
+An eigenvector v of a square matrix A is a direction that A only
+stretches: A ⋅ v = λ ⋅ v, λ being the eigenvalue.
+
+    A = [2, 0]    e1 is stretched by 2, e2 by 3:
+        [0, 3]    eigenvalues 2 and 3
+
+    A = [0, -1]   rotation by 90°: no real direction is kept,
+        [1,  0]   the eigenvalues are complex (i and -i)
+
+The eigenvalues are the roots of det(A - λ ⋅ In), but polynomial roots
+are badly conditioned: they are computed with iterations instead.
+
+            QR algorithm (general matrices)
+
+    1. Hessenberg reduction: Householder similarity transforms put zeros
+       below the first subdiagonal (the eigenvalues do not change).
+    2. Shifted QR steps: H - μ⋅I = Q⋅R,  H <- R⋅Q + μ⋅I.
+       H converges to a triangular matrix (Schur form), the eigenvalues
+       appear on its diagonal. μ (Wilkinson shift) makes the bottom
+       entries converge fast, then they are deflated one by one.
+
+            Jacobi method (real symmetric matrices)
+
+Symmetric matrices have real eigenvalues and orthogonal eigenvectors.
+Plane rotations zero the off-diagonal entries one by one until the
+matrix is diagonal. Simple, accurate, and the product of the rotations
+gives the eigenvectors.
+
+            Power iteration (dominant eigenvalues)
+
+    x <- A ⋅ x / ||A ⋅ x||   converges to the eigenvector of the
+                             eigenvalue of largest magnitude.
+
+dominant_eig(k) iterates k vectors at once (subspace iteration), keeps
+them orthonormal, and reads the eigenvalues from the small k x k matrix
+X^T ⋅ A ⋅ X. The work vectors are reused at every step. Convergence
+depends on the gap between the k-th and (k+1)-th eigenvalues.
+
+    A.eigvals()         -> [λ1, λ2, ...]
+    A.eig()             -> [λ1, ...], [v1, ...]
+    A.dominant_eig(2)   -> the two largest |λ| and their vectors
+"""
+
+import random
+import sys
+import time
+from lib import Matrix, Vector
+
+
+def close(a, b, eps=1e-9) -> bool:
+    return abs(a - b) < eps
+
+
+def residual(A: Matrix, lam, v: Vector) -> float:
+    """max |A ⋅ v - λ ⋅ v|"""
+    Av = A.mul_vec(v)
+    return max(abs(x - lam * y) for x, y in zip(Av.values, v.values))
+
+
+def test_eigvals():
+    print("--- Eigenvalues ---")
+    assert Matrix([[2., 0.], [0., 3.]]).eigvals() == [2., 3.]
+
+    # Rotation: complex pair
+    values = Matrix([[0., -1.], [1., 0.]]).eigvals()
+    assert any(close(v, 1j) for v in values)
+    assert any(close(v, -1j) for v in values)
+
+    # Triangular: eigenvalues on the diagonal
+    A = Matrix([[1., 2., 3.],
+                [0., 4., 5.],
+                [0., 0., 6.]])
+    assert all(close(a, b)
+               for a, b in zip(sorted(A.eigvals()), [1., 4., 6.]))
+
+    # Sum = trace and product = determinant
+    A = Matrix([[4., 1., -2., 2.],
+                [1., 2., 0., 1.],
+                [-2., 0., 3., -2.],
+                [2., 1., -2., -1.]])
+    values = A.eigvals()
+    assert close(sum(values), A.trace())
+    prod = 1
+    for v in values:
+        prod *= v
+    assert close(prod, A.determinant())
+
+    A = Matrix([[random.uniform(-1., 1.) for _ in range(6)]
+                for _ in range(6)])
+    assert close(sum(A.eigvals()), A.trace())
+
+    try:
+        Matrix([[1., 2., 3.]]).eigvals()
+        assert False
+    except ValueError:
+        pass
+
+
+def test_eig():
+    print("--- Eigenvectors ---")
+    # General (non-symmetric) matrix
+    A = Matrix([[2., 1., 0.5],
+                [1., 3., 1.],
+                [0., 1., 4.5]])
+    values, vectors = A.eig()
+    for lam, v in zip(values, vectors):
+        assert residual(A, lam, v) < 1e-9
+        assert close(v.norm(), 1.)
+
+    # Symmetric matrix: Jacobi, ascending real values, orthogonal vectors
+    A = Matrix([[2., -1., 0.],
+                [-1., 2., -1.],
+                [0., -1., 2.]])
+    values, vectors = A.eig()
+    assert all(close(a, b) for a, b in
+               zip(values, [2 - 2 ** 0.5, 2., 2 + 2 ** 0.5]))
+    for lam, v in zip(values, vectors):
+        assert residual(A, lam, v) < 1e-9
+    assert close(vectors[0].dot(vectors[1]), 0.)
+
+    # Complex matrix
+    A = Matrix([[1j, 1.], [0., 2.]])
+    values, vectors = A.eig()
+    for lam, v in zip(values, vectors):
+        assert residual(A, lam, v) < 1e-9
+
+
+def test_dominant_eig():
+    print("--- Dominant eigenvalues ---")
+    A = Matrix([[2., -1., 0.],
+                [-1., 2., -1.],
+                [0., -1., 2.]])
+    values, vectors = A.dominant_eig()
+    assert close(values[0], 2 + 2 ** 0.5)
+    assert residual(A, values[0], vectors[0]) < 1e-4
+
+    A = Matrix([[10., 1., 0., 0.],
+                [1., -7., 1., 0.],
+                [0., 1., 2., 1.],
+                [0., 0., 1., 1.]])
+    values, vectors = A.dominant_eig(2)
+    reference = sorted(A.eigvals(), key=abs, reverse=True)[:2]
+    assert all(close(a, b, 1e-7) for a, b in zip(values, reference))
+
+    try:
+        A.dominant_eig(5)
+        assert False
+    except ValueError:
+        pass
+
+
+def bench():
+    print("--- 40 x 40 symmetric matrix ---")
+    n = 40
+    M = [[random.uniform(-1., 1.) for _ in range(n)] for _ in range(n)]
+    S = Matrix([[M[i][j] + M[j][i] + (i == 0 and j == 0) * 20
+                 for j in range(n)] for i in range(n)])
+    G = Matrix(M)
+    for label, func in (
+        ("eigvals (QR, general)", G.eigvals),
+        ("eig (QR, general)", G.eig),
+        ("eig (Jacobi, symmetric)", S.eig),
+        ("dominant_eig(1)", S.dominant_eig),
+    ):
+        start = time.perf_counter()
+        func()
+        print(f"{label:>24}: {time.perf_counter() - start:.3f}s")
+
+
+def main():
+    try:
+        test_eigvals()
+        test_eig()
+        test_dominant_eig()
+        print("All tests passed.")
+    except AssertionError:
+        print("Some tests failed.")
+
+    if "--bench" in sys.argv:
+        bench()
+
+
+if __name__ == "__main__":
+    main()
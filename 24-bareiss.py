@@ -0,0 +1,146 @@
+"""
+                Exact Integer Determinant and Rank
+
+Gaussian elimination divides by the pivots: with integer entries the
+intermediate values become fractions (or rounded floats). Cofactor
+expansion stays in integers but costs O(n!).
+
+            Bareiss algorithm
+
+Fraction-free elimination: every update of step k is divided by the
+pivot of step k - 1,
+
+    m[i][j] = (m[i][j] ⋅ m[k][k] - m[i][k] ⋅ m[k][j]) / m[k-1][k-1]
+
+and the division is always exact: after step k, every entry is a
+(k + 1) x (k + 1) minor of the original matrix (Sylvester's identity).
+The numbers never grow bigger than a determinant of the matrix, so the
+elimination costs O(n^3) integer operations, and the last pivot is the
+determinant itself:
+
+    A = [2, 1]    step 1: m[1][1] = (3 ⋅ 2 - 4 ⋅ 1) / 1 = 2
+        [4, 3]    det(A) = 2
+
+A column without a non-zero pivot is skipped: the number of pivots found
+is the exact rank.
+
+Matrix.determinant() and Matrix.rank() switch to Bareiss when every value
+is an int (Matrix.is_integer()), on every backend: the results are exact
+ints, even when they do not fit in a float.
+"""
+
+import random
+import sys
+import time
+import lib
+from lib import Matrix
+
+
+def random_int_matrix(n: int, low: int = -9, high: int = 9) -> Matrix:
+    return Matrix([[random.randint(low, high) for _ in range(n)]
+                   for _ in range(n)])
+
+
+def cofactor_determinant(values) -> int:
+    """Reference: first row expansion, integers only."""
+    if len(values) == 1:
+        return values[0][0]
+    return sum((-1) ** j * values[0][j] * cofactor_determinant(
+        [row[:j] + row[j + 1:] for row in values[1:]])
+        for j in range(len(values)))
+
+
+def test_determinant():
+    print("--- Integer determinant ---")
+    A = Matrix([[2, 1], [4, 3]])
+    assert A.is_integer()
+    assert A.determinant() == 2 and isinstance(A.determinant(), int)
+
+    # A zero pivot forces a row swap
+    A = Matrix([[0, 1, 2],
+                [3, 4, 5],
+                [6, 7, 9]])
+    assert A.determinant() == -3
+
+    assert Matrix([[1, 2], [2, 4]]).determinant() == 0
+    assert not Matrix([[1., 2], [2, 4]]).is_integer()
+
+    for n in range(1, 6):
+        A = random_int_matrix(n)
+        assert A.determinant() == cofactor_determinant(A.values)
+
+    # Beyond the 53 bits of a float
+    A = Matrix([[10 ** 20 + 1, 10 ** 20],
+                [10 ** 20, 10 ** 20 - 1]])
+    assert A.determinant() == -1
+
+    # Exact on the numpy backend too (per object: the global backend of
+    # the other tests is left alone)
+    if lib.module_available("numpy"):
+        previous = lib.get_backend()
+        assert Matrix(A.values, "numpy").determinant() == -1
+        assert lib.get_backend() == previous
+
+
+def test_rank():
+    print("--- Integer rank ---")
+    A = Matrix([[1, 2, 3],
+                [4, 5, 6],
+                [7, 8, 9]])
+    assert A.rank() == 2
+    assert Matrix([[0, 0], [0, 0]]).rank() == 0
+    assert Matrix([[0, 1, 2, 3]]).rank() == 1
+
+    # Incidence matrix of a triangle with a pendant edge
+    A = Matrix([[1, 1, 0, 0],
+                [-1, 0, 1, 0],
+                [0, -1, -1, 1],
+                [0, 0, 0, -1]])
+    assert A.rank() == 3
+
+    # Wide and tall
+    A = Matrix([[2, 4, 1, 3],
+                [1, 2, 1, 1],
+                [3, 6, 2, 4]])
+    assert A.rank() == 2
+    assert A.transpose().rank() == 2
+
+    # An explicit tolerance still asks for the numerical rank
+    assert Matrix([[1, 2], [2, 4]]).rank(tol=1e-12) == 1
+
+
+def bench():
+    print("--- Integer determinant (python backend) ---")
+    lib.set_backend("python")
+    for n in (7, 8, 9):
+        A = random_int_matrix(n)
+        start = time.perf_counter()
+        exact = A.determinant()
+        t_bareiss = time.perf_counter() - start
+        start = time.perf_counter()
+        Matrix([[float(x) for x in row] for row in A.values]).determinant()
+        t_cofactor = time.perf_counter() - start
+        print(f"n={n}: bareiss {t_bareiss:.4f}s  "
+              f"cofactor {t_cofactor:.4f}s  det={exact}")
+    n = 60
+    A = random_int_matrix(n)
+    start = time.perf_counter()
+    A.determinant()
+    print(f"n={n}: bareiss {time.perf_counter() - start:.3f}s")
+    lib.set_backend("auto")
+
+
+def main():
+    try:
+        test_determinant()
+        test_rank()
+        print("All tests passed.")
+    except AssertionError:
+        print("Some tests failed.")
+
+    if "--bench" in sys.argv:
+        bench()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+                Batches of Small Matrices
+
+Graphics and physics code transforms millions of points with 2x2, 3x3
+and 4x4 matrices. For such tiny matrices, building a Matrix object,
+checking its shape and running the generic loops costs far more than
+the arithmetic itself.
+
+MatrixBatch stores N matrices of the same size in one flat array of
+doubles, row-major, one after the other:
+
+    [a00, a01, a10, a11,  b00, b01, b10, b11,  ...]     (2x2 batch)
+     \\---- matrix 0 ----/ \\---- matrix 1 ----/
+
+Every operation is one call over the whole batch, with a kernel written
+out by hand for each size (no inner loops, no index arithmetic):
+
+    2x2 product:   [a0 a1] [b0 b1] = [a0⋅b0 + a1⋅b2   a0⋅b1 + a1⋅b3]
+                   [a2 a3] [b2 b3]   [a2⋅b0 + a3⋅b2   a2⋅b1 + a3⋅b3]
+
+    determinant and inverse use the closed forms: the adjugate
+    (transposed cofactors) divided by the determinant. The 4x4 case
+    shares the 2x2 minors of the top and bottom rows.
+
+A single Matrix or Vector operand is applied to every matrix:
+
+    batch.mul_mat(B)          -> MatrixBatch of A_i ⋅ B_i (or A_i ⋅ B)
+    batch.mul_vec(xs)         -> flat array of A_i ⋅ x_i (or A_i ⋅ x)
+    batch.determinant()       -> array of det(A_i)
+    batch.inverse()           -> MatrixBatch of A_i^-1
+    batch.transpose()         -> MatrixBatch of A_i^T
+
+The flat array supports the buffer protocol, so other libraries can read
+it without copying.
+"""
+
+import random
+import sys
+import time
+import lib
+from lib import Matrix, MatrixBatch, Vector
+
+
+def random_matrices(n: int, count: int):
+    return [Matrix([[random.uniform(-1., 1.) for _ in range(n)]
+                    for _ in range(n)]) for _ in range(count)]
+
+
+def test_batch_operations():
+    print("--- Batch operations ---")
+    for n in (2, 3, 4):
+        A = random_matrices(n, 20)
+        B = random_matrices(n, 20)
+        a = MatrixBatch.from_matrices(A)
+        b = MatrixBatch.from_matrices(B)
+        assert len(a) == 20 and a[3] == A[3] and a[-1] == A[-1]
+
+        assert a.mul_mat(b).to_matrices() == \
+            [x.mul_mat(y) for x, y in zip(A, B)]
+        assert a.transpose().to_matrices() == [x.transpose() for x in A]
+        assert a.inverse().to_matrices() == [x.inverse() for x in A]
+        assert all(abs(d - x.determinant()) < 1e-9
+                   for d, x in zip(a.determinant(), A))
+
+        xs = [random.uniform(-1., 1.) for _ in range(20 * n)]
+        ys = a.mul_vec(xs)
+        for i, x in enumerate(A):
+            y = x.mul_vec(Vector(xs[i * n:(i + 1) * n]))
+            assert all(abs(u - v) < 1e-12
+                       for u, v in zip(ys[i * n:(i + 1) * n], y.values))
+
+
+def test_broadcast():
+    print("--- One operand for the whole batch ---")
+    rotation = Matrix([[0., -1.], [1., 0.]])
+    a = MatrixBatch(2, [1., 2., 3., 4., 5., 6., 7., 8.])
+    assert a.mul_mat(rotation) == MatrixBatch(
+        2, [2., -1., 4., -3., 6., -5., 8., -7.])
+    assert list(a.mul_vec(Vector([1., 1.]))) == [3., 7., 11., 15.]
+
+    # Homogeneous 4x4 translations applied to points
+    translations = MatrixBatch.from_matrices([
+        Matrix([[1., 0., 0., dx],
+                [0., 1., 0., 0.],
+                [0., 0., 1., 0.],
+                [0., 0., 0., 1.]]) for dx in (1., 2., 3.)])
+    points = translations.mul_vec(Vector([0., 0., 0., 1.]))
+    assert list(points[0::4]) == [1., 2., 3.]
+    assert translations.inverse().mul_vec(points) == \
+        MatrixBatch(2, [0., 0., 0., 1.] * 3).data
+    assert list(translations.determinant()) == [1., 1., 1.]
+
+
+def test_errors():
+    print("--- Errors ---")
+    for bad in (
+        lambda: MatrixBatch(5),
+        lambda: MatrixBatch(2, [1., 2., 3.]),
+        lambda: MatrixBatch(2, [1., 2., 2., 4.]).inverse(),
+        lambda: MatrixBatch(2, [1.] * 8).mul_mat(MatrixBatch(2, [1.] * 12)),
+        lambda: MatrixBatch(3, [1.] * 9).mul_mat(MatrixBatch(2, [1.] * 4)),
+        lambda: MatrixBatch.from_matrices(
+            [Matrix([[1., 0.], [0., 1.]]), Matrix([[1.]])]),
+    ):
+        try:
+            bad()
+            assert False
+        except ValueError:
+            pass
+    try:
+        MatrixBatch(2, [1.] * 4)[1]
+        assert False
+    except IndexError:
+        pass
+
+
+def bench():
+    count = 100_000
+    print(f"--- {count} 4x4 matrices (python backend) ---")
+    lib.set_backend("python")
+    A = random_matrices(4, count)
+    B = random_matrices(4, count)
+    a = MatrixBatch.from_matrices(A)
+    b = MatrixBatch.from_matrices(B)
+    for label, single, batch in (
+        ("mul_mat", lambda: [x.mul_mat(y) for x, y in zip(A, B)],
+         lambda: a.mul_mat(b)),
+        ("determinant", lambda: [x.determinant() for x in A],
+         lambda: a.determinant()),
+        ("inverse", lambda: [x.inverse() for x in A],
+         lambda: a.inverse()),
+        ("transpose", lambda: [x.transpose() for x in A],
+         lambda: a.transpose()),
+    ):
+        start = time.perf_counter()
+        single()
+        t_single = time.perf_counter() - start
+        start = time.perf_counter()
+        batch()
+        t_batch = time.perf_counter() - start
+        print(f"{label:>12}: Matrix {t_single:.3f}s  "
+              f"batch {t_batch:.3f}s  ({t_single / t_batch:.0f}x)")
+    lib.set_backend("auto")
+
+
+def main():
+    try:
+        test_batch_operations()
+        test_broadcast()
+        test_errors()
+        print("All tests passed.")
+    except AssertionError:
+        print("Some tests failed.")
+
+    if "--bench" in sys.argv:
+        bench()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+                Threads, Processes and the GIL
+
+CPython's Global Interpreter Lock (GIL) lets only one thread run Python
+bytecode at a time: pure-Python kernels do not get faster with threads.
+Python 3.13 has an optional free-threaded build (python3.13t) where the
+GIL can be disabled, and threads run in parallel on every core.
+
+    sys._is_gil_enabled()     False on a free-threaded run without GIL
+
+            Sharing objects between threads
+
+    - Read-only sharing is safe: any number of threads may call the
+      non-mutating methods (mul_mat, determinant, norm, ...) of the same
+      Vector / Matrix. The result cache is locked.
+    - add, sub, scl and item assignment mutate the object without
+      synchronisation: no other thread may use it at the same time.
+
+            Parallel kernels
+
+lib.Parallel splits mul_mat (by rows), batches of mul_vec (by vectors),
+pairwise distances (by rows, see 36-pairwise.py) and the elementwise
+add / sub / scl (by rows or elements) between workers:
+
+    with lib.Parallel(workers=4) as par:        kind="auto"
+        C = par.mul_mat(A, B)
+        ys = par.mul_vec(A, [x0, x1, x2, ...])
+        par.add(A, B)                           same as A.add(B)
+
+kind="auto" picks the executor at runtime:
+
+    GIL disabled    threads     shared memory, no copy, cheap tasks
+    GIL enabled     processes   the operands are pickled to every
+                                worker: only worth it for mul_mat and
+                                large batches, where the O(n^3) work
+                                dwarfs the O(n^2) copy
+"""
+
+import random
+import sys
+import threading
+import time
+import lib
+from lib import Matrix, Vector
+
+
+def random_matrix(rows: int, cols: int) -> Matrix:
+    return Matrix([[random.uniform(-1., 1.) for _ in range(cols)]
+                   for _ in range(rows)])
+
+
+def test_gil_detection():
+    print("--- GIL detection ---")
+    expected = sys._is_gil_enabled() \
+        if hasattr(sys, "_is_gil_enabled") else True
+    assert lib.gil_enabled() == expected
+    with lib.Parallel(workers=1) as par:
+        assert par.kind == ("processes" if expected else "threads")
+    try:
+        lib.Parallel(kind="fibers")
+        assert False
+    except ValueError:
+        pass
+
+
+def test_parallel_kernels():
+    print("--- Parallel kernels ---")
+    A = random_matrix(13, 7)
+    B = random_matrix(7, 5)
+    vectors = [Vector([random.uniform(-1., 1.) for _ in range(7)])
+               for _ in range(10)]
+    for kind in ("threads", "processes"):
+        with lib.Parallel(workers=3, kind=kind) as par:
+            assert par.mul_mat(A, B) == A.mul_mat(B)
+            for y, x in zip(par.mul_vec(A, vectors), vectors):
+                assert Matrix([y.values]) == Matrix([A.mul_vec(x).values])
+
+            C = Matrix([row[:] for row in A.values])
+            row = C.values[0]
+            par.add(C, A)
+            assert C == Matrix([[2 * x for x in r] for r in A.values])
+            # In place, like Matrix.add
+            assert C.values[0] is row
+            par.sub(C, A)
+            assert C == A
+            par.scl(C, 3)
+            assert C == Matrix([[3 * x for x in r] for r in A.values])
+
+            v = Vector([1., 2., 3., 4., 5.])
+            par.add(v, Vector([1.] * 5))
+            par.scl(v, 2.)
+            assert v.values == [4., 6., 8., 10., 12.]
+
+            # Typed objects keep their dtype
+            F = Matrix([[0.1, 0.2], [0.3, 0.4]], dtype="float32")
+            row = F.values[0]
+            par.add(F, Matrix([[1., 1.], [1., 1.]]))
+            assert F.dtype == "float32" and F.values[0] is row
+            assert row.typecode == "f" and F == Matrix(
+                [[0.1, 0.2], [0.3, 0.4]], dtype="float32").add(
+                Matrix([[1., 1.], [1., 1.]]))
+            w = Vector([0.1, 0.2], dtype="float32")
+            par.scl(w, 3.)
+            assert w.values.typecode == "f"
+            assert w.values == Vector([0.1, 0.2], dtype="float32") \
+                .scl(3.).values
+            i32 = Matrix([[1, 2], [3, 4]], dtype="int32")
+            par.sub(i32, Matrix([[1, 1], [1, 1]]))
+            assert i32.values[1].typecode == "i" and i32[1, 1] == 3
+            for bad in (lambda: par.scl(i32, 0.5),
+                        lambda: par.add(v, Vector([1.]))):
+                try:
+                    bad()
+                    assert False
+                except ValueError:
+                    pass
+            assert i32 == Matrix([[0, 1], [2, 3]])
+            # Products take the dtype of Matrix.mul_mat / mul_vec
+            f32 = Matrix([[0.5, 1.5], [2.5, 3.5]], dtype="float32")
+            for a, b in ((f32, f32), (i32, i32), (f32, i32)):
+                C = par.mul_mat(a, b)
+                assert C.dtype == a.mul_mat(b).dtype and C == a.mul_mat(b)
+                assert C.values[0].typecode == lib.DTYPES[C.dtype]
+                x = Vector([1, 2], dtype=b.dtype)
+                y, = par.mul_vec(a, [x])
+                assert y.dtype == a.mul_vec(x).dtype
+                assert y.values == a.mul_vec(x).values
+            try:
+                par.mul_mat(A, A)
+                assert False
+            except ValueError:
+                pass
+
+
+def test_shared_reads():
+    print("--- Sharing a matrix between threads ---")
+    lib.enable_result_cache(maxsize=4)
+    A = random_matrix(5, 5)
+    expected = (A.determinant(), A.inverse(), A.mul_mat(A))
+    errors = []
+
+    def reader():
+        for _ in range(50):
+            if (A.determinant(), A.inverse(), A.mul_mat(A)) != expected:
+                errors.append(1)
+
+    threads = [threading.Thread(target=reader) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    lib.disable_result_cache()
+    assert not errors
+
+
+def bench():
+    lib.set_backend("python")
+    n = 160
+    A = random_matrix(n, n)
+    B = random_matrix(n, n)
+    vectors = [Vector([random.uniform(-1., 1.) for _ in range(n)])
+               for _ in range(400)]
+    print(f"--- {n} x {n}, GIL enabled: {lib.gil_enabled()} ---")
+    start = time.perf_counter()
+    A.mul_mat(B)
+    print(f"{'serial':>10}: mul_mat {time.perf_counter() - start:.3f}s")
+    for kind in ("threads", "processes"):
+        with lib.Parallel(kind=kind) as par:
+            # Start the workers before timing
+            par.mul_mat(A, B)
+            start = time.perf_counter()
+            par.mul_mat(A, B)
+            t_mat = time.perf_counter() - start
+            start = time.perf_counter()
+            par.mul_vec(A, vectors)
+            t_vec = time.perf_counter() - start
+            print(f"{kind:>10}: mul_mat {t_mat:.3f}s  "
+                  f"mul_vec x{len(vectors)} {t_vec:.3f}s "
+                  f"({par.workers} workers)")
+    lib.set_backend("auto")
+
+
+def main():
+    try:
+        test_gil_detection()
+        test_parallel_kernels()
+        test_shared_reads()
+        print("All tests passed.")
+    except AssertionError:
+        print("Some tests failed.")
+
+    if "--bench" in sys.argv:
+        bench()
+
+
+if __name__ == "__main__":
+    main()
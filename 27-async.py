@@ -0,0 +1,209 @@
+"""
+                Offloading computations from asyncio
+
+An asyncio event loop runs every coroutine on one thread: a coroutine
+calling A.inverse() on a large matrix freezes every other request until
+the inverse is done.
+
+    C = await A.mul_mat_async(B)
+    X = await A.inverse_async()
+    d = await A.determinant_async()
+
+run the computation on a worker thread (lib.Offloader) and return to the
+event loop in the meantime.
+
+            Backpressure
+
+A burst of requests must not start a burst of computations: they would
+all share the same cores and finish late together. The offloader lets
+`max_concurrency` computations run, the next callers wait (await) for a
+free slot.
+
+            Cancellation
+
+Cancelling the awaiting task (client disconnected, timeout, ...) cannot
+stop a running thread. The kernels check a flag between blocks of rows
+(ASYNC_BLOCK in matrix/aio.py) and stop there:
+
+    task = asyncio.create_task(A.mul_mat_async(B))
+    task.cancel()         the worker stops at its next checkpoint
+
+    lib.set_offloader(lib.Offloader(max_workers=8, max_concurrency=4))
+"""
+
+import asyncio
+import random
+import sys
+import threading
+import time
+import lib
+from lib import Matrix
+
+
+def random_matrix(n: int) -> Matrix:
+    return Matrix([[random.uniform(-1., 1.) for _ in range(n)]
+                   for _ in range(n)])
+
+
+def test_results():
+    print("--- Awaitable results ---")
+
+    async def compute():
+        A = random_matrix(20)
+        B = random_matrix(20)
+        assert await A.mul_mat_async(B) == A.mul_mat(B)
+        assert await A.inverse_async() == A.inverse()
+        C = random_matrix(6)
+        assert abs(await C.determinant_async() - C.determinant()) < 1e-9
+
+        # Exact for integer matrices
+        D = Matrix([[10 ** 20 + 1, 10 ** 20], [10 ** 20, 10 ** 20 - 1]])
+        assert await D.determinant_async() == -1
+        assert await Matrix([[1., 2.], [2., 4.]]).determinant_async() == 0
+
+        try:
+            await Matrix([[1., 2.], [2., 4.]]).inverse_async()
+            assert False
+        except ValueError:
+            pass
+
+    asyncio.run(compute())
+    # The default offloader works from another event loop too
+    asyncio.run(compute())
+
+
+def test_event_loop_responsive():
+    print("--- Event loop keeps running ---")
+
+    async def compute():
+        ticks = 0
+        done = False
+
+        async def ticker():
+            nonlocal ticks
+            while not done:
+                ticks += 1
+                await asyncio.sleep(0.001)
+
+        task = asyncio.create_task(ticker())
+        A = random_matrix(100)
+        A.backend = "python"
+        await A.mul_mat_async(A)
+        done = True
+        await task
+        return ticks
+
+    assert asyncio.run(compute()) >= 2
+
+
+def test_bounded_concurrency():
+    print("--- Bounded concurrency ---")
+    offloader = lib.Offloader(max_workers=4, max_concurrency=2)
+    lock = threading.Lock()
+    active = 0
+    peak = 0
+
+    def kernel(checkpoint):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        for _ in range(5):
+            checkpoint()
+            time.sleep(0.002)
+        with lock:
+            active -= 1
+        return True
+
+    async def burst():
+        return await asyncio.gather(*(offloader.run(kernel)
+                                      for _ in range(8)))
+
+    assert asyncio.run(burst()) == [True] * 8
+    assert peak == 2
+    offloader.shutdown()
+
+
+def test_cancellation():
+    print("--- Cancellation ---")
+    offloader = lib.Offloader(max_workers=1)
+    stopped = threading.Event()
+
+    def kernel(checkpoint):
+        try:
+            while True:
+                checkpoint()
+                time.sleep(0.001)
+        finally:
+            stopped.set()
+
+    async def cancel():
+        task = asyncio.create_task(offloader.run(kernel))
+        await asyncio.sleep(0.02)
+        task.cancel()
+        try:
+            await task
+            assert False
+        except asyncio.CancelledError:
+            pass
+        # The worker thread has stopped and the slot is free again
+        assert stopped.is_set()
+        assert offloader.running == 0
+        A = random_matrix(40)
+        assert await offloader.mul_mat(A, A) == A.mul_mat(A)
+
+    asyncio.run(cancel())
+    offloader.shutdown()
+
+
+def bench():
+    print("--- 16 concurrent 80 x 80 inverses ---")
+    lib.set_backend("python")
+    matrices = [random_matrix(80) for _ in range(16)]
+
+    async def serve(limit: int):
+        lib.set_offloader(lib.Offloader(max_concurrency=limit))
+        worst = 0.0
+
+        async def ticker():
+            nonlocal worst
+            while True:
+                start = time.perf_counter()
+                await asyncio.sleep(0.001)
+                worst = max(worst, time.perf_counter() - start)
+
+        task = asyncio.create_task(ticker())
+        start = time.perf_counter()
+        await asyncio.gather(*(A.inverse_async() for A in matrices))
+        total = time.perf_counter() - start
+        task.cancel()
+        return total, worst
+
+    start = time.perf_counter()
+    for A in matrices:
+        A.inverse()
+    print(f"blocking:          {time.perf_counter() - start:.3f}s "
+          f"(event loop blocked the whole time)")
+    for limit in (1, 4):
+        total, worst = asyncio.run(serve(limit))
+        print(f"max_concurrency={limit}: {total:.3f}s "
+              f"worst event loop stall {worst * 1000:.1f}ms")
+    lib.set_backend("auto")
+
+
+def main():
+    try:
+        test_results()
+        test_event_loop_responsive()
+        test_bounded_concurrency()
+        test_cancellation()
+        print("All tests passed.")
+    except AssertionError:
+        print("Some tests failed.")
+
+    if "--bench" in sys.argv:
+        bench()
+
+
+if __name__ == "__main__":
+    main()
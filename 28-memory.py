@@ -0,0 +1,164 @@
+"""
+                Per-object Memory and Allocations
+
+Every Python object carries a header, and a regular class instance also
+owns a __dict__ holding its attributes. For the 3-element results of
+mul_vec or cross, that overhead is larger than the numbers themselves.
+
+            __slots__
+
+    class Vector:
+        __slots__ = ("values", "backend", "_array")
+
+A class with __slots__ stores its attributes in fixed fields of the
+instance: no __dict__, smaller objects, and assigning an attribute that
+is not listed raises AttributeError. Vector and Matrix both use slots.
+
+The Generic[T] base costs nothing per instance (it has empty slots).
+Only calling a subscripted class, Vector[float]([...]), goes through
+typing on every construction: keep the subscription for annotations.
+
+            Reusing result objects
+
+Python frees an object as soon as it is no longer referenced, so a
+free-list cannot know when a result can be handed out again. The caller
+does know: hot loops pass the result object to reuse,
+
+    out = Vector([0.] * 3)
+    for point in points:
+        M.mul_vec(point, out)         no new Vector per point
+
+and the cofactor determinant reuses one scratch matrix per minor size
+instead of allocating every minor (28960 of them for 8 x 8).
+
+    python3 28-memory.py --bench    prints bytes per object and timings
+"""
+
+import math
+import random
+import sys
+import time
+import tracemalloc
+import lib
+from lib import Matrix, Vector
+
+
+class DictVector:
+    """Vector with the same attributes, stored in a __dict__."""
+
+    def __init__(self, values):
+        self.values = values
+        self.backend = None
+        self._array = None
+
+
+def same_det(det, expected) -> bool:
+    if lib.get_backend() == "numpy":
+        return math.isclose(det, expected, rel_tol=1e-12, abs_tol=1e-12)
+    return det == expected
+
+
+def bytes_per_object(factory, count: int = 10_000) -> float:
+    """Memory held by `count` objects built by factory, per object."""
+    values = [1., 2., 3.]
+    tracemalloc.start()
+    objects = [factory(values) for _ in range(count)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return size / count
+
+
+def test_slots():
+    print("--- Slots ---")
+    v = Vector([1., 2.])
+    A = Matrix([[1., 2.], [3., 4.]])
+    for obj in (v, A):
+        assert not hasattr(obj, "__dict__")
+        try:
+            obj.color = "red"
+            assert False
+        except AttributeError:
+            pass
+    # Declared attributes still work
+    A.backend = "python"
+    assert A.mul_vec(v) == Vector([5., 11.])
+    assert bytes_per_object(Vector) < bytes_per_object(DictVector)
+
+
+def test_reused_results():
+    print("--- Reused result objects ---")
+    A = Matrix([[1., 2.], [3., 4.], [5., 6.]])
+    out = Vector([0., 0., 0.])
+    for x, expected in (([1., 0.], [1., 3., 5.]), ([0., 1.], [2., 4., 6.])):
+        res = A.mul_vec(Vector(x), out)
+        assert res is out and out.values == expected
+
+    for bad in (Vector([0., 0.]), Vector([0., 0., 0., 0.])):
+        try:
+            A.mul_vec(Vector([1., 1.]), bad)
+            assert False
+        except ValueError:
+            pass
+    B = Matrix([[1., 2.], [3., 4.]])
+    x = Vector([1., 1.])
+    try:
+        B.mul_vec(x, x)
+        assert False
+    except ValueError:
+        pass
+
+    # The cofactor expansion reuses its scratch minors
+    A = Matrix([[2., 0., 1., 3.],
+                [1., 1., 0., 2.],
+                [0., 3., 1., 1.],
+                [4., 1., 2., 0.]])
+    assert same_det(A.determinant(), -32.)
+    assert same_det(A.determinant(), -32.)
+
+
+def bench():
+    lib.set_backend("python")
+    print("--- Bytes per 3-element vector (values list shared) ---")
+    print(f"  __dict__: {bytes_per_object(DictVector):.0f}")
+    print(f"  Vector:   {bytes_per_object(Vector):.0f}")
+
+    print("--- 200000 3x3 mul_vec ---")
+    M = Matrix([[random.uniform(-1., 1.) for _ in range(3)]
+                for _ in range(3)])
+    points = [Vector([random.uniform(-1., 1.) for _ in range(3)])
+              for _ in range(200_000)]
+    start = time.perf_counter()
+    for p in points:
+        M.mul_vec(p)
+    print(f"  new result:    {time.perf_counter() - start:.3f}s")
+    out = Vector([0.] * 3)
+    start = time.perf_counter()
+    for p in points:
+        M.mul_vec(p, out)
+    print(f"  reused result: {time.perf_counter() - start:.3f}s")
+
+    print("--- 8 x 8 cofactor determinant ---")
+    A = Matrix([[random.uniform(-1., 1.) for _ in range(8)]
+                for _ in range(8)])
+    start = time.perf_counter()
+    A.determinant()
+    print(f"  {time.perf_counter() - start:.3f}s (8 scratch matrices "
+          f"instead of 28960 minors)")
+    lib.set_backend("auto")
+
+
+def main():
+    try:
+        test_slots()
+        test_reused_results()
+        print("All tests passed.")
+    except AssertionError:
+        print("Some tests failed.")
+
+    if "--bench" in sys.argv:
+        bench()
+
+
+if __name__ == "__main__":
+    main()
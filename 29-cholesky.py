@@ -0,0 +1,188 @@
+"""
+                Cholesky Factorization
+
+A symmetric positive definite (SPD) matrix (x^T ⋅ A ⋅ x > 0 for every
+x != 0), such as a covariance matrix X^T ⋅ X, can be written as
+
+    A = L ⋅ L^T         L lower triangular, positive diagonal
+
+    [ 4   12  -16]   [ 2  0  0]   [2  6  -8]
+    [12   37  -43] = [ 6  1  0] ⋅ [0  1   5]
+    [-16 -43   98]   [-8  5  3]   [0  0   3]
+
+    L[j][j] = sqrt(A[j][j] - sum(L[j][k]^2 for k < j))
+    L[i][j] = (A[i][j] - sum(L[i][k] ⋅ L[j][k] for k < j)) / L[j][j]
+
+Only the lower triangle is read: n^3 / 3 multiplications, half of LU,
+and no pivoting (the pivots of an SPD matrix are always positive). A
+non-positive pivot proves that the matrix is not SPD.
+
+    solve:          L ⋅ y = b, then L^T ⋅ x = y (two triangular systems)
+    determinant:    det(A) = product of the pivots L[i][i]^2
+    inverse:        A^-1 = L^-T ⋅ L^-1
+
+            Automatic SPD path
+
+solve, inverse and determinant check cheaply (O(n^2)) whether the
+matrix may be SPD: symmetric, positive diagonal, A[i][j]^2 < A[i][i] ⋅
+A[j][j]. If so they try the Cholesky factorization and fall back to
+Gaussian elimination if a pivot is not positive.
+
+            Blocked factorization
+
+lib.CHOLESKY_BLOCK columns are factored as a panel, then the trailing
+matrix is updated at once (A22 <- A22 - L21 ⋅ L21^T).
+
+    A.cholesky()            -> L
+    A.is_spd()              -> bool
+    A.solve(b)              -> x      (spd=True / False to force a path)
+"""
+
+import math
+import random
+import sys
+import time
+import lib
+from lib import Matrix, Vector
+
+
+def same_det(det, expected) -> bool:
+    if lib.get_backend() == "numpy":
+        return math.isclose(det, expected, rel_tol=1e-12, abs_tol=1e-12)
+    return det == expected
+
+
+def random_spd(n: int) -> Matrix:
+    """Covariance-like matrix X^T * X + I."""
+    X = Matrix([[random.uniform(-1., 1.) for _ in range(n)]
+                for _ in range(n + 3)])
+    A = X.transpose().mul_mat(X)
+    for i in range(n):
+        A[i, i] += 1.
+    return A
+
+
+def close(u: Vector, v: Vector, eps: float = 1e-9) -> bool:
+    return all(abs(x - y) < eps for x, y in zip(u.values, v.values))
+
+
+def test_cholesky():
+    print("--- Cholesky factor ---")
+    A = Matrix([[4., 12., -16.],
+                [12., 37., -43.],
+                [-16., -43., 98.]])
+    L = A.cholesky()
+    assert L == Matrix([[2., 0., 0.], [6., 1., 0.], [-8., 5., 3.]])
+    assert A.is_spd()
+
+    default_block = lib.CHOLESKY_BLOCK
+    for block in (1, 3, default_block):
+        lib.CHOLESKY_BLOCK = block
+        A = random_spd(10)
+        L = A.cholesky()
+        assert all(L[i, j] == 0 for i in range(10) for j in range(i + 1, 10))
+        assert L.mul_mat(L.transpose()) == A
+    lib.CHOLESKY_BLOCK = default_block
+
+    for bad in (Matrix([[1., 2.], [2., 1.]]),     # indefinite
+                Matrix([[2., 1.], [0., 2.]]),     # not symmetric
+                Matrix([[0., 0.], [0., 0.]])):
+        assert not bad.is_spd()
+        try:
+            bad.cholesky()
+            assert False
+        except ValueError:
+            pass
+
+
+def test_spd_paths():
+    print("--- SPD solve / inverse / determinant ---")
+    A = random_spd(8)
+    b = Vector([random.uniform(-1., 1.) for _ in range(8)])
+    x = A.solve(b)
+    assert close(A.mul_vec(x), b)
+    assert close(x, A.solve(b, spd=False))
+    assert close(x, A.solve(b, spd=True))
+
+    inv = A.inverse()
+    assert A.mul_mat(inv) == A.identity_matrix(8)
+    assert inv.is_symmetric()
+    if lib.module_available("numpy"):
+        assert Matrix(A.values, "numpy").inverse().is_symmetric()
+
+    A = Matrix([[4., 12., -16.],
+                [12., 37., -43.],
+                [-16., -43., 98.]])
+    assert same_det(A.determinant(), 36.)
+    assert same_det(Matrix([[2., 0., 0.], [0., 2., 0.],
+                            [0., 0., 2.]]).determinant(), 8.)
+
+    # Symmetric but indefinite: the general path takes over
+    A = Matrix([[1., 2., 0.], [2., 1., 0.], [0., 0., 1.]])
+    assert not A.is_spd()
+    assert abs(A.determinant() + 3.) < 1e-12
+    assert close(A.solve(Vector([3., 3., 1.])), Vector([1., 1., 1.]))
+    try:
+        A.solve(Vector([3., 3., 1.]), spd=True)
+        assert False
+    except ValueError:
+        pass
+
+
+def test_general_solve():
+    print("--- General solve ---")
+    A = Matrix([[0., 2., 1.],
+                [1., 1., 0.],
+                [3., 0., 1.]])
+    assert close(A.solve(Vector([5., 3., 4.])), Vector([1., 2., 1.]))
+    try:
+        Matrix([[1., 2.], [2., 4.]]).solve(Vector([1., 2.]))
+        assert False
+    except ValueError:
+        pass
+    try:
+        Matrix([[1., 2., 3.]]).solve(Vector([1.]))
+        assert False
+    except ValueError:
+        pass
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def bench():
+    lib.set_backend("python")
+    n = 150
+    print(f"--- {n} x {n} covariance matrix (python backend) ---")
+    A = random_spd(n)
+    b = Vector([random.uniform(-1., 1.) for _ in range(n)])
+    # Same size, one entry breaks the symmetry: general path
+    G = Matrix([row[:] for row in A.values])
+    G[0, 1] += 1e-3
+    print(f"solve    Cholesky {timed(lambda: A.solve(b)):.3f}s  "
+          f"elimination {timed(lambda: A.solve(b, spd=False)):.3f}s")
+    print(f"inverse  Cholesky {timed(A.inverse):.3f}s  "
+          f"Gauss-Jordan {timed(G.inverse):.3f}s")
+    print(f"cholesky blocked {timed(A.cholesky):.3f}s  "
+          f"unblocked {timed(lambda: A.cholesky(block=n)):.3f}s")
+    lib.set_backend("auto")
+
+
+def main():
+    try:
+        test_cholesky()
+        test_spd_paths()
+        test_general_solve()
+        print("All tests passed.")
+    except AssertionError:
+        print("Some tests failed.")
+
+    if "--bench" in sys.argv:
+        bench()
+
+
+if __name__ == "__main__":
+    main()
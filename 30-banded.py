@@ -0,0 +1,189 @@
+"""
+                Banded Matrices
+
+Finite differences and splines produce matrices whose non-zero entries
+sit close to the diagonal:
+
+    [ 2 -1  0  0  0]      lower bandwidth 1 (one sub-diagonal)
+    [-1  2 -1  0  0]      upper bandwidth 1 (one super-diagonal)
+    [ 0 -1  2 -1  0]      -> tridiagonal
+    [ 0  0 -1  2 -1]
+    [ 0  0  0 -1  2]
+
+Storing the n^2 entries wastes memory, and a dense solve wastes O(n^3)
+time on zeros. BandedMatrix only stores the band, row by row:
+
+    rows[i] = [A[i][i - lower], ..., A[i][i], ..., A[i][i + upper]]
+
+            Thomas algorithm
+
+A tridiagonal system is solved in O(n) by Gaussian elimination without
+pivoting: each row only has to eliminate the sub-diagonal entry of the
+row below. Safe when the matrix is diagonally dominant
+(|A[i][i]| >= |A[i][i-1]| + |A[i][i+1]|), which is the usual case.
+
+            Banded LU
+
+Other bands use Gaussian elimination with partial pivoting restricted to
+the band: O(n * lower * (lower + upper)). Row swaps can widen the upper
+band of U up to lower + upper diagonals, never more.
+
+            Determinant
+
+For a tridiagonal matrix, the leading principal minors follow
+
+    f(i) = A[i][i] ⋅ f(i-1) - A[i][i-1] ⋅ A[i-1][i] ⋅ f(i-2)
+
+(exact for integers). Other bands multiply the pivots of the banded LU.
+
+    B = BandedMatrix.tridiagonal(sub, diag, sup)
+    B = BandedMatrix.from_diagonals({-2: ..., 0: ..., 1: ...})
+    B = BandedMatrix.from_matrix(A)        B.to_matrix()
+    B.mul_vec(x)    B.solve(b)    B.determinant()
+"""
+
+import random
+import sys
+import time
+import lib
+from lib import BandedMatrix, Matrix, Vector
+
+
+def close(u: Vector, v: Vector, eps: float = 1e-9) -> bool:
+    return all(abs(x - y) < eps for x, y in zip(u.values, v.values))
+
+
+def poisson(n: int) -> BandedMatrix:
+    """Second difference matrix: 2 on the diagonal, -1 beside."""
+    return BandedMatrix.tridiagonal([-1.] * (n - 1), [2.] * n,
+                                    [-1.] * (n - 1))
+
+
+def random_band(n: int, lower: int, upper: int) -> Matrix:
+    return Matrix([[random.uniform(-1., 1.) if -lower <= j - i <= upper
+                    else 0. for j in range(n)] for i in range(n)])
+
+
+def test_storage():
+    print("--- Band storage ---")
+    B = poisson(5)
+    assert (B.lower, B.upper, len(B.rows)) == (1, 1, 5)
+    assert B[0, 0] == 2. and B[1, 0] == -1. and B[0, 4] == 0.
+    assert B.diagonal(-1) == [-1.] * 4
+    A = B.to_matrix()
+    assert A[2] == [0., -1., 2., -1., 0.]
+    assert BandedMatrix.from_matrix(A).rows == B.rows
+
+    B = BandedMatrix.from_diagonals({-2: [1.], 0: [3., 4., 5.],
+                                     1: [6., 7.]})
+    assert B.to_matrix() == Matrix([[3., 6., 0.],
+                                    [0., 4., 7.],
+                                    [1., 0., 5.]])
+    assert (B.lower, B.upper) == (2, 1)
+
+    for bad in (lambda: BandedMatrix.from_matrix(A, lower=0),
+                lambda: BandedMatrix.from_diagonals({1: [1.]}),
+                lambda: BandedMatrix.from_diagonals({0: [1., 2.],
+                                                     1: [1., 2.]})):
+        try:
+            bad()
+            assert False
+        except ValueError:
+            pass
+
+
+def test_operations():
+    print("--- mul_vec, solve, determinant ---")
+    B = poisson(6)
+    x = Vector([1., 2., 3., 4., 5., 6.])
+    b = B.mul_vec(x)
+    assert b == B.to_matrix().mul_vec(x)
+    assert close(B.solve(b), x)
+    # det of the n x n second difference matrix is n + 1
+    assert B.determinant() == 7.
+    assert BandedMatrix.tridiagonal([-1] * 9, [2] * 10,
+                                    [-1] * 9).determinant() == 11
+
+    for lower, upper in ((0, 0), (2, 1), (1, 3), (3, 0)):
+        A = random_band(8, lower, upper)
+        B = BandedMatrix.from_matrix(A, lower, upper)
+        x = Vector([random.uniform(-1., 1.) for _ in range(8)])
+        assert close(B.mul_vec(x), A.mul_vec(x))
+        assert close(B.solve(x), A.solve(x), 1e-6)
+        assert abs(B.determinant() - A.determinant()) < 1e-9
+        assert B.transpose().to_matrix() == A.transpose()
+
+    # Bands wider than the matrix (the constructor accepts them)
+    for n, lower, upper in ((1, 0, 3), (2, 3, 0), (3, 1, 4)):
+        A = random_band(n, lower, upper)
+        B = BandedMatrix.from_matrix(A, lower, upper)
+        T = B.transpose()
+        assert (T.lower, T.upper) == (upper, lower)
+        assert T.to_matrix() == A.transpose()
+    assert BandedMatrix(1, 0, 3).transpose().to_matrix() == Matrix([[0.]])
+
+    # A zero on the diagonal needs the pivoting path
+    B = BandedMatrix.tridiagonal([1., 1.], [0., 0., 1.], [1., 1.])
+    A = B.to_matrix()
+    b = Vector([1., 2., 3.])
+    assert close(A.mul_vec(B.solve(b)), b)
+
+    for singular in (BandedMatrix.tridiagonal([1.], [1., 1.], [1.]),
+                     BandedMatrix.from_diagonals({-2: [1.], 0: [0.] * 3})):
+        assert singular.determinant() == 0
+        try:
+            singular.solve(Vector([1.] * singular.n))
+            assert False
+        except ValueError:
+            pass
+
+
+def bench():
+    lib.set_backend("python")
+    n = 200
+    print(f"--- Tridiagonal system, n = {n} (python backend) ---")
+    B = poisson(n)
+    A = B.to_matrix()
+    b = Vector([random.uniform(-1., 1.) for _ in range(n)])
+    start = time.perf_counter()
+    A.solve(b)
+    t_dense = time.perf_counter() - start
+    start = time.perf_counter()
+    B.solve(b)
+    t_band = time.perf_counter() - start
+    print(f"dense solve {t_dense:.4f}s  banded {t_band:.4f}s "
+          f"({t_dense / t_band:.0f}x)")
+
+    n = 100_000
+    print(f"--- n = {n} ---")
+    B = poisson(n)
+    b = Vector([1.] * n)
+    for label, func in (("mul_vec", lambda: B.mul_vec(b)),
+                        ("Thomas solve", lambda: B.solve(b)),
+                        ("determinant", B.determinant)):
+        start = time.perf_counter()
+        func()
+        print(f"{label:>13}: {time.perf_counter() - start:.3f}s")
+    B = BandedMatrix.from_diagonals({d: [random.uniform(-1., 1.)
+                                         for _ in range(n - abs(d))]
+                                     for d in range(-2, 3)})
+    start = time.perf_counter()
+    B.solve(b)
+    print(f"{'5-band LU':>13}: {time.perf_counter() - start:.3f}s")
+    lib.set_backend("auto")
+
+
+def main():
+    try:
+        test_storage()
+        test_operations()
+        print("All tests passed.")
+    except AssertionError:
+        print("Some tests failed.")
+
+    if "--bench" in sys.argv:
+        bench()
+
+
+if __name__ == "__main__":
+    main()
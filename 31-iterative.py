@@ -0,0 +1,242 @@
+"""
+                Iterative Solvers
+
+Gaussian elimination needs the entries of A and fills them in as it
+goes. Krylov methods only need products A ⋅ v: they build x from b,
+A ⋅ b, A^2 ⋅ b, ... and stop once the residual ||b - A ⋅ x|| is small.
+For sparse or implicit operators (stencils, banded matrices), one
+product is O(n) and a few hundred iterations beat an O(n^3) solve.
+
+            LinearOperator
+
+Any object with shape() and mul_vec(vec, out=None): Matrix,
+BandedMatrix, or FunctionOperator(shape, func) wrapping a function.
+
+    cg(A, b)           symmetric positive definite A: conjugate gradient,
+                       minimizes the A-norm of the error, O(n) memory
+    gmres(A, b)        any A: minimizes ||b - A ⋅ x|| over the Krylov
+                       space, restarted every lib.GMRES_RESTART vectors
+    bicgstab(A, b)     any A: two products per iteration, fixed memory
+
+Each returns (x, info): info.converged, info.iterations,
+info.residuals (||b - A ⋅ x|| after every iteration) and info.time.
+Work vectors are allocated once and updated in place.
+
+            Preconditioners
+
+The iteration count grows with the condition number of A. A
+preconditioner M ≈ A, cheap to invert, makes the solvers work on
+M^-1 ⋅ A instead:
+
+    JacobiPreconditioner(A)     M = diag(A)
+    ILUPreconditioner(A)        M = L ⋅ U, incomplete LU keeping the
+                                sparsity of A (ILU(0))
+
+    x, info = gmres(A, b, precond=ILUPreconditioner(A), restart=20)
+"""
+
+import random
+import sys
+import time
+import lib
+from lib import (BandedMatrix, FunctionOperator, ILUPreconditioner,
+                 JacobiPreconditioner, LinearOperator, Matrix, Vector,
+                 bicgstab, cg, gmres)
+
+
+def close(u: Vector, v: Vector, eps: float = 1e-8) -> bool:
+    return all(abs(x - y) < eps for x, y in zip(u.values, v.values))
+
+
+def poisson(n: int) -> BandedMatrix:
+    """Second difference matrix: 2 on the diagonal, -1 beside."""
+    return BandedMatrix.tridiagonal([-1.] * (n - 1), [2.] * n,
+                                    [-1.] * (n - 1))
+
+
+def convection_diffusion(k: int, wind: float = 0.4) -> BandedMatrix:
+    """
+    5-point stencil on a k x k grid with an upwind convection term:
+    non-symmetric, bandwidth k.
+    """
+    n = k * k
+    side = [0. if (i + 1) % k == 0 else -1. for i in range(n - 1)]
+    return BandedMatrix.from_diagonals({
+        -k: [-1.] * (n - k),
+        -1: [x * (1. + wind) for x in side],
+        0: [4.] * n,
+        1: [x * (1. - wind) for x in side],
+        k: [-1.] * (n - k),
+    })
+
+
+def random_vector(n: int) -> Vector:
+    return Vector([random.uniform(-1., 1.) for _ in range(n)])
+
+
+def test_operators():
+    print("--- Linear operators ---")
+    A = Matrix([[2., 1.], [1., 3.]])
+    stencil = FunctionOperator((2, 2), A.mul_vec)
+    for op in (A, poisson(4), stencil):
+        assert isinstance(op, LinearOperator)
+    assert not isinstance([[1., 0.], [0., 1.]], LinearOperator)
+    out = Vector([0., 0.])
+    assert stencil.mul_vec(Vector([1., 1.]), out) is out
+    assert out == Vector([3., 4.])
+
+    # The work vectors of the solvers are filled in place
+    B = poisson(5)
+    out = Vector([0.] * 5)
+    assert B.mul_vec(Vector([1.] * 5), out) is out
+    assert out == Vector([1., 0., 0., 0., 1.])
+    try:
+        B.mul_vec(out, out)
+        assert False
+    except ValueError:
+        pass
+
+    for bad in (lambda: cg(FunctionOperator((3, 2), A.mul_vec),
+                           Vector([1., 1., 1.])),
+                lambda: gmres(A, Vector([1., 1., 1.])),
+                lambda: ILUPreconditioner(stencil),
+                lambda: JacobiPreconditioner(Matrix([[0., 1.], [1., 0.]]))):
+        try:
+            bad()
+            assert False
+        except ValueError:
+            pass
+
+
+def test_conjugate_gradient():
+    print("--- Conjugate gradient ---")
+    B = poisson(40)
+    b = random_vector(40)
+    x, info = cg(B, b)
+    assert info.converged and close(x, B.solve(b))
+    assert len(info.residuals) == info.iterations + 1
+    assert info.residuals[-1] <= lib.ITERATIVE_TOL * b.norm()
+    assert info.time >= 0.
+
+    # Same system, dense storage and implicit stencil
+    dense = B.to_matrix()
+    dense.backend = "python"
+    assert close(cg(dense, b)[0], x)
+
+    def stencil(v: Vector) -> Vector:
+        u = v.values
+        return Vector([2. * u[i] - (u[i - 1] if i else 0.)
+                       - (u[i + 1] if i + 1 < len(u) else 0.)
+                       for i in range(len(u))])
+
+    assert close(cg(FunctionOperator((40, 40), stencil), b)[0], x)
+
+    # Badly scaled D * B * D: the Jacobi preconditioner rescales it
+    scale = [10. ** (i % 4) for i in range(40)] + [0.]
+    S = BandedMatrix(40, 1, 1, [[x * scale[i] * scale[i + k - 1]
+                                 for k, x in enumerate(row)]
+                                for i, row in enumerate(B.rows)])
+    plain = cg(S, b)[1]
+    jacobi = cg(S, b, precond=JacobiPreconditioner(S))[1]
+    assert jacobi.converged and jacobi.iterations < plain.iterations
+
+    # Not enough iterations, then a good initial guess
+    x, info = cg(B, b, max_iter=3)
+    assert not info.converged and info.iterations == 3
+    assert cg(B, b, x0=B.solve(b))[1].iterations == 0
+    assert cg(B, Vector([0.] * 40))[0] == Vector([0.] * 40)
+
+    try:
+        cg(Matrix([[-1., 0.], [0., -1.]]), Vector([1., 1.]))
+        assert False
+    except ValueError:
+        pass
+
+
+def test_nonsymmetric():
+    print("--- GMRES and BiCGSTAB ---")
+    A = convection_diffusion(6)
+    b = random_vector(36)
+    expected = A.solve(b)
+    ilu = ILUPreconditioner(A)
+    for solver in (gmres, bicgstab):
+        x, info = solver(A, b)
+        assert info.converged and close(x, expected)
+        x, pre = solver(A, b, precond=ilu)
+        assert pre.converged and close(x, expected)
+        assert pre.iterations < info.iterations
+        x, pre = solver(A, b, precond=JacobiPreconditioner(A))
+        assert pre.converged and close(x, expected)
+
+    # Short restarts converge more slowly, but converge
+    full = gmres(A, b, restart=36)[1]
+    short = gmres(A, b, restart=4)[1]
+    assert short.converged and short.iterations > full.iterations
+    # Without restart, residuals never increase
+    assert all(y <= x * (1 + 1e-12) for x, y
+               in zip(full.residuals, full.residuals[1:]))
+    try:
+        gmres(A, b, restart=0)
+        assert False
+    except ValueError:
+        pass
+
+    # ILU(0) of a tridiagonal matrix is its exact LU
+    B = poisson(20)
+    b = random_vector(20)
+    x, info = gmres(B, b, precond=ILUPreconditioner(B))
+    assert info.iterations == 1 and close(x, B.solve(b))
+    D = Matrix([[4., 1., 0.], [1., 4., 1.], [0., 1., 4.]])
+    assert close(bicgstab(D, Vector([5., 6., 5.]))[0], Vector([1., 1., 1.]))
+
+
+def timed(func):
+    start = time.perf_counter()
+    res = func()
+    return res, time.perf_counter() - start
+
+
+def bench():
+    lib.set_backend("python")
+    k = 30
+    A = convection_diffusion(k)
+    b = random_vector(k * k)
+    print(f"--- Convection-diffusion, {k} x {k} grid, n = {k * k} ---")
+    _, t = timed(lambda: A.solve(b))
+    print(f"{'banded LU':>18}: {t:.3f}s")
+    ilu, t = timed(lambda: ILUPreconditioner(A))
+    print(f"{'ILU(0) setup':>18}: {t:.3f}s")
+    for name, solver in (("gmres", gmres), ("bicgstab", bicgstab)):
+        for label, precond in (("", None), ("+ILU", ilu)):
+            _, info = solver(A, b, precond=precond)
+            print(f"{name + label:>18}: {info.time:.3f}s "
+                  f"{info.iterations:>4} iterations")
+    k = 50
+    A = convection_diffusion(k, wind=0.)
+    b = random_vector(k * k)
+    print(f"--- 2D Poisson (SPD), {k} x {k} grid, n = {k * k} ---")
+    _, t = timed(lambda: A.solve(b))
+    print(f"{'banded LU':>18}: {t:.3f}s")
+    ilu = ILUPreconditioner(A)
+    for label, precond in (("cg", None), ("cg+ILU", ilu)):
+        _, info = cg(A, b, precond=precond)
+        print(f"{label:>18}: {info.time:.3f}s "
+              f"{info.iterations:>4} iterations")
+    lib.set_backend("auto")
+
+
+def main():
+    try:
+        test_operators()
+        test_conjugate_gradient()
+        test_nonsymmetric()
+        print("All tests passed.")
+    except AssertionError:
+        print("Some tests failed.")
+
+    if "--bench" in sys.argv:
+        bench()
+
+
+if __name__ == "__main__":
+    main()
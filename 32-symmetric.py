@@ -0,0 +1,176 @@
+"""
+                Symmetric Packed Storage
+
+Covariance, scatter and kernel matrices are symmetric: A[i][j] = A[j][i].
+Storing both triangles wastes half the memory, and computing them with
+
+    A.transpose().mul_mat(A)
+
+builds a transposed copy of A and computes every inner product twice.
+
+            Packed storage
+
+SymmetricMatrix keeps the upper triangle, row by row, in one list:
+
+    [a b c]
+    [b d e]     ->   values = [a, b, c, d, e, f]     n (n + 1) / 2 values
+    [c e f]
+
+mul_vec reads each stored entry once: row i gives y[i], and the same
+entries, as column i of the lower triangle, update y[i + 1:].
+
+            Gram matrix (syrk)
+
+    A.gram()              = A^T ⋅ A     inner products of the columns
+    A.gram(rows=True)     = A ⋅ A^T     inner products of the rows
+
+Only the upper triangle is computed, straight from the rows of A: A^T ⋅ A
+is the sum of the rank-1 products a^T ⋅ a of every row a, so samples
+can also be accumulated batch by batch (BLAS syrk):
+
+    C = SymmetricMatrix(n)
+    for batch in batches:
+        C.syrk(batch)             C += batch^T ⋅ batch
+"""
+
+import random
+import sys
+import time
+import tracemalloc
+import lib
+from lib import Matrix, SymmetricMatrix, Vector, cg
+
+
+def random_matrix(rows: int, cols: int) -> Matrix:
+    return Matrix([[random.uniform(-1., 1.) for _ in range(cols)]
+                   for _ in range(rows)])
+
+
+def close(u: Vector, v: Vector, eps: float = 1e-9) -> bool:
+    return all(abs(x - y) < eps for x, y in zip(u.values, v.values))
+
+
+def test_packed_storage():
+    print("--- Packed storage ---")
+    A = Matrix([[1., 2., 3.],
+                [2., 4., 5.],
+                [3., 5., 6.]])
+    S = SymmetricMatrix.from_matrix(A)
+    assert S.values == [1., 2., 3., 4., 5., 6.]
+    assert S[2, 1] == S[1, 2] == 5. and S.shape() == (3, 3)
+    assert S.to_matrix() == A
+    S[2, 0] = 7.
+    assert S[0, 2] == 7. and S.values[2] == 7.
+
+    for bad in (lambda: SymmetricMatrix.from_matrix(Matrix([[1., 2.],
+                                                            [3., 4.]])),
+                lambda: SymmetricMatrix(3, [1., 2.]),
+                lambda: SymmetricMatrix(0)):
+        try:
+            bad()
+            assert False
+        except ValueError:
+            pass
+    try:
+        S[3, 0]
+        assert False
+    except IndexError:
+        pass
+
+
+def test_mul_vec():
+    print("--- Symmetric mul_vec ---")
+    A = random_matrix(7, 7)
+    A = A.add(A.transpose())
+    S = SymmetricMatrix.from_matrix(A)
+    x = Vector([random.uniform(-1., 1.) for _ in range(7)])
+    assert close(S.mul_vec(x), A.mul_vec(x))
+    out = Vector([0.] * 7)
+    assert S.mul_vec(x, out) is out and close(out, A.mul_vec(x))
+    # A zero entry in x skips its column update
+    x[3] = 0.
+    assert close(S.mul_vec(x, out), A.mul_vec(x))
+    try:
+        S.mul_vec(out, out)
+        assert False
+    except ValueError:
+        pass
+
+    # A LinearOperator: SPD systems go to conjugate gradient
+    G = random_matrix(10, 5).gram()
+    for i in range(5):
+        G[i, i] += 1.
+    b = Vector([1., 2., 3., 4., 5.])
+    x, info = cg(G, b, precond=lib.JacobiPreconditioner(G))
+    assert info.converged and close(G.mul_vec(x), b)
+
+
+def test_gram():
+    print("--- Gram matrix ---")
+    A = random_matrix(6, 4)
+    G = A.gram()
+    assert G.n == 4
+    assert G.to_matrix() == A.transpose().mul_mat(A)
+    K = A.gram(rows=True)
+    assert K.n == 6
+    assert K.to_matrix() == A.mul_mat(A.transpose())
+    assert Matrix([[1, 2], [3, 4]]).gram().values == [10, 14, 20]
+
+    # Accumulated batch by batch
+    C = SymmetricMatrix(4)
+    for batch in (A.values[:2], A.values[2:5], A.values[5:]):
+        C.syrk(Matrix(batch))
+    assert C == G
+    C.syrk(A, alpha=-1)
+    assert all(abs(x) < 1e-12 for x in C.values)
+    try:
+        C.syrk(random_matrix(2, 3))
+        assert False
+    except ValueError:
+        pass
+
+
+def timed(func):
+    start = time.perf_counter()
+    res = func()
+    return res, time.perf_counter() - start
+
+
+def bench():
+    lib.set_backend("python")
+    rows, cols = 400, 120
+    print(f"--- Scatter matrix of {rows} samples x {cols} features ---")
+    A = random_matrix(rows, cols)
+    _, t_full = timed(lambda: A.transpose().mul_mat(A))
+    G, t_gram = timed(A.gram)
+    print(f"transpose + mul_mat {t_full:.3f}s  gram {t_gram:.3f}s "
+          f"({t_full / t_gram:.1f}x)")
+
+    x = Vector([1.] * cols)
+    for label, build in (("Matrix", G.to_matrix),
+                         ("packed", lambda: SymmetricMatrix(
+                             cols, list(G.values)))):
+        tracemalloc.start()
+        obj = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        _, t = timed(lambda: [obj.mul_vec(x) for _ in range(50)])
+        print(f"{label:>7}: {size / 1024:.0f} KiB, 50 mul_vec {t:.3f}s")
+    lib.set_backend("auto")
+
+
+def main():
+    try:
+        test_packed_storage()
+        test_mul_vec()
+        test_gram()
+        print("All tests passed.")
+    except AssertionError:
+        print("Some tests failed.")
+
+    if "--bench" in sys.argv:
+        bench()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+                Block Matrices
+
+Large systems are often assembled from sub-blocks, many of them zero
+or identity. The KKT (saddle point) system of a constrained problem:
+
+    [ H    C^T ]   [x]   [g]          H: n x n, often banded
+    [ C     0  ] ⋅ [y] = [h]          C: m x n constraints
+
+Flattened into one Matrix, the zero block costs m^2 numbers and every
+product multiplies it. BlockMatrix keeps the grid:
+
+    K = BlockMatrix([[H, C.transpose()],
+                     [C, None]])              None: zero block
+
+Each block keeps its type (Matrix, BandedMatrix, SymmetricMatrix,
+BandedMatrix.identity(n)) and block products pick the kernel of the
+pair: zero blocks are skipped, identities copied, diagonal blocks scale
+rows or columns, banded blocks use their O(n ⋅ bandwidth) mul_vec.
+
+            Block elimination
+
+    [A  B]   [I        0] [A  B              ]
+    [C  D] = [C A^-1   I] [0  D - C A^-1 B   ]    Schur complement
+
+solve and determinant only factor the diagonal blocks:
+
+    det(K) = det(A) ⋅ det(D - C A^-1 B)
+
+Zero blocks below the diagonal need no elimination. When a diagonal
+block is zero or singular, both fall back to dense elimination.
+"""
+
+import random
+import sys
+import time
+import lib
+from lib import BandedMatrix, BlockMatrix, Matrix, Vector
+
+
+def random_matrix(rows: int, cols: int) -> Matrix:
+    return Matrix([[random.uniform(-1., 1.) for _ in range(cols)]
+                   for _ in range(rows)])
+
+
+def close(u: Vector, v: Vector, eps: float = 1e-8) -> bool:
+    return all(abs(x - y) < eps for x, y in zip(u.values, v.values))
+
+
+def random_vector(n: int) -> Vector:
+    return Vector([random.uniform(-1., 1.) for _ in range(n)])
+
+
+def mixed_blocks() -> BlockMatrix:
+    """3 x 3 grid of every block kind, non-singular leading blocks."""
+    T = BandedMatrix.tridiagonal([1.] * 3, [4.] * 4, [-1.] * 3)
+    S = random_matrix(3, 3).gram()
+    for i in range(3):
+        S[i, i] += 3.
+    return BlockMatrix([
+        [T, random_matrix(4, 3), None],
+        [random_matrix(3, 4), S, BandedMatrix.identity(3)],
+        [None, random_matrix(3, 3), Matrix([[5., 1., 0.],
+                                            [1., 3., 1.],
+                                            [0., 2., 4.]])],
+    ])
+
+
+def test_structure():
+    print("--- Block structure ---")
+    A = Matrix([[1., 2.], [3., 4.]])
+    K = BlockMatrix([[A, BandedMatrix.identity(2)],
+                     [None, Matrix([[5., 6.], [7., 8.]])]])
+    assert K.shape() == (4, 4)
+    assert K.row_sizes == [2, 2] and K.col_sizes == [2, 2]
+    assert K.to_matrix() == Matrix([[1., 2., 1., 0.],
+                                    [3., 4., 0., 1.],
+                                    [0., 0., 5., 6.],
+                                    [0., 0., 7., 8.]])
+    assert K.transpose().to_matrix() == K.to_matrix().transpose()
+    assert BlockMatrix([[A, None], [None, None]], [2, 1], [2, 3]) \
+        .shape() == (3, 5)
+
+    for bad in (lambda: BlockMatrix([[A, None], [None, None]]),
+                lambda: BlockMatrix([[A, Matrix([[1.]])]]),
+                lambda: BlockMatrix([[A], [A, A]]),
+                lambda: BlockMatrix([])):
+        try:
+            bad()
+            assert False
+        except ValueError:
+            pass
+
+    B = BandedMatrix.from_diagonals({-1: [1., 2.], 0: [3., 4., 5.],
+                                     2: [6.]})
+    assert B.transpose().to_matrix() == B.to_matrix().transpose()
+
+
+def test_products():
+    print("--- Block products ---")
+    K = mixed_blocks()
+    dense = K.to_matrix()
+    x = random_vector(10)
+    assert close(K.mul_vec(x), dense.mul_vec(x))
+    out = Vector([0.] * 10)
+    assert K.mul_vec(x, out) is out
+    assert isinstance(K, lib.LinearOperator)
+
+    P = K.mul_mat(K.transpose())
+    assert P.to_matrix() == dense.mul_mat(dense.transpose())
+
+    # Zero blocks stay zero, identities and diagonals keep their type
+    D = BandedMatrix.from_diagonals({0: [2., 3.]})
+    A = random_matrix(2, 2)
+    B = BandedMatrix.tridiagonal([1.], [2., 3.], [4.])
+    L = BlockMatrix([[BandedMatrix.identity(2), None], [None, D]])
+    R = BlockMatrix([[A, None], [None, B]])
+    LR = L.mul_mat(R)
+    assert LR.blocks[0][1] is None and LR.blocks[1][0] is None
+    assert LR.blocks[0][0] == A and LR.blocks[0][0] is not A
+    assert isinstance(LR.blocks[1][1], BandedMatrix)
+    assert LR.to_matrix() == L.to_matrix().mul_mat(R.to_matrix())
+    assert R.mul_mat(L).to_matrix() == R.to_matrix().mul_mat(L.to_matrix())
+    try:
+        K.mul_mat(L)
+        assert False
+    except ValueError:
+        pass
+
+
+def test_solve_determinant():
+    print("--- Block solve and determinant ---")
+    K = mixed_blocks()
+    dense = K.to_matrix()
+    b = random_vector(10)
+    assert close(K.mul_vec(K.solve(b)), b)
+    # Reference: LU with partial pivoting of the dense matrix
+    expected = BandedMatrix.from_matrix(dense).determinant()
+    assert abs(K.determinant() - expected) < 1e-9 * abs(expected)
+
+    # Saddle point: the zero block gets the Schur complement -C H^-1 C^T
+    H = BandedMatrix.tridiagonal([-1.] * 5, [4.] * 6, [-1.] * 5)
+    C = random_matrix(2, 6)
+    KKT = BlockMatrix([[H, C.transpose()], [C, None]])
+    b = random_vector(8)
+    assert close(KKT.mul_vec(KKT.solve(b)), b)
+
+    # Zero leading block: dense fallback
+    I2 = BandedMatrix.identity(2)
+    swap = BlockMatrix([[None, I2], [I2, None]])
+    assert swap.determinant() == 1.
+    assert close(swap.solve(Vector([1., 2., 3., 4.])),
+                 Vector([3., 4., 1., 2.]))
+    swap = BlockMatrix([[None, Matrix([[1.]])], [Matrix([[1.]]), None]])
+    assert swap.determinant() == -1.
+
+    singular = BlockMatrix([[Matrix([[1., 2.], [2., 4.]]), None],
+                            [None, I2]])
+    assert singular.determinant() == 0.
+    try:
+        singular.solve(Vector([1., 1., 1., 1.]))
+        assert False
+    except ValueError:
+        pass
+
+
+def timed(func):
+    start = time.perf_counter()
+    res = func()
+    return res, time.perf_counter() - start
+
+
+def bench():
+    lib.set_backend("python")
+    n, m = 300, 10
+    print(f"--- Saddle point system, H {n} x {n} tridiagonal, "
+          f"{m} constraints ---")
+    H = BandedMatrix.tridiagonal([-1.] * (n - 1), [4.] * n, [-1.] * (n - 1))
+    C = random_matrix(m, n)
+    K = BlockMatrix([[H, C.transpose()], [C, None]])
+    dense = K.to_matrix()
+    b = random_vector(n + m)
+    _, t_dense = timed(lambda: dense.solve(b, spd=False))
+    _, t_block = timed(lambda: K.solve(b))
+    print(f"solve        dense {t_dense:.3f}s  block {t_block:.3f}s "
+          f"({t_dense / t_block:.0f}x)")
+    _, t_dense = timed(lambda: [dense.mul_vec(b) for _ in range(20)])
+    _, t_block = timed(lambda: [K.mul_vec(b) for _ in range(20)])
+    print(f"20 mul_vec   dense {t_dense:.3f}s  block {t_block:.3f}s "
+          f"({t_dense / t_block:.0f}x)")
+    lib.set_backend("auto")
+
+
+def main():
+    try:
+        test_structure()
+        test_products()
+        test_solve_determinant()
+        print("All tests passed.")
+    except AssertionError:
+        print("Some tests failed.")
+
+    if "--bench" in sys.argv:
+        bench()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+                Summation Accuracy
+
+dot, norm, mul_vec and mul_mat all sum products. The default chain
+
+    acc = fma(x, y, acc)
+
+rounds once per term, but every term waits for the previous one and
+the rounding errors add up: the error bound grows with n ⋅ ε. Summing
+a million times 0.1 this way is already wrong from the 11th digit.
+
+            Modes
+
+    "fma"        the chain above (default)
+    "fast"       sum(map(mul, u, v)): the same sum, with the loop in C
+                 (on Python 3.12+, sum() of floats is itself compensated)
+    "pairwise"   fma chains of lib.PAIRWISE_BLOCK terms, then a tree of
+                 additions: error ~ log(n) ⋅ ε
+    "kahan"      carries the rounding error of every addition into the
+                 next term
+    "neumaier"   Kahan that also survives terms larger than the sum, plus
+                 the exact error of each product (fma(x, y, -x ⋅ y)):
+                 as if computed with twice the precision
+    "sumprod"    math.sumprod (Python 3.12+), extended precision in C
+
+Unrolling the chain into independent accumulators, the usual trick in
+C, does not pay in CPython: the interpreter, not the dependency chain,
+is the bottleneck.
+
+    lib.set_summation("neumaier")        global
+    u.dot(v, summation="pairwise")       per call: dot, norm, mul_vec,
+                                         mul_mat
+
+Complex values always use the fma chain. The NumPy backend sums with
+BLAS whatever the mode.
+"""
+
+import random
+import sys
+import time
+from fractions import Fraction
+import lib
+from lib import Matrix, Vector
+
+MODES = [m for m in lib.SUMMATIONS if m != "sumprod" or lib.sumprod]
+
+
+def exact_dot(u: list, v: list) -> Fraction:
+    return sum(Fraction(x) * Fraction(y) for x, y in zip(u, v))
+
+
+def error(value, u: list, v: list) -> float:
+    return abs(float(Fraction(value) - exact_dot(u, v)))
+
+
+def test_modes():
+    print("--- Summation modes ---")
+    assert lib.get_summation() == "fma"
+    for bad in ("double", None):
+        try:
+            lib.set_summation(bad)
+            assert False
+        except ValueError:
+            pass
+    try:
+        Vector([1.]).dot(Vector([1.]), summation="double")
+        assert False
+    except ValueError:
+        pass
+
+    u = Vector([1., 2., 3.], backend="python")
+    v = Vector([4., 5., 6.], backend="python")
+    A = Matrix([[1., 2.], [3., 4.]], backend="python")
+    for mode in MODES:
+        assert u.dot(v, summation=mode) == 32.
+        assert u.norm(summation=mode) == 14 ** 0.5
+        assert A.mul_vec(Vector([1., 1.]), summation=mode) == \
+            Vector([3., 7.])
+        assert A.mul_mat(A, summation=mode) == Matrix([[7., 10.],
+                                                       [15., 22.]])
+        assert A.mul_mat(A, "strassen", 1, summation=mode) == \
+            A.mul_mat(A)
+    # Complex values keep the Hermitian fma chain
+    z = Vector([1j, 2.], backend="python")
+    assert z.dot(z, summation="neumaier") == 5.
+
+
+def test_accuracy():
+    print("--- Accuracy ---")
+    # 1e16 + 1 rounds to 1e16: only the compensated sums keep the 1
+    u = Vector([1e16, 1., -1e16], backend="python")
+    ones = Vector([1., 1., 1.], backend="python")
+    assert u.dot(ones) == 0.
+    assert u.dot(ones, summation="neumaier") == 1.
+    if lib.sumprod:
+        assert u.dot(ones, summation="sumprod") == 1.
+
+    # Product errors: x * x is not exact, neumaier recovers it
+    x = 1. + 2. ** -30
+    w = Vector([x, -1.], backend="python")
+    v = Vector([x, 1. + 2. ** -29], backend="python")
+    assert w.dot(v, summation="neumaier") == 2. ** -60
+
+    # Error growth of a long sum
+    n = 100_000
+    tenths = Vector([0.1] * n, backend="python")
+    ones = Vector([1.] * n, backend="python")
+    errors = {mode: error(tenths.dot(ones, summation=mode),
+                          tenths.values, ones.values) for mode in MODES}
+    assert errors["pairwise"] < errors["fma"] / 100
+    for mode in ("kahan", "neumaier", "sumprod"):
+        if mode in errors:
+            assert errors[mode] <= 1e-12
+
+    # Global mode, used by every product
+    lib.set_summation("neumaier")
+    try:
+        A = Matrix([[1e16, 1., -1e16]], backend="python")
+        assert A.mul_vec(Vector([1., 1., 1.])) == Vector([1.])
+        assert A.mul_mat(Matrix([[1.], [1.], [1.]])) == Matrix([[1.]])
+    finally:
+        lib.set_summation("fma")
+
+
+def ill_conditioned(n: int):
+    """Terms of very different magnitudes that mostly cancel."""
+    half = [random.uniform(-1., 1.) * 10. ** random.randint(-8, 8)
+            for _ in range(n // 2)]
+    u = half + [-x for x in half]
+    v = [1. + random.uniform(-1e-9, 1e-9) for _ in range(n)]
+    order = list(range(n))
+    random.shuffle(order)
+    return [u[i] for i in order], [v[i] for i in order]
+
+
+def bench():
+    lib.set_backend("python")
+    n = 200_000
+    cases = {
+        "random": ([random.uniform(-1., 1.) for _ in range(n)],
+                   [random.uniform(-1., 1.) for _ in range(n)]),
+        "cancelling": ill_conditioned(n),
+    }
+    for name, (u, v) in cases.items():
+        exact = exact_dot(u, v)
+        print(f"--- {n} products, {name} ---")
+        uu, vv = Vector(u), Vector(v)
+        for mode in MODES:
+            start = time.perf_counter()
+            res = uu.dot(vv, summation=mode)
+            elapsed = time.perf_counter() - start
+            err = abs(float(Fraction(res) - exact))
+            print(f"{mode:>9}: {elapsed * 1e3:7.2f} ms   "
+                  f"error {err:.2e}")
+    lib.set_backend("auto")
+
+
+def main():
+    try:
+        test_modes()
+        test_accuracy()
+        print("All tests passed.")
+    except AssertionError:
+        print("Some tests failed.")
+
+    if "--bench" in sys.argv:
+        bench()
+
+
+if __name__ == "__main__":
+    main()
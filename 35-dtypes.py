@@ -0,0 +1,320 @@
+"""
+                Data Types
+
+A list of floats stores a pointer (8 bytes) per element to a float
+object (24 bytes). The array module stores the raw numbers instead:
+
+    dtype       array code    bytes / element
+    float64         d               8
+    float32         f               4          (~7 significant digits)
+    int64           q               8
+    int32           i               4
+
+    v = Vector([0.1, 0.2, 0.3], dtype="float32")
+    A = Matrix(rows, dtype="int32")         one typed array per row
+    A.astype("float64")                     explicit conversion
+
+            Casting rules
+
+    result_dtype("float32", "float32") -> float32
+    result_dtype("int32", "int64")     -> int64
+    result_dtype("float32", "int32")   -> float64   (float32 cannot hold
+                                                     every int32)
+    result_dtype("float32", None)      -> float32   (untyped values and
+                                                     scalars adopt the dtype)
+
+add / sub / scl work in place and keep their dtype: storing a float
+that is not a whole number in an int dtype raises ValueError, an int
+out of range OverflowError, and so does assigning a row. mul_vec /
+mul_mat / transpose results take the promoted dtype, Vector.to_matrix
+and Matrix.pow (k >= 0) keep it, other methods return untyped results.
+can_cast(a, b) tells whether a conversion keeps every value.
+
+            Accumulation
+
+Typed values are read as Python numbers: float32 data is multiplied
+and summed in float64 and only rounded to float32 when stored. Int
+dtypes are summed exactly, in Python ints, and so are untyped ints
+multiplied with them. The NumPy backend reads the arrays without
+conversion (buffer protocol) and also accumulates float32 in float64,
+ints too: an int result past 2^53 computed as a float may be rounded,
+storing it in an int dtype raises ValueError.
+"""
+
+import random
+import sys
+import time
+import tracemalloc
+from array import array
+import lib
+from lib import Matrix, Vector
+
+
+def test_storage():
+    print("--- Typed storage ---")
+    v = Vector([1, 2, 3], dtype="float32")
+    assert v.dtype == "float32" and v.values.typecode == "f"
+    assert v.values.itemsize == 4 and v[1] == 2.
+    assert v == Vector([1., 2., 3.])
+    A = Matrix([[1, 2], [3, 4]], dtype="int32")
+    assert A.values[0].typecode == "i" and A[1, 1] == 4
+    assert Vector([1., 2.]).dtype is None
+
+    # float32 keeps ~7 digits
+    x = Vector([0.1], dtype="float32")[0]
+    assert x != 0.1 and abs(x - 0.1) < 1e-8
+    assert Vector([0.1], dtype="float64")[0] == 0.1
+
+    assert Vector([1.9, -1.9]).astype("int32") == Vector([1, -1])
+    B = A.astype("float32")
+    assert B.dtype == "float32" and B.values[0].typecode == "f"
+    assert A.astype(None).values == [[1, 2], [3, 4]]
+
+    # Reshaping and row assignment keep the dtype
+    M = Vector([1, 2, 3, 4], dtype="float32").to_matrix(2, 2)
+    assert M.dtype == "float32" and M == Matrix([[1., 2.], [3., 4.]])
+    assert all(row.typecode == "f" for row in M.values)
+    A[0] = [5, 6]
+    assert A.values[0].typecode == "i" and A == Matrix([[5, 6], [3, 4]])
+    A[:] = [[1, 2], [3, 4]]
+    assert all(row.typecode == "i" for row in A.values)
+    try:
+        A[1] = [0.5, 1]
+        assert False
+    except ValueError:
+        pass
+    assert A == Matrix([[1, 2], [3, 4]])
+
+    for bad in (lambda: Vector([1.5], dtype="int32"),
+                lambda: Vector([1.], dtype="float16"),
+                lambda: Vector([1j], dtype="float64")):
+        try:
+            bad()
+            assert False
+        except ValueError:
+            pass
+    try:
+        Vector([2 ** 40], dtype="int32")
+        assert False
+    except OverflowError:
+        pass
+
+
+def test_casting():
+    print("--- Casting rules ---")
+    assert lib.result_dtype("float32", "float32") == "float32"
+    assert lib.result_dtype("int32", "int64") == "int64"
+    assert lib.result_dtype("float32", "int32") == "float64"
+    assert lib.result_dtype("float64", "float32") == "float64"
+    assert lib.result_dtype(None, "int32", None) == "int32"
+    assert lib.result_dtype(None) is None
+    assert lib.can_cast("int32", "float64")
+    assert lib.can_cast("float32", "float32")
+    assert not lib.can_cast("float64", "float32")
+    assert not lib.can_cast("int64", "float64")
+
+    f32 = Matrix([[1., 2.], [3., 4.]], dtype="float32")
+    i32 = Vector([1, 1], dtype="int32")
+    assert f32.mul_vec(i32).dtype == "float64"
+    assert f32.mul_vec(Vector([1., 1.])).dtype == "float32"
+    assert f32.mul_mat(f32).dtype == "float32"
+    assert f32.transpose().dtype == "float32"
+    i64 = Matrix([[2, 0], [0, 2]], dtype="int64")
+    assert i64.mul_mat(Matrix([[1, 2], [3, 4]], dtype="int32")) == \
+        Matrix([[2, 4], [6, 8]])
+    # Other operations compute on Python numbers, results are untyped
+    assert f32.inverse().dtype is None
+    assert abs(f32.determinant() + 2.) < 1e-12
+
+    # A stored result computes like a fresh copy of its rounded values
+    random.seed(3)
+    rows = [[random.uniform(-1., 1.) for _ in range(4)] for _ in range(4)]
+    for backend in ("python", "numpy"):
+        if backend == "numpy" and not lib.module_available("numpy"):
+            continue
+        A = Matrix(rows, backend, "float32")
+        C = A.mul_mat(A)
+        copy = Matrix([list(row) for row in C.values], backend, "float32")
+        assert C.determinant() == copy.determinant()
+        x = C.mul_vec(Vector([1., 2., 3., 4.], dtype="float32"))
+        assert x.dot(x) == Vector(list(x.values), backend,
+                                  "float32").dot(x)
+
+
+def test_in_place():
+    print("--- In-place operations ---")
+    v = Vector([1, 2, 3], dtype="int32")
+    v.add(Vector([1., 1., 1.]))
+    assert v.dtype == "int32" and v.values.typecode == "i"
+    assert v == Vector([2, 3, 4])
+    try:
+        v.scl(0.5)
+        assert False
+    except ValueError:
+        pass
+    assert v == Vector([2, 3, 4]) and v.values.typecode == "i"
+    A = Matrix([[2 ** 30]], dtype="int32")
+    try:
+        A.add(A)
+        assert False
+    except OverflowError:
+        pass
+    assert A == Matrix([[2 ** 30]]) and A.values[0].typecode == "i"
+    # An overflow leaves the vector unchanged and still typed
+    v = Vector([2 ** 31 - 1], dtype="int32")
+    try:
+        v.add(Vector([1], dtype="int32"))
+        assert False
+    except OverflowError:
+        pass
+    assert v.values.typecode == "i" and v == Vector([2 ** 31 - 1])
+    v.sub(Vector([1], dtype="int32"))
+    assert v == Vector([2 ** 31 - 2]) and v.values.typecode == "i"
+
+    # A failure in a later element leaves every row unchanged
+    A = Matrix([[1, 2], [3, 4]], dtype="int64")
+    rows = A.values
+    for bad in (lambda: A.add(Matrix([[1, 0.5], [0, 0]])),
+                lambda: A.sub(Matrix([[0, 0], [0, 0.5]])),
+                lambda: A.scl(0.5)):
+        try:
+            bad()
+            assert False
+        except ValueError:
+            pass
+        assert A == Matrix([[1, 2], [3, 4]]) and A.values is rows
+        assert all(row.typecode == "q" for row in A.values)
+    A.add(Matrix([[1., 0.], [0., 1.]]))
+    assert A.values[0].typecode == "q" and A.values == [
+        array("q", [2, 2]), array("q", [3, 5])]
+
+    A = Matrix([[1., 2.], [3., 4.]], dtype="float32")
+    out = Vector([0., 0.], dtype="float32")
+    res = A.mul_vec(Vector([1., 1.]), out)
+    assert res is out and out.values.typecode == "f"
+    assert out == Vector([3., 7.])
+
+    # Every kernel writing into a typed out converts to its dtype
+    x = Vector([1., 2.])
+    for op in (lib.SymmetricMatrix(2, [1., 2., 3.]),
+               lib.BandedMatrix.from_diagonals({0: [1., 3.], 1: [2.],
+                                                -1: [2.]}),
+               lib.BlockMatrix([[Matrix([[1., 2.], [2., 3.]])]]),
+               lib.FunctionOperator((2, 2), lambda v: Vector([5., 8.]))):
+        out = Vector([0., 0.], dtype="float32")
+        values = out.values
+        assert op.mul_vec(x, out) is out and out.values is values
+        assert out.values.typecode == "f" and out == Vector([5., 8.])
+    lib.JacobiPreconditioner(A).apply(Vector([2., 8.]), out)
+    assert out.values.typecode == "f" and out == Vector([2., 2.])
+    lib.ILUPreconditioner(A).apply(Vector([3., 7.]), out)
+    assert out.values.typecode == "f" and out == Vector([1., 1.])
+
+    # Int matrix by an untyped int vector, into an int64 out
+    I = Matrix([[2, 3], [4, 5]], "python", "int64")
+    out = Vector([0, 0], dtype="int64")
+    assert I.mul_vec(Vector([1, 2]), out) == Vector([8, 14])
+    assert out.values.typecode == "q"
+    try:
+        I.mul_vec(Vector([0.25, 0.]), out)
+        assert False
+    except ValueError:
+        pass
+    assert out == Vector([8, 14]) and out.values.typecode == "q"
+
+
+def test_accumulation():
+    print("--- float64 accumulation ---")
+    random.seed(5)
+    n = 1000
+    u = Vector([random.uniform(-1., 1.) for _ in range(n)], "python",
+               "float32")
+    w = Vector([random.uniform(-1., 1.) for _ in range(n)], "python",
+               "float32")
+    # Same result as float64 vectors holding the rounded values
+    assert u.dot(w) == Vector(list(u.values)).dot(Vector(list(w.values)))
+    A = Matrix([list(u.values[:10])] * 3, "python", "float32")
+    res = A.mul_vec(Vector(list(w.values[:10]), dtype="float32"))
+    exact = Vector(list(u.values[:10])).dot(Vector(list(w.values[:10])))
+    assert res.values.typecode == "f" and abs(res[0] - exact) < 1e-7
+
+    # Int dtypes are exact, even past 2^53
+    big = Vector([2 ** 40, 2 ** 40, 1], "python", "int64")
+    assert big.dot(Vector([2 ** 20, 2 ** 20, 1], dtype="int64")) == \
+        2 ** 61 + 1
+    assert Matrix([[2 ** 40, 1]], "python", "int64").mul_vec(
+        Vector([2 ** 20, 1], dtype="int64"))[0] == 2 ** 60 + 1
+    # and so are untyped ints multiplied with them
+    exact = (2 ** 40 + 1) * (2 ** 20 + 1)
+    C = Matrix([[2 ** 40 + 1]], "python", "int64").mul_mat(
+        Matrix([[2 ** 20 + 1]]))
+    assert C.dtype == "int64" and C[0, 0] == exact
+    assert Vector([2 ** 40 + 1], "python", "int64").dot(
+        Vector([2 ** 20 + 1])) == exact
+    # A float kernel result past 2^53 may be rounded: it is not stored
+    # as an int
+    try:
+        Matrix([[2 ** 40 + 1]], "python", "int64").mul_mat(
+            Matrix([[2. ** 20 + 1]]))
+        assert False
+    except ValueError:
+        pass
+    if lib.module_available("numpy"):
+        try:
+            Matrix([[2 ** 40 + 1]], "numpy", "int64").mul_mat(
+                Matrix([[2 ** 20 + 1]]))
+            assert False
+        except ValueError:
+            pass
+
+
+def allocated(factory) -> int:
+    tracemalloc.start()
+    obj = factory()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del obj
+    return size
+
+
+def bench():
+    n = 1_000_000
+    values = [random.uniform(-1., 1.) for _ in range(n)]
+    print(f"--- Memory of a {n} element vector ---")
+    base = allocated(lambda: Vector([random.random() for _ in range(n)]))
+    print(f"{'list':>8}: {base / n:5.1f} bytes / element")
+    for dtype in ("float64", "float32"):
+        size = allocated(lambda: Vector(values, dtype=dtype))
+        print(f"{dtype:>8}: {size / n:5.1f} bytes / element "
+              f"({base / size:.0f}x less)")
+
+    print(f"--- dot of {n} elements (NumPy: first use, builds the "
+          f"ndarray) ---")
+    for backend in ("python", "numpy"):
+        if backend == "numpy" and not lib.module_available("numpy"):
+            continue
+        for dtype in (None, "float64", "float32"):
+            u = Vector(values, backend, dtype)
+            start = time.perf_counter()
+            u.dot(u)
+            elapsed = time.perf_counter() - start
+            print(f"{backend:>6} {dtype or 'list':>8}: "
+                  f"{elapsed * 1e3:7.1f} ms")
+
+
+def main():
+    try:
+        test_storage()
+        test_casting()
+        test_in_place()
+        test_accumulation()
+        print("All tests passed.")
+    except AssertionError:
+        print("Some tests failed.")
+
+    if "--bench" in sys.argv:
+        bench()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+                Pairwise Distances
+
+Clustering (k-means, k-NN, hierarchical) needs the distance between
+every row x of X (N x n) and every row y of Y (M x n): an N x M matrix.
+With Vector methods that is N ⋅ M subtractions and norms, each building
+a temporary vector.
+
+    D = lib.pairwise(X, Y, "euclidean")       D[i][j] = ||X[i] - Y[j]||
+    D = lib.pairwise(X)                       Y = X, symmetric, 0 diagonal
+
+            Metrics
+
+    "euclidean"       ||x - y||          (norm, see 04-norm-distance.py)
+    "euclidean_diff"  ||x - y||          from the differences, see below
+    "manhattan"       ||x - y||_1        (norm_1)
+    "chebyshev"       ||x - y||_inf      (norm_inf)
+    "cosine"          x.y / (||x|| ||y||), a similarity in [-1, 1]
+                      (see 05-cosine.py)
+
+The euclidean distance is expanded:
+
+    ||x - y||^2 = ||x||^2 + ||y||^2 - 2 x.y
+
+The norms are computed once per row, so each pair only costs a dot
+product: no difference vector. The subtraction cancels for points much
+closer to each other than to the origin. The error of about ε ⋅ ||x||^2
+is on the square, so the distance is off by about √ε ⋅ ||x||: two points
+1.1 apart near 1e8 come out at 0 (results are clamped at 0).
+"euclidean_diff" sums the squares of x - y instead (math.hypot): slower,
+but accurate to ε ⋅ ||x - y||.
+
+            Tiles, streaming, processes
+
+The rows of Y are processed by tiles of lib.PAIRWISE_TILE: every row of
+X uses a tile while it is still in cache.
+
+    for start, block in lib.pairwise_blocks(X, Y, rows=256):
+        ...                           block: rows start, ... of D
+
+yields D block by block of rows, so N x M never has to fit in memory.
+
+    with lib.Parallel(workers=4) as par:
+        D = par.pairwise(X, Y)
+        for start, block in par.pairwise_blocks(X, Y): ...
+
+split the rows of X between worker processes. Each task receives a copy
+of Y: blocks of many rows amortize it. The NumPy backend computes a
+block with one matrix product (euclidean, cosine).
+"""
+
+import random
+import sys
+import time
+import types
+import lib
+from lib import Matrix, Vector
+
+
+def random_matrix(rows: int, cols: int, backend: str = None) -> Matrix:
+    return Matrix([[random.uniform(-1., 1.) for _ in range(cols)]
+                   for _ in range(rows)], backend)
+
+
+def close(a: Matrix, b: Matrix, eps: float = 1e-9) -> bool:
+    return a.shape() == b.shape() and all(
+        abs(x - y) < eps for ra, rb in zip(a.values, b.values)
+        for x, y in zip(ra, rb))
+
+
+def reference(X: Matrix, Y: Matrix, metric: str) -> Matrix:
+    """Distances from the Vector methods, one pair at a time."""
+    rows = []
+    for x in X.values:
+        row = []
+        for y in Y.values:
+            u, v = Vector(list(x)), Vector(list(y))
+            if metric == "cosine":
+                row.append(u.dot(v) / (u.norm() * v.norm()))
+                continue
+            diff = Vector(list(x)).sub(v)
+            row.append({"euclidean": diff.norm,
+                        "euclidean_diff": diff.norm,
+                        "manhattan": diff.norm_1,
+                        "chebyshev": diff.norm_inf}[metric]())
+        rows.append(row)
+    return Matrix(rows)
+
+
+def test_metrics():
+    print("--- Metrics ---")
+    X = Matrix([[0., 0.], [3., 4.]])
+    Y = Matrix([[3., 0.], [0., -4.], [1., 1.]])
+    assert close(lib.pairwise(X, Y, "euclidean"),
+                 Matrix([[3., 4., 2 ** 0.5], [4., 73 ** 0.5, 13 ** 0.5]]))
+    assert close(lib.pairwise(X, Y, "manhattan"),
+                 Matrix([[3., 4., 2.], [4., 11., 5.]]))
+    assert close(lib.pairwise(X, Y, "chebyshev"),
+                 Matrix([[3., 4., 1.], [4., 8., 3.]]))
+    assert close(lib.pairwise(Y, Matrix([[3., 4.]]), "cosine"),
+                 Matrix([[.6], [-.8], [.7 * 2 ** 0.5]]))
+
+    X = random_matrix(20, 6)
+    Y = random_matrix(70, 6)
+    for metric in lib.PAIRWISE_METRICS:
+        D = lib.pairwise(X, Y, metric)
+        assert D.shape() == (20, 70)
+        assert close(D, reference(X, Y, metric))
+    # Integer data stays exact with the difference based metrics
+    A = Matrix([[1, 2], [4, -2]], "python")
+    assert lib.pairwise(A, metric="manhattan").values == [[0, 7], [7, 0]]
+
+    for bad in (lambda: lib.pairwise(X, Y, "hamming"),
+                lambda: lib.pairwise(X, random_matrix(3, 5)),
+                lambda: lib.pairwise(Matrix([[1j, 0.]])),
+                lambda: lib.pairwise(Matrix([[1., 0.], [0., 0.]]),
+                                     metric="cosine")):
+        try:
+            bad()
+            assert False
+        except ValueError:
+            pass
+
+
+def test_euclidean_expansion():
+    print("--- Euclidean expansion ---")
+    X = random_matrix(30, 8, "python")
+    D = lib.pairwise(X)
+    # Same dot products for ||x||^2 and x.x: the diagonal is exactly 0
+    assert all(D[i][i] == 0. for i in range(30))
+    assert all(D[i][j] == D[j][i] for i in range(30) for j in range(30))
+    # Cancellation never gives a negative square
+    near = Matrix([[1e8, 1e8 + 1e-7], [1e8, 1e8]], "python")
+    assert all(x >= 0. for row in lib.pairwise(near).values for x in row)
+
+    # Points 1.118 apart near 1e8: the expansion loses them, the
+    # differences do not
+    far = [[1e8, 1e8], [1e8 + 0.5, 1e8 + 1.]]
+    for backend in ("python", "numpy"):
+        if backend == "numpy" and not lib.module_available("numpy"):
+            continue
+        X = Matrix(far, backend)
+        assert lib.pairwise(X)[0][1] == 0.
+        assert lib.pairwise(X, metric="euclidean_diff")[0][1] == \
+            1.25 ** 0.5
+
+
+def test_streaming():
+    print("--- Streaming blocks ---")
+    X = random_matrix(45, 5)
+    Y = random_matrix(30, 5)
+    for metric in lib.PAIRWISE_METRICS:
+        blocks = lib.pairwise_blocks(X, Y, metric, rows=16)
+        assert isinstance(blocks, types.GeneratorType)
+        blocks = list(blocks)
+        assert [start for start, _ in blocks] == [0, 16, 32]
+        assert [b.shape() for _, b in blocks] == [(16, 30), (16, 30),
+                                                  (13, 30)]
+        rows = [row for _, b in blocks for row in b.values]
+        assert close(Matrix(rows), lib.pairwise(X, Y, metric))
+    # Errors are raised on the first block
+    try:
+        next(lib.pairwise_blocks(X, Y, rows=0))
+        assert False
+    except ValueError:
+        pass
+
+
+def test_parallel():
+    print("--- Parallel pairwise ---")
+    X = random_matrix(37, 4, "python")
+    Y = random_matrix(25, 4, "python")
+    for kind in ("threads", "processes"):
+        with lib.Parallel(workers=3, kind=kind) as par:
+            for metric in lib.PAIRWISE_METRICS:
+                assert par.pairwise(X, Y, metric) == \
+                    lib.pairwise(X, Y, metric)
+            assert list(par.pairwise_blocks(X, Y, "manhattan", 5)) == \
+                list(lib.pairwise_blocks(X, Y, "manhattan", 5))
+            assert par.pairwise(X) == lib.pairwise(X)
+
+
+def timed(func):
+    start = time.perf_counter()
+    res = func()
+    return res, time.perf_counter() - start
+
+
+def bench():
+    n, m, dim = 300, 300, 32
+    print(f"--- {n} x {m} euclidean distances, {dim} features ---")
+    X = random_matrix(n, dim, "python")
+    Y = random_matrix(m, dim, "python")
+    _, t_ref = timed(lambda: [[Vector(list(x)).sub(Vector(y)).norm()
+                               for y in Y.values] for x in X.values])
+    print(f"{'Vector sub + norm':>20}: {t_ref:.3f}s")
+    _, t = timed(lambda: lib.pairwise(X, Y))
+    print(f"{'pairwise':>20}: {t:.3f}s ({t_ref / t:.1f}x)")
+    _, t = timed(lambda: sum(1 for _ in lib.pairwise_blocks(X, Y)))
+    print(f"{'pairwise_blocks':>20}: {t:.3f}s")
+    with lib.Parallel() as par:
+        _, t = timed(lambda: par.pairwise(X, Y))
+        print(f"{f'{par.workers} {par.kind}':>20}: {t:.3f}s "
+              f"({t_ref / t:.1f}x)")
+    if lib.module_available("numpy"):
+        Xn = Matrix(X.values, "numpy")
+        _, t = timed(lambda: lib.pairwise(Xn, Y))
+        print(f"{'numpy':>20}: {t:.3f}s ({t_ref / t:.0f}x)")
+
+
+def main():
+    try:
+        test_metrics()
+        test_euclidean_expansion()
+        test_streaming()
+        test_parallel()
+        print("All tests passed.")
+    except AssertionError:
+        print("Some tests failed.")
+
+    if "--bench" in sys.argv:
+        bench()
+
+
+if __name__ == "__main__":
+    main()
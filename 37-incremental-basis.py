@@ -0,0 +1,204 @@
+"""
+                Incremental Basis
+
+Vectors arrive one at a time: is the new one linearly independent of
+those seen so far? Rebuilding a Matrix and calling rank() runs a full
+row echelon form every time, O(k^2 ⋅ n) for the k-th vector and
+O(k^3 ⋅ n) for the stream.
+
+IncrementalBasis keeps an orthonormal basis q1, ..., qk of their span
+(Gram-Schmidt). A new vector v is stripped of its components on the
+basis:
+
+    r = v - (q1 . v) q1 - (q2 . v) q2 - ... - (qk . v) qk
+
+v is independent when r is not ~0, and r / ||r|| joins the basis:
+O(n ⋅ k) per vector.
+
+            Reorthogonalization
+
+When v is almost in the span, r is the small difference of large terms
+and its rounding errors are no longer small compared to r: the new
+basis vector is not quite orthogonal to the others, and the error
+grows with every vector. If the first pass removed most of the norm,
+a second pass cleans r ("twice is enough").
+
+    basis = lib.IncrementalBasis(n)
+    basis.add(v)          True if v is independent (basis grows)
+    basis.project(v)      projection of v on the span
+    basis.residual(v)     v - project(v), orthogonal to the span
+    basis.rank()          number of independent vectors
+"""
+
+import random
+import sys
+import time
+import lib
+from lib import IncrementalBasis, Matrix, Vector
+
+
+def random_vector(n: int) -> Vector:
+    return Vector([random.uniform(-1., 1.) for _ in range(n)])
+
+
+def close(u: Vector, v: Vector, eps: float = 1e-9) -> bool:
+    return all(abs(x - y) < eps for x, y in zip(u.values, v.values))
+
+
+def orthogonality_loss(basis: IncrementalBasis) -> float:
+    """Largest entry of Q Q^T - I."""
+    q = basis.basis().values
+    return max(abs(sum(a * b for a, b in zip(u, v)) - (i == j))
+               for i, u in enumerate(q) for j, v in enumerate(q))
+
+
+def test_independence():
+    print("--- Independence ---")
+    basis = IncrementalBasis(3)
+    assert basis.add(Vector([1., 0., 0.]))
+    assert basis.add(Vector([1., 1., 0.]))
+    assert not basis.add(Vector([2., -3., 0.]))
+    assert not basis.add(Vector([0., 0., 0.]))
+    assert basis.rank() == 2
+    assert basis.add(Vector([1., 1., 1.]))
+    assert not basis.add(random_vector(3))
+    assert basis.rank() == 3 and orthogonality_loss(basis) < 1e-15
+
+    # Same answers as rank() on the matrix of every vector seen
+    random.seed(7)
+    n, r = 12, 5
+    spanning = [random_vector(n) for _ in range(r)]
+    basis = IncrementalBasis(n)
+    seen = []
+    for _ in range(15):
+        coefs = [random.uniform(-1., 1.) for _ in range(r)]
+        v = Vector([sum(c * s.values[i] for c, s in zip(coefs, spanning))
+                    for i in range(n)])
+        before = Matrix(seen).rank(1e-10) if seen else 0
+        seen.append(list(v.values))
+        assert basis.add(v) == (Matrix(seen).rank(1e-10) > before)
+    assert basis.rank() == r
+
+    # Complex vectors: 1j * v is in the span of v
+    basis = IncrementalBasis(2)
+    assert basis.add(Vector([1., 1j]))
+    assert not basis.add(Vector([1j, -1.]))
+    assert basis.add(Vector([1., -1j]))
+
+    # Tiny and huge vectors: their squares would underflow / overflow
+    for scale in (1e-170, 1e200):
+        basis = IncrementalBasis(2)
+        assert basis.add(Vector([scale, 0.]))
+        assert basis.add(Vector([scale, scale]))
+        assert orthogonality_loss(basis) < 1e-15
+        assert not basis.add(Vector([scale, -scale]))
+    basis = IncrementalBasis(2)
+    assert basis.add(Vector([1e200j, 1e200]))
+
+    for bad in (lambda: IncrementalBasis(0),
+                lambda: IncrementalBasis(2).add(Vector([1., 2., 3.]))):
+        try:
+            bad()
+            assert False
+        except ValueError:
+            pass
+
+
+def test_projection():
+    print("--- Projection ---")
+    basis = IncrementalBasis(3)
+    basis.add(Vector([1., 0., 0.]))
+    basis.add(Vector([1., 1., 0.]))
+    assert basis.project(Vector([3., 4., 5.])) == Vector([3., 4., 0.])
+    assert basis.residual(Vector([3., 4., 5.])) == Vector([0., 0., 5.])
+
+    n = 20
+    basis = IncrementalBasis(n)
+    vectors = [random_vector(n) for _ in range(6)]
+    for v in vectors:
+        basis.add(v)
+    for v in vectors:
+        assert close(basis.project(v), v)
+    x = random_vector(n)
+    p = basis.project(x)
+    assert close(basis.project(p), p)
+    r = basis.residual(x)
+    for q in basis.basis().values:
+        assert abs(Vector(q).dot(r)) < 1e-12
+    # Nothing to project on yet
+    assert IncrementalBasis(2).project(Vector([1., 2.])) == \
+        Vector([0., 0.])
+
+
+def test_reorthogonalization():
+    print("--- Reorthogonalization ---")
+    # Rows of the Hilbert matrix: independent, but nearly parallel
+    n = 10
+    hilbert = [Vector([1. / (i + j + 1) for j in range(n)])
+               for i in range(n)]
+    basis = IncrementalBasis(n, tol=0.)
+    assert all(basis.add(v) for v in hilbert)
+    assert orthogonality_loss(basis) < 1e-14
+
+    # A single Gram-Schmidt pass loses orthogonality
+    lib.REORTHOGONALIZE = 0.
+    try:
+        single = IncrementalBasis(n, tol=0.)
+        for v in hilbert:
+            single.add(v)
+        assert orthogonality_loss(single) > 1e-6
+    finally:
+        lib.REORTHOGONALIZE = 0.5 ** 0.5
+
+    # With the default tolerance, a vector within rounding of the span
+    # is dependent
+    basis = IncrementalBasis(3)
+    basis.add(Vector([1., 0., 0.]))
+    assert basis.add(Vector([1., 1e-10, 0.]))
+    assert not basis.add(Vector([1., 1e-17, 1e-17]))
+
+
+def bench():
+    lib.set_backend("python")
+    n, r, count = 40, 30, 60
+    print(f"--- {count} vectors of size {n}, spanning rank {r} ---")
+    spanning = [random_vector(n) for _ in range(r)]
+    stream = []
+    for _ in range(count):
+        coefs = [random.uniform(-1., 1.) for _ in range(r)]
+        stream.append([sum(c * s.values[i] for c, s in zip(coefs, spanning))
+                       for i in range(n)])
+
+    start = time.perf_counter()
+    seen, rank = [], 0
+    for v in stream:
+        seen.append(v)
+        rank = Matrix(seen).rank(1e-10)
+    t_rank = time.perf_counter() - start
+    print(f"{'rank() per vector':>20}: {t_rank:.3f}s  rank {rank}")
+
+    start = time.perf_counter()
+    basis = IncrementalBasis(n)
+    for v in stream:
+        basis.add(Vector(v))
+    t_basis = time.perf_counter() - start
+    print(f"{'IncrementalBasis':>20}: {t_basis:.3f}s  rank {basis.rank()} "
+          f"({t_rank / t_basis:.0f}x)")
+    lib.set_backend("auto")
+
+
+def main():
+    try:
+        test_independence()
+        test_projection()
+        test_reorthogonalization()
+        print("All tests passed.")
+    except AssertionError:
+        print("Some tests failed.")
+
+    if "--bench" in sys.argv:
+        bench()
+
+
+if __name__ == "__main__":
+    main()
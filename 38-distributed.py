@@ -0,0 +1,260 @@
+"""
+                Distributed Matrix Multiply
+
+lib.Parallel uses the cores of one machine. For larger products the
+work has to leave the machine: matrix/distributed.py sends tiles of the
+operands over TCP to worker processes, anywhere on the network.
+
+            Tiles
+
+    C = A * B         A: m x k         B: k x p
+
+C is cut into a grid of t x t tiles. Tile (i, j) needs the i-th block
+of t rows of A and the j-th block of t columns of B:
+
+    C[i][j] = A[i-th rows] * B[j-th columns]         t x k  *  k x t
+
+Tiles are independent: they are dealt to the workers round robin, and
+the coordinator reassembles C. Each tile is sent with its own blocks,
+2 t k values: for n x n operands that is 2 n^3 / t values in all, n / t
+times the operands. Larger tiles mean less traffic but fewer tiles to
+balance between the workers.
+
+            Binary matrix format
+
+    b"MTRX" | typecode | rows | cols | raw values (the typed array bytes)
+
+13 bytes of header, then 8 bytes per float64 (4 per float32 / int32):
+no text parsing, and no pickle (which would run code from the network).
+
+    data = lib.pack_matrix(A)
+    A, end = lib.unpack_matrix(data)
+
+            Faults
+
+A worker that cannot be reached, closes its connection, or does not
+answer within `timeout` seconds, is dropped; its tiles are dealt again
+to the other workers. Only the tile it was computing counts as lost
+(at most `retries` times per tile), not those it had not received.
+
+    with lib.Cluster.local(workers=4) as cluster:   localhost subprocesses
+        C = cluster.mul_mat(A, B, tile=64)
+
+    python -m matrix.distributed --host 0.0.0.0 --port 9000
+    lib.Cluster([("node1", 9000), ("node2", 9000)])
+"""
+
+import os
+import pickle
+import random
+import socket
+import sys
+import threading
+import time
+import lib
+from lib import Matrix
+
+
+def random_matrix(rows: int, cols: int) -> Matrix:
+    return Matrix([[random.uniform(-1., 1.) for _ in range(cols)]
+                   for _ in range(rows)])
+
+
+def close(a: Matrix, b: Matrix, eps: float = 1e-9) -> bool:
+    return a.shape() == b.shape() and all(
+        abs(x - y) < eps for ra, rb in zip(a.values, b.values)
+        for x, y in zip(ra, rb))
+
+
+def faulty_worker(hang: bool = False):
+    """
+    Listen on localhost, accept one connection and read the first
+    request. Then close the connection (lost tile), or with hang=True
+    never reply, until the coordinator times out. Returns the address.
+    """
+    server = socket.create_server(("127.0.0.1", 0))
+
+    def run():
+        conn, _ = server.accept()
+        conn.recv(1 << 16)
+        if hang:
+            time.sleep(2.)
+        conn.close()
+        server.close()
+
+    threading.Thread(target=run, daemon=True).start()
+    return server.getsockname()
+
+
+def test_binary_format():
+    print("--- Binary matrix format ---")
+    A = Matrix([[1.5, -2.], [0.25, 3.], [4., 5.]])
+    data = lib.pack_matrix(A)
+    assert data[:4] == b"MTRX" and len(data) == 13 + 6 * 8
+    B, end = lib.unpack_matrix(data)
+    assert B == A and B.dtype == "float64" and end == len(data)
+
+    I = Matrix([[1, -2 ** 31], [2 ** 31 - 1, 0]], dtype="int32")
+    F = Matrix([[0.1]], dtype="float32")
+    data = lib.pack_matrix(I) + lib.pack_matrix(F)
+    assert len(data) == 2 * 13 + 4 * 4 + 4
+    I2, end = lib.unpack_matrix(data)
+    F2, _ = lib.unpack_matrix(data, end)
+    assert I2 == I and I2.dtype == "int32" and I2.values[0].typecode == "i"
+    assert F2.dtype == "float32" and F2.values == F.values
+    # Untyped ints are sent as int64, exactly
+    data = lib.pack_matrix(Matrix([[2 ** 60 + 1, -1]]))
+    assert data[4:5] == b"q"
+    assert lib.unpack_matrix(data)[0].values[0].tolist() == [2 ** 60 + 1, -1]
+
+    for bad in (lambda: lib.pack_matrix(Matrix([[1j]])),
+                lambda: lib.pack_matrix(Matrix([[2 ** 63]])),
+                lambda: lib.unpack_matrix(b"MTRX"),
+                lambda: lib.unpack_matrix(b"JPEG" + data[4:]),
+                lambda: lib.unpack_matrix(data[:20])):
+        try:
+            bad()
+            assert False
+        except ValueError:
+            pass
+
+
+def test_distributed_mul_mat():
+    print("--- Distributed mul_mat ---")
+    A = random_matrix(23, 17)
+    B = random_matrix(17, 11)
+    with lib.Cluster.local(workers=2) as cluster:
+        assert cluster.alive() == 2
+        for tile in (1, 5, 8, 100):
+            assert close(cluster.mul_mat(A, B, tile), A.mul_mat(B))
+        # Int matrices are exact, and keep their dtype
+        I = Matrix([[2 ** 30, 1], [3, 4]], "python", "int64")
+        C = cluster.mul_mat(I, I, tile=1)
+        assert C.dtype == "int64" and C == I.mul_mat(I)
+        # Errors of the worker are raised, not retried
+        try:
+            cluster.mul_mat(I.scl(2 ** 20), I)
+            assert False
+        except ValueError:
+            assert cluster.alive() == 2
+        # Untyped operands give an untyped result
+        assert cluster.mul_mat(A, B).dtype is None
+        assert isinstance(cluster.mul_mat(A, B).values[0], list)
+        # and untyped ints stay exact past 2^53
+        U = Matrix([[2 ** 60, 1], [0, 1]])
+        C = cluster.mul_mat(U, Matrix([[1, 0], [1, 1]]))
+        assert C.dtype is None and C.values == [[2 ** 60 + 1, 1], [1, 1]]
+
+        for bad in (lambda: cluster.mul_mat(A, A),
+                    lambda: cluster.mul_mat(A, B, 0)):
+            try:
+                bad()
+                assert False
+            except ValueError:
+                pass
+    try:
+        lib.Cluster([])
+        assert False
+    except ValueError:
+        pass
+
+
+def test_fault_tolerance():
+    print("--- Lost tiles ---")
+    A = random_matrix(12, 6)
+    B = random_matrix(6, 12)
+    expected = A.mul_mat(B)
+    with lib.Cluster.local(workers=2) as local:
+        good = local.workers[0].address
+        # A worker closing the connection, one that never answers
+        cluster = lib.Cluster([faulty_worker(),
+                               faulty_worker(hang=True), good],
+                              timeout=0.5)
+        with cluster:
+            assert close(cluster.mul_mat(A, B, tile=3), expected)
+            assert cluster.alive() == 1
+
+        # A worker that cannot be reached loses no tile: its tiles are
+        # dealt again even without retries
+        server = socket.create_server(("127.0.0.1", 0))
+        down = server.getsockname()
+        server.close()
+        with lib.Cluster([down, good], retries=0) as cluster:
+            assert close(cluster.mul_mat(A, B, tile=3), expected)
+            assert cluster.alive() == 1
+        # One that fails loses the tile it was computing
+        with lib.Cluster([faulty_worker(), good], retries=0) as cluster:
+            try:
+                cluster.mul_mat(A, B, tile=3)
+                assert False
+            except ConnectionError:
+                pass
+
+        # A worker process killed
+        local.processes[1].kill()
+        local.processes[1].wait()
+        assert close(local.mul_mat(A, B, tile=3), expected)
+        assert local.alive() == 1
+
+    # No retry allowed, or no worker left
+    cluster = lib.Cluster([faulty_worker()], retries=0)
+    try:
+        cluster.mul_mat(A, B)
+        assert False
+    except ConnectionError:
+        pass
+    cluster = lib.Cluster([faulty_worker()], retries=5)
+    try:
+        cluster.mul_mat(A, B)
+        assert False
+    except ConnectionError:
+        pass
+
+
+def timed(func):
+    start = time.perf_counter()
+    res = func()
+    return res, time.perf_counter() - start
+
+
+def bench():
+    lib.set_backend("python")
+    n = 200
+    A = random_matrix(n, n)
+    B = random_matrix(n, n)
+    print(f"--- Encoding a {n} x {n} matrix ---")
+    data, t = timed(lambda: lib.pack_matrix(A))
+    _, t_back = timed(lambda: lib.unpack_matrix(data))
+    print(f"{'binary':>8}: {len(data) / 1024:6.0f} KiB  "
+          f"{t * 1e3:6.1f} ms + {t_back * 1e3:6.1f} ms")
+    data, t = timed(lambda: pickle.dumps(A.values))
+    _, t_back = timed(lambda: pickle.loads(data))
+    print(f"{'pickle':>8}: {len(data) / 1024:6.0f} KiB  "
+          f"{t * 1e3:6.1f} ms + {t_back * 1e3:6.1f} ms")
+
+    print(f"--- {n} x {n} mul_mat ---")
+    _, t_local = timed(lambda: A.mul_mat(B))
+    print(f"{'local':>12}: {t_local:.3f}s")
+    for workers in (1, 2, 4):
+        with lib.Cluster.local(workers, backend="python") as cluster:
+            _, t = timed(lambda: cluster.mul_mat(A, B, tile=50))
+        print(f"{f'{workers} workers':>12}: {t:.3f}s "
+              f"({t_local / t:.1f}x on {os.cpu_count()} cores)")
+    lib.set_backend("auto")
+
+
+def main():
+    try:
+        test_binary_format()
+        test_distributed_mul_mat()
+        test_fault_tolerance()
+        print("All tests passed.")
+    except AssertionError:
+        print("Some tests failed.")
+
+    if "--bench" in sys.argv:
+        bench()
+
+
+if __name__ == "__main__":
+    main()
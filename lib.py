@@ -1,33 +1,462 @@
-from typing import List, Tuple, TypeVar, Generic
-from math import fma
+from array import array
+from collections import OrderedDict, namedtuple
+from functools import wraps
+from itertools import repeat
+from typing import (Callable, Iterable, List, Protocol, Tuple, TypeVar,
+                    Generic, runtime_checkable)
+from math import fma, hypot, sqrt
+from operator import mul, sub
+from time import perf_counter
+from cmath import sqrt as csqrt
+from sys import float_info
+import importlib
+
+try:
+    from math import sumprod
+except ImportError:  # Python < 3.12
+    sumprod = None
 
 T = TypeVar("T")
 
+# Machine epsilon of floats, base of the rank / singularity tolerances
+EPSILON = float_info.epsilon
+
+# Names provided by the optional backends of the `matrix` package,
+# mapped to the module defining them. They are imported on first access
+# (lib.<name> or `from lib import <name>`) so `import lib` stays fast.
+_LAZY_ATTRS = {
+    "module_available": "matrix._optional",
+    "Cluster": "matrix.distributed",
+    "pack_matrix": "matrix.distributed",
+    "unpack_matrix": "matrix.distributed",
+    "Offloader": "matrix.aio",
+    "get_offloader": "matrix.aio",
+    "set_offloader": "matrix.aio",
+    "Parallel": "matrix.parallel",
+    "gil_enabled": "matrix.parallel",
+}
+
+
+def __getattr__(name: str):
+    """Import lazily loaded backend names on first use (PEP 562)."""
+    module = _LAZY_ATTRS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'lib' has no attribute '{name}'")
+    value = getattr(importlib.import_module(module), name)
+    # Cache it so the next access is a plain global lookup
+    globals()[name] = value
+    return value
+
 
 def abs(n: T) -> T:
+    # Modulus for complex numbers, which cannot be compared to 0
+    if isinstance(n, complex):
+        return hypot(n.real, n.imag)
     return -n if n < 0 else n
 
 
+def conj(n: T) -> T:
+    """Return the complex conjugate of n (n itself for real numbers)."""
+    return n.conjugate() if isinstance(n, complex) else n
+
+
+def cfma(a: T, b: T, c: T) -> T:
+    """
+    Multiply-add (a * b) + c for complex operands.
+    math.fma only accepts real numbers, so the complex case
+    falls back to a plain multiplication and addition.
+    """
+    return a * b + c
+
+
+def is_complex(values: Iterable) -> bool:
+    """Return True if any element of a flat or nested list is complex."""
+    for value in values:
+        if isinstance(value, list):
+            if is_complex(value):
+                return True
+        elif isinstance(value, complex):
+            return True
+    return False
+
+
+def fma_for(*values: Iterable) -> Callable:
+    """
+    Select the multiply-add kernel once for a whole operation:
+    math.fma on real data, cfma as soon as one operand is complex.
+    This keeps the float path free of per-element type checks.
+    """
+    for vals in values:
+        if is_complex(vals):
+            return cfma
+    return fma
+
+
+# ===========================================================================
+# ============================== Backends ===================================
+# ===========================================================================
+
+BACKENDS = ("auto", "python", "numpy")
+
+# Global backend, overridden per object with Vector(..., backend=...)
+_backend = "auto"
+
+# In "auto" mode, objects with fewer elements stay on the pure-Python
+# kernels: converting them to an ndarray costs more than it saves.
+NUMPY_MIN_SIZE = 256
+
+
+def set_backend(name: str):
+    """
+    Select the kernels used by Vector and Matrix:
+    "python" (pure Python), "numpy" (always NumPy) or "auto"
+    (NumPy for objects of at least NUMPY_MIN_SIZE elements, if installed).
+    """
+    global _backend
+    _backend = _check_backend(name)
+
+
+def get_backend() -> str:
+    """Return the global backend name."""
+    return _backend
+
+
+def _numpy_available() -> bool:
+    from matrix._optional import module_available
+    return module_available("numpy")
+
+
+def _check_backend(name: str) -> str:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend: {name}")
+    if name == "numpy" and not _numpy_available():
+        raise ValueError("The numpy backend needs NumPy to be installed.")
+    return name
+
+
+def _use_numpy(obj) -> bool:
+    backend = obj.backend or _backend
+    if backend == "python":
+        return False
+    if backend == "numpy":
+        return True
+    if isinstance(obj, Matrix):
+        rows, cols = obj.shape()
+        size = rows * cols
+    else:
+        size = obj.size()
+    return size >= NUMPY_MIN_SIZE and _numpy_available()
+
+
+def _dispatch(method):
+    """
+    Run a Vector / Matrix method with the NumPy kernel of the same name
+    (matrix.numpy_backend) when the object uses the NumPy backend.
+    """
+    name = method.__name__
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if _use_numpy(self):
+            kernels = importlib.import_module("matrix.numpy_backend")
+            return getattr(kernels, name)(self, *args, **kwargs)
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+# ===========================================================================
+# ============================== Summation ==================================
+# ===========================================================================
+
+SUMMATIONS = ("fma", "fast", "pairwise", "kahan", "neumaier", "sumprod")
+
+# Global summation mode of dot / norm / mul_vec / mul_mat, overridden
+# per call with summation=...
+_summation = "fma"
+
+# Products summed by one fma chain before the pairwise reduction
+PAIRWISE_BLOCK = 32
+
+
+def set_summation(mode: str):
+    """
+    Select how dot products are accumulated (real data, pure-Python
+    kernels; complex values always use the cfma chain):
+    "fma"       one math.fma chain, one rounding per term (default)
+    "fast"      sum(map(mul, u, v)), the loop runs in C
+    "pairwise"  fma chains over blocks of PAIRWISE_BLOCK products, then
+                a pairwise tree: error grows with log(n) instead of n
+    "kahan"     Kahan compensated sum of the products
+    "neumaier"  Neumaier compensated sum, plus the rounding error of
+                every product (recovered with fma): as accurate as a
+                dot product computed in twice the precision
+    "sumprod"   math.sumprod (Python 3.12+), extended precision
+    """
+    global _summation
+    _summation = _check_summation(mode)
+
+
+def get_summation() -> str:
+    """Return the global summation mode."""
+    return _summation
+
+
+def _check_summation(mode: str) -> str:
+    if mode not in SUMMATIONS:
+        raise ValueError(f"Unknown summation mode: {mode}")
+    if mode == "sumprod" and sumprod is None:
+        raise ValueError("The sumprod summation needs Python 3.12+.")
+    return mode
+
+
+def _dot_fast(u: Iterable, v: Iterable):
+    return sum(map(mul, u, v))
+
+
+def _dot_pairwise(u: List[T], v: List[T]):
+    block = max(PAIRWISE_BLOCK, 1)
+    sums = []
+    for start in range(0, len(u), block):
+        acc = 0.0
+        for x, y in zip(u[start:start + block], v[start:start + block]):
+            acc = fma(x, y, acc)
+        sums.append(acc)
+    while len(sums) > 1:
+        odd = sums[-1:] if len(sums) % 2 else []
+        sums = [x + y for x, y in zip(sums[::2], sums[1::2])] + odd
+    return sums[0] if sums else 0.0
+
+
+def _dot_kahan(u: Iterable, v: Iterable):
+    s = c = 0.0
+    for x, y in zip(u, v):
+        term = x * y - c
+        t = s + term
+        # What the addition lost, subtracted from the next term
+        c = (t - s) - term
+        s = t
+    return s
+
+
+def _dot_neumaier(u: Iterable, v: Iterable):
+    s = c = 0.0
+    for x, y in zip(u, v):
+        p = x * y
+        t = s + p
+        # Low-order bits lost by the addition, from the smaller operand
+        if abs(s) >= abs(p):
+            c += (s - t) + p
+        else:
+            c += (p - t) + s
+        # Exact rounding error of the product
+        c += fma(x, y, -p)
+        s = t
+    return s + c
+
+
+_DOT_KERNELS = {
+    "fast": _dot_fast,
+    "pairwise": _dot_pairwise,
+    "kahan": _dot_kahan,
+    "neumaier": _dot_neumaier,
+    "sumprod": sumprod,
+}
+
+
+def _summation_kernel(summation: str, *values: Iterable) -> Callable:
+    """
+    Dot kernel (u, v) -> sum of u[i] * v[i] for a summation mode (the
+    global one when None). Returns None for the default "fma" mode and
+    for complex data: the caller keeps its inline multiply-add loop.
+    Int dtypes (see DTYPES) are summed exactly, in Python ints, and so
+    are untyped ints multiplied with them.
+    """
+    mode = _summation if summation is None else _check_summation(summation)
+    if mode == "fma":
+        if any(map(_int_typed, values)) and all(map(_int_valued, values)):
+            return _dot_fast
+        return None
+    if any(is_complex(vals) for vals in values):
+        return None
+    return _DOT_KERNELS[mode]
+
+
+# ===========================================================================
+# ============================== Data types =================================
+# ===========================================================================
+
+# Typed storage of Vector / Matrix values: array module type codes.
+# A float32 value takes 4 bytes instead of the ~32 of a list slot
+# pointing to a float object.
+DTYPES = {"float64": "d", "float32": "f", "int64": "q", "int32": "i"}
+
+# Casts that keep every value exactly
+_SAFE_CASTS = {("int32", "int64"), ("int32", "float64"),
+               ("float32", "float64")}
+
+# Floats hold every int up to 2^53 exactly
+_FLOAT_EXACT_INT = 2 ** 53
+
+
+def _check_dtype(dtype: str) -> str:
+    if dtype not in DTYPES:
+        raise ValueError(f"Unknown dtype: {dtype}")
+    return dtype
+
+
+def result_dtype(*dtypes: str) -> str:
+    """
+    Dtype of the result of an operation between operands of these
+    dtypes: the widest float, or the widest int; an int with float32
+    needs float64 to keep the int values. None (plain Python numbers
+    and scalars) is weak: it takes the dtype of the typed operands.
+    """
+    res = None
+    for dtype in dtypes:
+        if dtype is None or dtype == res:
+            continue
+        if res is None:
+            res = _check_dtype(dtype)
+        elif dtype.startswith("int") and res.startswith("int"):
+            res = "int64"
+        else:
+            res = "float64"
+    return res
+
+
+def can_cast(src: str, dst: str) -> bool:
+    """True if every value of dtype src is exactly representable in dst."""
+    return src == dst or (_check_dtype(src), _check_dtype(dst)) in _SAFE_CASTS
+
+
+def _to_array(values: Iterable, dtype: str) -> array:
+    code = DTYPES[dtype]
+    try:
+        return array(code, values)
+    except TypeError:
+        pass
+    # Whole floats (int data computed by a float kernel) are exact ints,
+    # below 2^53: past it the float kernel may have rounded them
+    if code in "iq" and all(isinstance(x, int) or
+                            isinstance(x, float) and x.is_integer() and
+                            abs(x) < _FLOAT_EXACT_INT
+                            for x in values):
+        return array(code, map(int, values))
+    raise ValueError(f"Values cannot be stored as {dtype}.")
+
+
+def _int_typed(values) -> bool:
+    """True for int dtype storage: a typed array or rows of them."""
+    if isinstance(values, list) and values:
+        values = values[0]
+    return isinstance(values, array) and values.typecode in "iq"
+
+
+def _int_valued(values) -> bool:
+    """True for int data: int dtype storage or only Python ints."""
+    if _int_typed(values):
+        return True
+    rows = values if values and isinstance(values[0], (list, array)) \
+        else [values]
+    return all(type(x) is int for row in rows for x in row)
+
+
+def _store(obj, dtype: str):
+    """Move the values of a Vector / Matrix to the storage of dtype."""
+    if dtype is not None:
+        # A cached ndarray holds the values before they were rounded
+        obj._array = None
+        code = DTYPES[dtype]
+        if isinstance(obj, Vector):
+            if not isinstance(obj.values, array) or \
+                    obj.values.typecode != code:
+                obj.values = _to_array(obj.values, dtype)
+        else:
+            obj.values = [row if isinstance(row, array) and
+                          row.typecode == code else _to_array(row, dtype)
+                          for row in obj.values]
+    obj.dtype = dtype
+
+
+def _write_out(out, values: list):
+    """
+    Write a kernel result into `out` in place (its values object is
+    kept), converted to the dtype of out (see _to_array).
+    """
+    out.values[:] = values if out.dtype is None else \
+        _to_array(values, out.dtype)
+    out._array = None
+
+
+def _keep_dtype(method):
+    """
+    Store the Vector / Matrix returned by a method in the dtype of its
+    operands (result_dtype). The kernels compute on Python numbers, so
+    float32 values are accumulated in float64 and only rounded when
+    stored. In-place results (self or `out`) keep their own dtype.
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        before = self.values
+        res = method(self, *args, **kwargs)
+        if not isinstance(res, (Vector, Matrix)):
+            return res
+        if res is self or any(res is a for a in args) or \
+                any(res is a for a in kwargs.values()):
+            try:
+                _store(res, res.dtype)
+            except (ValueError, OverflowError):
+                if res is self:
+                    self.values = before
+                raise
+            return res
+        _store(res, result_dtype(self.dtype, *(
+            a.dtype for a in args if isinstance(a, (Vector, Matrix)))))
+        return res
+    return wrapper
+
+
 # ===========================================================================
 # ============================== Vector =====================================
 # ===========================================================================
 
 
 class Vector(Generic[T]):
-    """A class representing a mathematical vector."""
+    """
+    A class representing a mathematical vector.
 
-    def __init__(self, values: List[T]):
-        self.values = values
+    Instances have no __dict__ (__slots__): a small result vector costs
+    about 40% less memory. Annotate with Vector[float], but construct
+    with Vector(...): calling the subscripted alias goes through typing.
+    """
+
+    __slots__ = ("values", "backend", "_array", "dtype")
+
+    def __init__(
+        self,
+        values: List[T],
+        backend: str = None,
+        dtype: str = None,
+    ):
+        # dtype (see DTYPES) stores the values in a typed array,
+        # None keeps a list of Python numbers
+        self.dtype = dtype and _check_dtype(dtype)
+        self.values = values if dtype is None else _to_array(values, dtype)
+        # None follows the global backend (see set_backend)
+        self.backend = backend and _check_backend(backend)
+        # ndarray copy of the values for the NumPy backend
+        self._array = None
 
     def __getitem__(self, index):
         return self.values[index]
 
     def __setitem__(self, index, value):
+        self._array = None
         self.values[index] = value
 
     def __str__(self) -> str:
         """Print the vector in a readable format."""
-        return "Vector: " + str(self.values)
+        return "Vector: " + str(list(self.values))
 
     def __eq__(self, other):
         """== operator to compare two vectors"""
@@ -35,7 +464,21 @@ class Vector(Generic[T]):
             return False
         if self.size() != other.size():
             return False
-        return self.values == other.values
+        values, others = self.values, other.values
+        # A list never equals an array, compare the numbers
+        if type(values) is not type(others):
+            values, others = list(values), list(others)
+        return values == others
+
+    def astype(self, dtype: str) -> "Vector":
+        """
+        Copy converted to dtype (None: a list of Python numbers).
+        Floats are truncated toward zero when converted to an int dtype.
+        """
+        values = self.values
+        if dtype is not None and dtype.startswith("int"):
+            values = [int(x) for x in values]
+        return Vector(list(values), self.backend, dtype)
 
     def size(self) -> int:
         """Return the size (length) of the vector."""
@@ -50,43 +493,72 @@ class Vector(Generic[T]):
             self.values[i * cols:(i + 1) * cols]
             for i in range(rows)
         ]
-        return Matrix(reshaped_values)
+        return Matrix(reshaped_values, dtype=self.dtype)
 
+    @_keep_dtype
     def add(self, other: "Vector") -> "Vector":
         """Addition of two vectors element-wise."""
         if self.size() != other.size():
             raise ValueError("Vectors must have the same size.")
+        self._array = None
         self.values = [
             self.values[i] + other.values[i]
             for i in range(self.size())
         ]
         return self
 
+    @_keep_dtype
     def sub(self, other: "Vector") -> "Vector":
         """Subtraction of a vector by another vector"""
         if self.size() != other.size():
             raise AssertionError("Vectors must have the same size.")
 
+        self._array = None
         self.values = [
             self.values[i] - other.values[i]
             for i in range(self.size())
         ]
         return self
 
+    @_keep_dtype
     def scl(self, scalar: T) -> "Vector":
         """Scaling of a vector by a scalar (multiplication)"""
+        self._array = None
         self.values = [self.values[i] * scalar for i in range(self.size())]
         return self
 
-    def dot(self, other: "Vector") -> T:
-        """Dot product of two vectors."""
+    def is_complex(self) -> bool:
+        """Return True if the vector holds complex values."""
+        return is_complex(self.values)
+
+    def conj(self) -> "Vector":
+        """Return a new vector holding the complex conjugate of each value."""
+        return Vector([conj(n) for n in self.values])
+
+    @_dispatch
+    def dot(self, other: "Vector", summation: str = None) -> T:
+        """
+        Dot product of two vectors.
+        For complex vectors this is the Hermitian product:
+        the values of self are conjugated, so u.dot(u) is real.
+        `summation` selects the accumulation (see set_summation).
+        """
         if self.size() != other.size():
             raise AssertionError("Vectors must have the same size.")
+        kernel = _summation_kernel(summation, self.values, other.values)
+        if kernel is not None:
+            return kernel(self.values, other.values)
         res = 0
+        if self.is_complex():
+            for i in range(self.size()):
+                res = cfma(self.values[i].conjugate(), other.values[i], res)
+            return res
+        mac = fma_for(other.values)
         for i in range(self.size()):
-            res = fma(self.values[i], other.values[i], res)
+            res = mac(self.values[i], other.values[i], res)
         return res
 
+    @_dispatch
     def norm_1(self) -> float:
         """
         Return the Manhattan distance of the vector.
@@ -94,16 +566,27 @@ class Vector(Generic[T]):
         """
         return sum(abs(n) for n in self.values)
 
-    def norm(self) -> float:
+    @_dispatch
+    def norm(self, summation: str = None) -> float:
         """
         Return the Euclidean distance of the vector (hypotenuse).
-        The square root of the sum of the squares of all elements.
+        The square root of the sum of the squares of all elements,
+        accumulated as selected by `summation` (see set_summation).
         """
+        kernel = _summation_kernel(summation, self.values)
+        if kernel is not None:
+            return kernel(self.values, self.values)**0.5
         res = 0
+        if self.is_complex():
+            # |z|^2 = re^2 + im^2, so the norm stays a real number
+            for val in self.values:
+                res = fma(val.real, val.real, fma(val.imag, val.imag, res))
+            return res**0.5
         for val in self.values:
             res = fma(val, val, res)
         return res**0.5
 
+    @_dispatch
     def norm_inf(self) -> float:
         """
         Return the maximum absolute value of the vector.
@@ -112,16 +595,287 @@ class Vector(Generic[T]):
         return max(abs(n) for n in self.values)
 
 
+# ===========================================================================
+# ========================== Matrix kernels =================================
+# ===========================================================================
+
+# Below this size Strassen recursion hands off to the classic kernel.
+# Tuned with `python3 15-strassen.py --bench` (pure Python, float data).
+STRASSEN_CUTOFF = 64
+
+
+def _mul_classic(
+    a: List[List[T]],
+    b: List[List[T]],
+    mac,
+    out: List[List[T]] = None,
+    dot: Callable = None,
+) -> List[List[T]]:
+    """
+    Classic O(n^3) product of two row-major lists of lists.
+    The result is written into `out` when given (it must not alias a or b),
+    so repeated products can reuse the same buffer.
+    `dot`, a kernel of _summation_kernel, replaces the mac loop.
+    """
+    # Iterate over b columns directly instead of indexing b[k][j]
+    columns = list(zip(*b))
+    if out is None:
+        out = [[0.0] * len(columns) for _ in range(len(a))]
+    if dot is not None:
+        for row, out_row in zip(a, out):
+            out_row[:] = [dot(row, col) for col in columns]
+        return out
+    # Iterate a rows
+    for row, out_row in zip(a, out):
+        # Iterate b columns
+        for j, col in enumerate(columns):
+            acc = 0.0
+            # Iterate over the shared dimension
+            for x, y in zip(row, col):
+                acc = mac(x, y, acc)
+            out_row[j] = acc
+    return out
+
+
+def _add(a: List[List[T]], b: List[List[T]]) -> List[List[T]]:
+    return [[x + y for x, y in zip(ra, rb)] for ra, rb in zip(a, b)]
+
+
+def _sub(a: List[List[T]], b: List[List[T]]) -> List[List[T]]:
+    return [[x - y for x, y in zip(ra, rb)] for ra, rb in zip(a, b)]
+
+
+def _strassen(
+    a: List[List[T]],
+    b: List[List[T]],
+    n: int,
+    cutoff: int,
+    mac,
+    dot: Callable = None,
+) -> List[List[T]]:
+    """
+    Strassen-Winograd product of two n x n lists of lists:
+    7 recursive products and 15 additions per level instead of 8 products.
+    Odd sizes are padded with a zero row and column.
+    """
+    if n <= max(cutoff, 1):
+        return _mul_classic(a, b, mac, dot=dot)
+    if n % 2:
+        a = [list(row) + [0.0] for row in a] + [[0.0] * (n + 1)]
+        b = [list(row) + [0.0] for row in b] + [[0.0] * (n + 1)]
+        c = _strassen(a, b, n + 1, cutoff, mac, dot)
+        return [row[:n] for row in c[:n]]
+
+    h = n // 2
+    a11 = [row[:h] for row in a[:h]]
+    a12 = [row[h:] for row in a[:h]]
+    a21 = [row[:h] for row in a[h:]]
+    a22 = [row[h:] for row in a[h:]]
+    b11 = [row[:h] for row in b[:h]]
+    b12 = [row[h:] for row in b[:h]]
+    b21 = [row[:h] for row in b[h:]]
+    b22 = [row[h:] for row in b[h:]]
+
+    s1 = _add(a21, a22)
+    s2 = _sub(s1, a11)
+    s3 = _sub(a11, a21)
+    s4 = _sub(a12, s2)
+    t1 = _sub(b12, b11)
+    t2 = _sub(b22, t1)
+    t3 = _sub(b22, b12)
+    t4 = _sub(t2, b21)
+
+    p1 = _strassen(a11, b11, h, cutoff, mac, dot)
+    p2 = _strassen(a12, b21, h, cutoff, mac, dot)
+    p3 = _strassen(s4, b22, h, cutoff, mac, dot)
+    p4 = _strassen(a22, t4, h, cutoff, mac, dot)
+    p5 = _strassen(s1, t1, h, cutoff, mac, dot)
+    p6 = _strassen(s2, t2, h, cutoff, mac, dot)
+    p7 = _strassen(s3, t3, h, cutoff, mac, dot)
+
+    u2 = _add(p1, p6)
+    u3 = _add(u2, p7)
+    u4 = _add(u2, p5)
+    c11 = _add(p1, p2)
+    c12 = _add(u4, p3)
+    c21 = _sub(u3, p4)
+    c22 = _add(u3, p5)
+
+    return [r1 + r2 for r1, r2 in zip(c11, c12)] + \
+        [r1 + r2 for r1, r2 in zip(c21, c22)]
+
+
+# ===========================================================================
+# ============================ Result cache =================================
+# ===========================================================================
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+class ResultCache:
+    """
+    LRU cache of determinant / inverse / rank results.
+    Entries are keyed by the operation name and the content of the matrix
+    (see Matrix.content_key), so two matrices holding the same values
+    share their results.
+    Every access holds a lock: the cache can be shared by threads,
+    including on free-threaded builds where they run in parallel.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        from threading import Lock
+
+        if maxsize < 1:
+            raise ValueError("Cache size must be at least 1.")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        """Return the cached value for key or None, updating the stats."""
+        with self._lock:
+            res = self._entries.get(key)
+            if res is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return res
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entry if full."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self.hits, self.misses,
+                             self.maxsize, len(self._entries))
+
+
+# Disabled (None) until enable_result_cache() is called
+_result_cache = None
+
+
+def enable_result_cache(maxsize: int = 128) -> ResultCache:
+    """Turn on memoization of Matrix.determinant / inverse / rank."""
+    global _result_cache
+    _result_cache = ResultCache(maxsize)
+    return _result_cache
+
+
+def disable_result_cache():
+    """Turn off memoization and drop every cached result."""
+    global _result_cache
+    _result_cache = None
+
+
+def result_cache_info() -> CacheInfo:
+    """Hit/miss statistics of the result cache (zeros when disabled)."""
+    if _result_cache is None:
+        return CacheInfo(0, 0, 0, 0)
+    return _result_cache.info()
+
+
+def _memoized(method):
+    """
+    Serve a Matrix method from the result cache when it is enabled.
+    Matrix results are copied on the way in and out so callers
+    can never modify a cached value.
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        cache = _result_cache
+        if cache is None:
+            return method(self, *args, **kwargs)
+        key = (method.__name__, self.content_key(),
+               args, tuple(sorted(kwargs.items())))
+        res = cache.get(key)
+        if res is None:
+            # A miss can follow a write through the row lists, which the
+            # ndarray cached by the NumPy backend does not see
+            self._array = None
+            res = method(self, *args, **kwargs)
+            if isinstance(res, Matrix):
+                res = [row[:] for row in res.values]
+            cache.put(key, res)
+        if isinstance(res, list):
+            return Matrix([row[:] for row in res])
+        return res
+    return wrapper
+
+
+def _integer_path(kernel):
+    """
+    Run `kernel` on the values instead of the method when every entry
+    of the matrix is an int and no optional argument is set: exact
+    integer results, whatever the backend.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if all(a is None for a in args) and \
+                    all(v is None for v in kwargs.values()) and \
+                    self.is_integer():
+                return kernel(self.values)
+            return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
 # ===========================================================================
 # ============================== Matrix =====================================
 # ===========================================================================
 
 
 class Matrix(Generic[T]):
-    """A class representing a mathematical matrix."""
+    """
+    A class representing a mathematical matrix.
 
-    def __init__(self, values: List[List[T]]):
-        self.values = values
+    Thread safety: a Vector or Matrix that is no longer mutated can be
+    shared by any number of threads, every read-only method is safe
+    (the cached content key and ndarray are rebuilt identically by
+    whichever thread gets there first). The in-place methods (add, sub,
+    scl, item assignment) are not synchronised: a thread mutating an
+    object must not run concurrently with any other use of it.
+
+    Instances have no __dict__ (__slots__), like Vector.
+    """
+
+    __slots__ = ("values", "backend", "_array", "dtype")
+
+    def __init__(
+        self,
+        values: List[List[T]],
+        backend: str = None,
+        dtype: str = None,
+    ):
+        # dtype (see DTYPES) stores each row in a typed array, None keeps
+        # lists of Python numbers
+        self.dtype = dtype and _check_dtype(dtype)
+        self.values = values if dtype is None else \
+            [_to_array(row, dtype) for row in values]
+        # None follows the global backend (see set_backend)
+        self.backend = backend and _check_backend(backend)
+        # ndarray copy of the values for the NumPy backend, dropped on
+        # every mutation
+        self._array = None
+
+    def _changed(self):
+        """Forget everything derived from the values after a mutation."""
+        self._array = None
 
     def __getitem__(self, index):
         """Override __getitem__ to allow matrix[y, x] access"""
@@ -133,11 +887,18 @@ class Matrix(Generic[T]):
 
     def __setitem__(self, index, value):
         """Override __setitem__ to allow matrix[y, x] = value"""
+        self._changed()
         if isinstance(index, tuple):
             y, x = index
             self.values[y][x] = value
-        else:
+        elif self.dtype is None:
             self.values[index] = value
+        elif isinstance(index, slice):
+            self.values[index] = [_to_array(row, self.dtype)
+                                  for row in value]
+        else:
+            # A new row is stored in the dtype, like the others
+            self.values[index] = _to_array(value, self.dtype)
 
     def __str__(self) -> str:
         """Print the matrix in a readable format."""
@@ -156,6 +917,13 @@ class Matrix(Generic[T]):
                     return False
         return True
 
+    def astype(self, dtype: str) -> "Matrix":
+        """Copy converted to dtype, see Vector.astype."""
+        if dtype is not None and dtype.startswith("int"):
+            return Matrix([[int(x) for x in row] for row in self.values],
+                          self.backend, dtype)
+        return Matrix([list(row) for row in self.values], self.backend, dtype)
+
     def to_vector(self) -> "Vector":
         """Reshape the matrix into a vector."""
         flattened_values = [item for row in self.values for item in row]
@@ -172,6 +940,27 @@ class Matrix(Generic[T]):
         rows, cols = self.shape()
         return rows == cols
 
+    def content_key(self) -> tuple:
+        """
+        Hashable snapshot of the matrix used by the result cache: the
+        values and their types (an int matrix and its float twin give
+        different results), the backend and the dtype. Rebuilt on every
+        call, so writes through A[i][j] or .values are always seen:
+        O(n^2), next to the O(n^3) results it keys.
+        """
+        return (self.backend or _backend, self.dtype,
+                tuple(map(tuple, self.values)),
+                tuple(tuple(map(type, row)) for row in self.values))
+
+    def is_complex(self) -> bool:
+        """Return True if the matrix holds complex values."""
+        return is_complex(self.values)
+
+    def is_integer(self) -> bool:
+        """Return True if every value is a Python int (no float)."""
+        return bool(self.values) and all(
+            isinstance(x, int) for row in self.values for x in row)
+
     def identity_matrix(self, n) -> "Matrix":
         """Creates an identity matrix of size n x n."""
         return Matrix([
@@ -179,64 +968,164 @@ class Matrix(Generic[T]):
             for i in range(n)
         ])
 
+    @_keep_dtype
     def add(self, other: "Matrix") -> "Matrix":
         """Add two matrices element-wise."""
         if self.shape() != other.shape():
             raise AssertionError("Matrices must have the same shape.")
 
-        for x in range(len(self.values)):
-            for y in range(len(self.values[x])):
-                self.values[y][x] += other.values[y][x]
+        self._changed()
+        self._assign([[a + b for a, b in zip(row, other_row)]
+                      for row, other_row in zip(self.values, other.values)])
         return self
 
+    @_keep_dtype
     def sub(self, other: "Matrix") -> "Matrix":
         """Substration of a matrix by another matrix"""
         if self.shape() != other.shape():
             raise AssertionError("Matrices must have the same shape.")
 
-        for y in range(len(self.values)):
-            for x in range(len(self.values[y])):
-                self.values[y][x] -= other.values[y][x]
+        self._changed()
+        self._assign([[a - b for a, b in zip(row, other_row)]
+                      for row, other_row in zip(self.values, other.values)])
         return self
 
+    @_keep_dtype
     def scl(self, scalar: T) -> "Matrix":
         """Scaling of matrix by a scalar (multiplication)"""
-        for y in range(len(self.values)):
-            for x in range(len(self.values[y])):
-                self.values[y][x] *= scalar
+        self._changed()
+        self._assign([[a * scalar for a in row] for row in self.values])
         return self
 
+    def _assign(self, rows: List[list]):
+        """
+        Write new values into the rows, in place (the row objects are
+        kept). Typed rows are all converted before the first write: a
+        value the dtype cannot store raises ValueError (OverflowError
+        when out of range) and leaves the matrix unchanged.
+        """
+        if self.dtype is not None:
+            rows = [_to_array(row, self.dtype) for row in rows]
+        for row, new in zip(self.values, rows):
+            row[:] = new
+
     def __scl_row(self, row, scalar: T) -> "Matrix":
         """Scales a row by a factor."""
         self[row] = [element * scalar for element in self[row]]
 
-    def mul_vec(self, vec: Vector) -> Vector:
-        """Multiply a vector by a matrix."""
-        if vec.size() != self.shape()[0]:
-            raise ValueError("Vector size must match the matrix row size.")
+    @_keep_dtype
+    @_dispatch
+    def mul_vec(
+        self,
+        vec: Vector,
+        out: Vector = None,
+        summation: str = None,
+    ) -> Vector:
+        """
+        Multiply a vector by a matrix.
+        The result is written into `out` when given (a vector of the
+        matrix row count, not `vec`), so a loop can reuse one result
+        object instead of allocating one per product.
+        `summation` selects the accumulation (see set_summation).
+        """
+        if vec.size() != self.shape()[1]:
+            raise ValueError("Vector size must match the matrix column size.")
+        rows = self.shape()[0]
+        if out is None:
+            out = Vector([0.0] * rows)
+        elif out.size() != rows or out is vec:
+            raise ValueError("Output vector must not alias the input and "
+                             "must match the matrix row count.")
 
-        result = Vector([0.0 for _ in range(vec.size())])
-        for i in range(self.shape()[0]):
-            for j in range(vec.size()):
-                result[i] = fma(self[i, j], vec[j], result[i])
-        return result
+        kernel = _summation_kernel(summation, self.values, vec.values)
+        if kernel is not None:
+            res = [kernel(row, vec.values) for row in self.values]
+        else:
+            mac = fma_for(self.values, vec.values)
+            res = []
+            for row in self.values:
+                acc = 0.0
+                for x, y in zip(row, vec.values):
+                    acc = mac(x, y, acc)
+                res.append(acc)
+        _write_out(out, res)
+        return out
 
-    def mul_mat(self, mat: "Matrix") -> "Matrix":
+    @_keep_dtype
+    @_dispatch
+    def mul_mat(
+        self,
+        mat: "Matrix",
+        mode: str = "classic",
+        cutoff: int = None,
+        summation: str = None,
+    ) -> "Matrix":
+        """
+        Multiply two matrices.
+        mode="classic" runs the O(n^3) row-by-column kernel.
+        mode="strassen" runs Strassen-Winograd recursion on square
+        matrices, down to `cutoff` (STRASSEN_CUTOFF by default) where it
+        hands off to the classic kernel. Non-square products always use
+        the classic kernel.
+        `summation` selects how the row-by-column products of the
+        classic kernel are accumulated (see set_summation).
+        """
         if self.shape()[1] != mat.shape()[0]:
             raise ValueError("Dimensions are incompatible for multiplication.")
-        # Init result matrix
-        result = Matrix([
-            [0.0 for _ in range(self.shape()[0])]
-            for _ in range(mat.shape()[1])
-        ])
-        # Iterate self rows
-        for i in range(self.shape()[0]):
-            # Iterate mat columns
-            for j in range(mat.shape()[1]):
-                # Iterate over the shared dimension
-                for k in range(mat.shape()[0]):
-                    result[i, j] = fma(self[i, k], mat[k, j], result[i, j])
-        return result
+        if mode not in ("classic", "strassen"):
+            raise ValueError(f"Unknown multiplication mode: {mode}")
+        mac = fma_for(self.values, mat.values)
+        dot = _summation_kernel(summation, self.values, mat.values)
+        n = self.shape()[0]
+        if mode == "strassen" and self.is_square() and mat.shape() == (n, n):
+            if cutoff is None:
+                cutoff = STRASSEN_CUTOFF
+            return Matrix(_strassen(self.values, mat.values, n, cutoff, mac,
+                                    dot))
+        return Matrix(_mul_classic(self.values, mat.values, mac, dot=dot))
+
+    def pow(self, k: int) -> "Matrix":
+        """
+        Raise a square matrix to the integer power k by repeated squaring:
+        O(log k) products instead of k - 1. Two work buffers are reused
+        for every product. Negative powers use the inverse (untyped
+        result), the others keep the dtype, like mul_mat.
+        """
+        if not self.is_square():
+            raise ValueError("Power is only available for squared matrices")
+        n = self.shape()[0]
+        if k < 0:
+            return self.inverse().pow(-k)
+        if k == 0:
+            # The identity in the element type: float, complex or
+            # Fraction entries give 1.0, 1 + 0j or Fraction(1)
+            one = next((x for row in self.values for x in row
+                        if not isinstance(x, int)), 1) ** 0
+            res = Matrix([[one if i == j else one - one for j in range(n)]
+                          for i in range(n)])
+            _store(res, self.dtype)
+            return res
+
+        mac = fma_for(self.values)
+        base = [list(row) for row in self.values]
+        result = None
+        spare = [[0.0] * n for _ in range(n)]
+        while True:
+            if k & 1:
+                if result is None:
+                    result = [list(row) for row in base]
+                else:
+                    # result = result * base, swapping the buffers
+                    spare = _mul_classic(result, base, mac, spare)
+                    result, spare = spare, result
+            k >>= 1
+            if not k:
+                res = Matrix(result)
+                _store(res, self.dtype)
+                return res
+            # base = base * base, swapping the buffers
+            spare = _mul_classic(base, base, mac, spare)
+            base, spare = spare, base
 
     def trace(self) -> "Matrix":
         if self.shape()[0] != self.shape()[1]:
@@ -247,12 +1136,24 @@ class Matrix(Generic[T]):
             res += self[i, i]
         return res
 
+    @_keep_dtype
+    @_dispatch
     def transpose(self) -> "Matrix":
         return Matrix([
             [self[j, i] for j in range(self.shape()[0])]
             for i in range(self.shape()[1])
         ])
 
+    def conj_transpose(self) -> "Matrix":
+        """
+        Conjugate transpose (Hermitian adjoint) A^H of the matrix.
+        Equal to the plain transpose for real matrices.
+        """
+        return Matrix([
+            [conj(self[j, i]) for j in range(self.shape()[0])]
+            for i in range(self.shape()[1])
+        ])
+
     def __find_nonzero_row(m, curr_row, col):
         rows = m.shape()[0]
         for row in range(curr_row, rows):
@@ -279,7 +1180,8 @@ class Matrix(Generic[T]):
                 m[row, i] -= factor * m[curr_row, i]
 
     def row_echelon(self) -> "Matrix":
-        matrix = Matrix(self.values)
+        # Copy the rows so the elimination leaves self untouched
+        matrix = Matrix([list(row) for row in self.values])
         ncols = matrix.shape()[1]
         row = 0
         # If matrix has 3 columns this loop will run for 3 times
@@ -313,22 +1215,45 @@ class Matrix(Generic[T]):
                 return False
         return True
 
-    def __determinant_sub_matrix(m, currCol) -> 'Matrix':
+    def __determinant_sub_matrix(m, currCol, sub=None) -> 'Matrix':
+        """
+        Minor of the first row and column currCol, written into `sub`
+        (an (n - 1) x (n - 1) matrix) when given.
+        """
         ncols = m.shape()[0]
-        sub = Matrix([[0] * (ncols - 1) for _ in range(ncols - 1)])
+        if sub is None:
+            sub = Matrix([[0] * (ncols - 1) for _ in range(ncols - 1)])
         for i in range(1, ncols):
-            subcol = 0
-            for j in range(ncols):
-                # Skip the current column
-                if j == currCol:
-                    continue
-                # Fill the submatrix
-                sub[i - 1][subcol] = m[i][j]
-                subcol += 1
+            row = m.values[i]
+            # Skip the current column
+            sub.values[i - 1][:] = row[:currCol] + row[currCol + 1:]
         return sub
 
+    @_memoized
+    @_integer_path(lambda values: _bareiss(values)[0])
+    @_dispatch
     def determinant(self) -> T:
-        """Computes the determinant of the matrix using cofactor expansion"""
+        """
+        Computes the determinant of the matrix using cofactor expansion.
+        Integer matrices use Bareiss elimination instead (exact, O(n^3)),
+        symmetric positive definite ones the Cholesky factor (O(n^3)).
+        """
+        if self.shape()[0] > 2:
+            # det = product of the pivots (the squares of the diagonal of L)
+            pivots = []
+            if _try_cholesky(self.values, pivots) is not None:
+                det = 1.0
+                for p in pivots:
+                    det *= p
+                return det
+        return self.__determinant()
+
+    def __determinant(self, pool: List["Matrix"] = None) -> T:
+        """
+        Cofactor expansion. The minors of one size are computed one after
+        the other, so a single scratch matrix per size (pool[size]) is
+        reused by all of them instead of allocating every minor.
+        """
         ncols = self.shape()[0]
         # If the matrix is 1x1
         if ncols == 1:
@@ -338,15 +1263,18 @@ class Matrix(Generic[T]):
         if ncols == 2:
             return self[0][0] * self[1][1] - \
                 self[0][1] * self[1][0]
+        if pool is None:
+            pool = [Matrix([[0] * k for _ in range(k)])
+                    for k in range(ncols)]
         # Recursive case for larger matrices
         res = 0
         for col in range(ncols):
             # Reduce the matrix size
             # removing the first row and the current column
-            sub_mat = self.__determinant_sub_matrix(col)
+            sub_mat = self.__determinant_sub_matrix(col, pool[ncols - 1])
             # Cofactor expansion
             sign = 1 if col % 2 == 0 else -1
-            res += sign * self[0][col] * sub_mat.determinant()
+            res += sign * self[0][col] * sub_mat.__determinant(pool)
 
         return res
 
@@ -357,12 +1285,21 @@ class Matrix(Generic[T]):
             for target, source in zip(self[target_row], self[source_row])
         ]
 
+    @_memoized
+    @_dispatch
     def inverse(self):
-        """Computes the inverse of the matrix using Gaussian elimination."""
+        """
+        Computes the inverse of the matrix using Gaussian elimination.
+        Symmetric positive definite matrices are inverted through their
+        Cholesky factor instead (half the work, no pivoting).
+        """
+        L = _try_cholesky(self.values)
+        if L is not None:
+            return Matrix(_cholesky_inverse(L))
         n = self.shape()[0]
         # Create augmented matrix [A | ID]
         # Deep copy to prevent modification of the original matrix
-        A = Matrix([row[:] for row in self.values])
+        A = Matrix([list(row) for row in self.values])
         ID = self.identity_matrix(n)
 
         # Forward elimination
@@ -397,8 +1334,37 @@ class Matrix(Generic[T]):
 
         return ID  # The right half of the augmented matrix is now A⁻¹
 
-    def rank(self):
-        """Computes the rank of the matrix."""
+    async def mul_mat_async(self, mat: "Matrix") -> "Matrix":
+        """
+        Awaitable mul_mat, computed on the offloading executor
+        (see matrix.aio) so the event loop keeps running.
+        """
+        from matrix.aio import get_offloader
+        return await get_offloader().mul_mat(self, mat)
+
+    async def inverse_async(self) -> "Matrix":
+        """Awaitable inverse, computed on the offloading executor."""
+        from matrix.aio import get_offloader
+        return await get_offloader().inverse(self)
+
+    async def determinant_async(self) -> T:
+        """Awaitable determinant, computed on the offloading executor."""
+        from matrix.aio import get_offloader
+        return await get_offloader().determinant(self)
+
+    @_memoized
+    @_integer_path(lambda values: _bareiss(values)[1])
+    @_dispatch
+    def rank(self, tol: float = None):
+        """
+        Computes the rank of the matrix.
+        Without tol, rows left non-zero by the row echelon form are counted
+        (exact for exact data; integer matrices use Bareiss elimination).
+        With tol, the numerical rank is computed by QR with column pivoting
+        (see rank_revealing).
+        """
+        if tol is not None:
+            return self.rank_revealing(tol)[0]
         REF = self.row_echelon()
         rank = 0
         for row in REF.values:
@@ -407,3 +1373,2878 @@ class Matrix(Generic[T]):
             if any(row):
                 rank += 1
         return rank
+
+    def qr(self) -> Tuple["Matrix", "Matrix"]:
+        """
+        Householder QR decomposition A = Q * R of an m x n matrix (m >= n):
+        Q is m x n with orthonormal columns, R is n x n upper triangular.
+        """
+        rows, cols = self.shape()
+        if rows < cols:
+            raise ValueError("QR needs at least as many rows as columns.")
+        columns = [list(col) for col in zip(*self.values)]
+        reflectors = _householder_qr(columns, cols)
+        # Q = H0 * H1 * ... * Hn-1 applied to the first n identity columns
+        q_columns = []
+        for j in range(cols):
+            col = [0.0] * rows
+            col[j] = 1.0
+            for k, v, beta in reversed(reflectors):
+                _reflect(col, k, v, beta)
+            q_columns.append(col)
+        Q = Matrix([list(row) for row in zip(*q_columns)])
+        R = Matrix([
+            [columns[j][i] if j >= i else 0.0 for j in range(cols)]
+            for i in range(cols)
+        ])
+        return Q, R
+
+    def rank_revealing(
+        self,
+        tol: float = None,
+        method: str = "qr",
+        oversample: int = 10,
+        seed: int = None,
+    ) -> Tuple[int, List[int]]:
+        """
+        Numerical rank and indices of a set of linearly independent columns.
+
+        method="qr": Householder QR with column pivoting. At each step the
+        column with the largest remaining norm is reduced; the rank is the
+        number of pivots larger than tol * (first pivot).
+        tol defaults to max(rows, cols) * EPSILON.
+
+        method="randomized": the same pivoted QR on a sketch S * A, where
+        S adds every row of A with a random sign into one of a few rows
+        (CountSketch). The sketch costs one pass over A and is grown until
+        it has `oversample` rows more than the rank it reveals.
+        """
+        if self.is_complex():
+            raise ValueError("Rank revealing QR only supports real matrices.")
+        if method not in ("qr", "randomized"):
+            raise ValueError(f"Unknown rank method: {method}")
+        rows, cols = self.shape()
+        if tol is None:
+            tol = max(rows, cols) * EPSILON
+        # Imported here: random pulls hashlib and would slow `import lib`
+        from random import Random
+        rng = Random(seed)
+        sketch_rows = oversample
+        while method == "randomized" and 2 * sketch_rows < rows:
+            sketch_rows *= 2
+            sketch = [[0.0] * cols for _ in range(sketch_rows)]
+            for row in self.values:
+                i = rng.randrange(sketch_rows)
+                if rng.random() < 0.5:
+                    sketch[i] = [x + y for x, y in zip(sketch[i], row)]
+                else:
+                    sketch[i] = [x - y for x, y in zip(sketch[i], row)]
+            rank, independent = _pivoted_qr_rank(
+                [list(col) for col in zip(*sketch)], tol)
+            # Trust the sketch once it has spare rows
+            if rank + oversample <= sketch_rows:
+                return rank, independent
+        columns = [list(col) for col in zip(*self.values)]
+        return _pivoted_qr_rank(columns, tol)
+
+    def lstsq(self, b: Vector) -> Vector:
+        """
+        Least-squares solution x minimizing ||A * x - b|| for a tall
+        matrix, through the QR decomposition (no normal equations).
+        """
+        return QRFactorization(self, b).solve()
+
+    @_dispatch
+    def solve(self, b: Vector, spd: bool = None) -> Vector:
+        """
+        Solve A * x = b for a square matrix.
+        spd=None uses the Cholesky factor when the matrix is symmetric
+        positive definite and Gaussian elimination with partial pivoting
+        otherwise; spd=True requires the Cholesky path (ValueError if the
+        matrix is not SPD), spd=False always eliminates.
+        """
+        if not self.is_square():
+            raise ValueError("Only square systems can be solved.")
+        if b.size() != self.shape()[0]:
+            raise ValueError("Vector size must match the matrix row size.")
+        if spd is None:
+            L = _try_cholesky(self.values)
+        elif spd:
+            L = self.cholesky().values
+        else:
+            L = None
+        if L is not None:
+            return Vector(_cholesky_solve(L, b.values))
+        return Vector(_gauss_solve(self.values, b.values))
+
+    @_dispatch
+    def cholesky(self, block: int = None) -> "Matrix":
+        """
+        Cholesky factor of a symmetric positive definite matrix: the
+        lower triangular L with A = L * L^T, computed by blocks of
+        `block` columns (CHOLESKY_BLOCK by default).
+        Raises ValueError when the matrix is not SPD.
+        """
+        if self.is_complex():
+            raise ValueError("Cholesky is only available for real matrices.")
+        if not self.is_symmetric():
+            raise ValueError("Matrix is not symmetric.")
+        return Matrix(_cholesky(self.values, block))
+
+    def is_spd(self) -> bool:
+        """
+        Return True if the matrix is symmetric positive definite.
+        Cheap O(n^2) checks (symmetry, positive diagonal, dominant
+        diagonal pairs) reject most matrices; the others are confirmed by
+        attempting the Cholesky factorization.
+        """
+        return _try_cholesky(self.values) is not None
+
+    def is_symmetric(self, tol: float = 0.0) -> bool:
+        """Return True if A = A^T (up to tol)."""
+        rows, cols = self.shape()
+        if rows != cols:
+            return False
+        return all(abs(self.values[i][j] - self.values[j][i]) <= tol
+                   for i in range(rows) for j in range(i + 1, cols))
+
+    @_dispatch
+    def gram(self, rows: bool = False) -> "SymmetricMatrix":
+        """
+        Gram matrix A^T * A (inner products of the columns, e.g. the
+        scatter matrix of samples stored as rows), or A * A^T with
+        rows=True (inner products of the rows, a linear kernel matrix).
+        Only the upper triangle is computed, straight from A without
+        forming A^T: about half the multiplications of
+        A.transpose().mul_mat(A).
+        """
+        size = self.shape()[0 if rows else 1]
+        return SymmetricMatrix(size).syrk(self, rows=rows)
+
+    def eigvals(self) -> List[T]:
+        """
+        Eigenvalues of a square matrix.
+        Real symmetric matrices use the Jacobi method (real values, in
+        ascending order). Other matrices are reduced to Hessenberg form
+        then to triangular (Schur) form by the shifted QR algorithm:
+        complex values are returned where the spectrum is complex.
+        """
+        return self.__eig(vectors=False)[0]
+
+    def eig(self) -> Tuple[List[T], List[Vector]]:
+        """
+        Eigenvalues and unit eigenvectors: A * v[i] = values[i] * v[i].
+        See eigvals for the algorithms.
+        """
+        return self.__eig(vectors=True)
+
+    def __eig(self, vectors: bool):
+        if not self.is_square():
+            raise ValueError("Eigenvalues need a square matrix.")
+        n = self.shape()[0]
+        if n == 0:
+            return [], []
+        real = not self.is_complex()
+        if real and self.is_symmetric():
+            values, columns = _jacobi_eigh(self.values)
+            return values, [Vector(col) for col in columns]
+
+        h = [[complex(x) for x in row] for row in self.values]
+        z = None
+        if vectors:
+            z = [[1 + 0j if i == j else 0j for j in range(n)]
+                 for i in range(n)]
+        _hessenberg(h, z)
+        _schur(h, z)
+        values = [h[i][i] for i in range(n)]
+        columns = _schur_vectors(h, z) if vectors else []
+        if real:
+            # Rounding leaves a tiny imaginary part on real eigenvalues
+            scale = max(abs(x) for row in self.values for x in row)
+            tol = 1e3 * n * EPSILON * scale
+            values = [lam.real if abs(lam.imag) <= tol else lam
+                      for lam in values]
+            columns = [_real_if_close(col, tol) if isinstance(lam, float)
+                       else col for lam, col in zip(values, columns)]
+        return values, [Vector(col) for col in columns]
+
+    def dominant_eig(
+        self,
+        k: int = 1,
+        tol: float = 1e-10,
+        max_iter: int = 1000,
+    ) -> Tuple[List[T], List[Vector]]:
+        """
+        The k eigenvalues of largest magnitude and their eigenvectors by
+        subspace (block power) iteration: X <- orth(A * X) with a
+        Rayleigh-Ritz step, until the values change by less than tol
+        (relative). The k work vectors are reused at every iteration.
+        """
+        if not self.is_square():
+            raise ValueError("Eigenvalues need a square matrix.")
+        n = self.shape()[0]
+        if not 1 <= k <= n:
+            raise ValueError("k must be between 1 and the matrix size.")
+        a = self.values
+        # Random start vectors (seeded: results are reproducible)
+        from random import Random
+        uniform = Random(0).uniform
+        X = [[uniform(-1.0, 1.0) for _ in range(n)] for _ in range(k)]
+        _orthonormalize(X)
+        Y = [[0.0] * n for _ in range(k)]
+        previous = None
+        for _ in range(max_iter):
+            for x, y in zip(X, Y):
+                for i, row in enumerate(a):
+                    y[i] = sum(r * v for r, v in zip(row, x))
+            # Rayleigh-Ritz: eigenvalues of the k x k projection X^T A X
+            S = Matrix([[_dot_conj(X[r], Y[c]) for c in range(k)]
+                        for r in range(k)])
+            values, small_vectors = S.eig()
+            _orthonormalize(Y)
+            X, Y = Y, X
+            if previous is not None and all(
+                    abs(v - p) <= tol * max(1.0, abs(v))
+                    for v, p in zip(values, previous)):
+                break
+            previous = values
+        else:
+            raise ValueError("Power iteration did not converge.")
+        # Ritz vectors of the previous basis (now in Y)
+        order = sorted(range(k), key=lambda i: -abs(values[i]))
+        result = []
+        for i in order:
+            w = small_vectors[i].values
+            vec = [sum(w[c] * Y[c][r] for c in range(k)) for r in range(n)]
+            norm = sqrt(sum(abs(x) ** 2 for x in vec))
+            result.append(Vector([x / norm for x in vec]))
+        return [values[i] for i in order], result
+
+
+# ===========================================================================
+# ========================== Bareiss elimination ============================
+# ===========================================================================
+
+
+def _bareiss(
+    a: List[List[int]],
+    checkpoint: Callable = None,
+) -> Tuple[int, int]:
+    """
+    Fraction-free Gaussian elimination (Bareiss) of an integer matrix.
+    Every update
+        m[r][c] = (m[r][c] * pivot - m[r][k] * m[k][c]) // previous pivot
+    divides exactly (the entries are minors of the matrix), so the whole
+    elimination stays in integers, in O(n^3) operations.
+    Returns (determinant, rank); the determinant is 0 for a non-square
+    or singular matrix.
+    `checkpoint`, if given, is called before every column is eliminated.
+    """
+    m = [list(row) for row in a]
+    rows = len(m)
+    cols = len(m[0]) if rows else 0
+    sign = 1
+    previous = 1
+    row = 0
+    for col in range(cols):
+        if row == rows:
+            break
+        if checkpoint is not None:
+            checkpoint()
+        pivot_row = next((r for r in range(row, rows) if m[r][col] != 0),
+                         None)
+        if pivot_row is None:
+            continue
+        if pivot_row != row:
+            m[row], m[pivot_row] = m[pivot_row], m[row]
+            sign = -sign
+        pivot = m[row]
+        p = pivot[col]
+        for r in range(row + 1, rows):
+            target = m[r]
+            factor = target[col]
+            for c in range(col + 1, cols):
+                target[c] = (target[c] * p - factor * pivot[c]) // previous
+            target[col] = 0
+        previous = p
+        row += 1
+    rank = row
+    if rows != cols or rank < rows:
+        return 0, rank
+    return sign * m[rows - 1][cols - 1], rank
+
+
+# ===========================================================================
+# =============================== Cholesky ==================================
+# ===========================================================================
+
+# Columns factored together before the rank-k update of the trailing matrix
+CHOLESKY_BLOCK = 64
+
+
+def _cholesky(
+    a: List[List[float]],
+    block: int = None,
+    pivots: List[float] = None,
+) -> List[List[float]]:
+    """
+    Lower triangular L with A = L * L^T (A symmetric positive definite),
+    by blocks of `block` columns (CHOLESKY_BLOCK by default):
+        1. the panel of columns k0..k1 is factored row by row,
+        2. the trailing rows and columns are updated at once:
+           A22 <- A22 - L21 * L21^T (lower triangle only).
+    n^3 / 3 multiplications, no pivoting. Raises ValueError on a
+    non-positive pivot (the matrix is not positive definite).
+    The pivots L[i][i]^2, before their square root, are appended to
+    `pivots` when given.
+    """
+    if block is None:
+        block = CHOLESKY_BLOCK
+    n = len(a)
+    # Lower triangle of a, overwritten by L
+    w = [list(row[:i + 1]) + [0.0] * (n - i - 1) for i, row in enumerate(a)]
+    for k0 in range(0, n, block):
+        k1 = min(k0 + block, n)
+        for i in range(k0, n):
+            wi = w[i]
+            for j in range(k0, min(i + 1, k1)):
+                wj = w[j]
+                s = wi[j]
+                for x, y in zip(wi[k0:j], wj[k0:j]):
+                    s = fma(-x, y, s)
+                if i == j:
+                    if not s > 0:
+                        raise ValueError("Matrix is not positive definite.")
+                    if pivots is not None:
+                        pivots.append(s)
+                    wi[i] = sqrt(s)
+                else:
+                    wi[j] = s / wj[j]
+        for i in range(k1, n):
+            wi = w[i]
+            panel = wi[k0:k1]
+            for j in range(k1, i + 1):
+                s = wi[j]
+                for x, y in zip(panel, w[j][k0:k1]):
+                    s = fma(-x, y, s)
+                wi[j] = s
+    return w
+
+
+def _spd_candidate(a: List[List[T]]) -> bool:
+    """
+    Cheap O(n^2) necessary conditions for a symmetric positive definite
+    matrix: square, real, symmetric, positive diagonal and
+    a[i][j]^2 < a[i][i] * a[j][j]. Only the factorization can confirm it.
+    """
+    n = len(a)
+    if not n or any(len(row) != n for row in a) or is_complex(a):
+        return False
+    diag = [a[i][i] for i in range(n)]
+    if not all(d > 0 for d in diag):
+        return False
+    for i in range(n):
+        row = a[i]
+        for j in range(i):
+            x = row[j]
+            if x != a[j][i] or x * x >= diag[i] * diag[j]:
+                return False
+    return True
+
+
+def _try_cholesky(
+    a: List[List[T]],
+    pivots: List[float] = None,
+) -> List[List[float]]:
+    """Cholesky factor of a if it is SPD, None otherwise."""
+    if not _spd_candidate(a):
+        return None
+    try:
+        return _cholesky(a, pivots=pivots)
+    except ValueError:
+        return None
+
+
+def _cholesky_solve(L: List[List[float]], b: List[T]) -> List[float]:
+    """Solve L * L^T * x = b: forward then back substitution."""
+    n = len(L)
+    y = [0.0] * n
+    for i, row in enumerate(L):
+        s = b[i]
+        for x, z in zip(row[:i], y):
+            s = fma(-x, z, s)
+        y[i] = s / row[i]
+    columns = list(zip(*L))
+    x = [0.0] * n
+    for i in range(n - 1, -1, -1):
+        col = columns[i]
+        s = y[i]
+        for k in range(i + 1, n):
+            s = fma(-col[k], x[k], s)
+        x[i] = s / col[i]
+    return x
+
+
+def _cholesky_inverse(L: List[List[float]]) -> List[List[float]]:
+    """
+    A^-1 = L^-T * L^-1. Column j of L^-1 is zero above row j, so
+    A^-1[i][j] only sums the rows k >= max(i, j).
+    """
+    n = len(L)
+    # inv_cols[j] = column j of L^-1 (forward substitution on e_j)
+    inv_cols = []
+    for j in range(n):
+        col = [0.0] * n
+        col[j] = 1.0 / L[j][j]
+        for i in range(j + 1, n):
+            row = L[i]
+            s = 0.0
+            for x, z in zip(row[j:i], col[j:i]):
+                s = fma(-x, z, s)
+            col[i] = s / row[i]
+        inv_cols.append(col)
+    inv = [[0.0] * n for _ in range(n)]
+    for i in range(n):
+        ci = inv_cols[i]
+        for j in range(i, n):
+            s = 0.0
+            for x, z in zip(ci[j:], inv_cols[j][j:]):
+                s = fma(x, z, s)
+            inv[i][j] = inv[j][i] = s
+    return inv
+
+
+def _gauss_solve(a: List[List[T]], b: List[T]) -> List[T]:
+    """Solve A * x = b by Gaussian elimination with partial pivoting."""
+    n = len(a)
+    m = [list(row) + [b[i]] for i, row in enumerate(a)]
+    for i in range(n):
+        p = max(range(i, n), key=lambda r: abs(m[r][i]))
+        if m[p][i] == 0:
+            raise ValueError("Matrix is singular.")
+        m[i], m[p] = m[p], m[i]
+        pivot = m[i]
+        for r in range(i + 1, n):
+            factor = m[r][i] / pivot[i]
+            if factor:
+                m[r] = [x - factor * y for x, y in zip(m[r], pivot)]
+    x = [0.0] * n
+    for i in range(n - 1, -1, -1):
+        row = m[i]
+        s = row[n]
+        for k in range(i + 1, n):
+            s -= row[k] * x[k]
+        x[i] = s / row[i]
+    return x
+
+
+# ===========================================================================
+# =========================== QR decomposition ==============================
+# ===========================================================================
+
+# Number of columns factored together before updating the trailing columns
+QR_BLOCK = 32
+
+
+def _house(col: List[float], k: int) -> Tuple[List[float], float, float]:
+    """
+    Householder reflector H = I - beta * v * v^T zeroing col[k + 1:].
+    Returns v (for rows k..m-1), beta and the new value of col[k].
+    """
+    norm = 0.0
+    for x in col[k:]:
+        norm = fma(x, x, norm)
+    norm = sqrt(norm)
+    if norm == 0.0:
+        return [0.0] * (len(col) - k), 0.0, 0.0
+    # Opposite sign of col[k] to avoid cancellation in v[0]
+    alpha = -norm if col[k] >= 0 else norm
+    v = col[k:]
+    v[0] -= alpha
+    vtv = 0.0
+    for x in v:
+        vtv = fma(x, x, vtv)
+    return v, 2.0 / vtv, alpha
+
+
+def _reflect(col: List[float], k: int, v: List[float], beta: float):
+    """Apply H = I - beta * v * v^T to rows k..m-1 of a column in place."""
+    if beta == 0.0:
+        return
+    s = 0.0
+    for x, y in zip(v, col[k:]):
+        s = fma(x, y, s)
+    s *= beta
+    for i, x in enumerate(v, k):
+        col[i] -= s * x
+
+
+def _householder_qr(columns: List[List[float]], n: int, block: int = None):
+    """
+    Column-blocked Householder QR of the first n columns of a
+    column-major matrix, in place: R ends up in the upper triangle.
+    Columns after n (right-hand sides) receive every reflector too.
+
+    Reflectors are computed one panel of `block` columns at a time,
+    then applied to each trailing column while it is in hand, instead
+    of sweeping the whole trailing matrix once per reflector.
+    Returns the list of reflectors (k, v, beta).
+    """
+    block = block or QR_BLOCK
+    m = len(columns[0]) if columns else 0
+    steps = min(m, n)
+    reflectors = []
+    for start in range(0, steps, block):
+        stop = min(start + block, steps)
+        # Factor the panel (left-looking inside the panel)
+        for k in range(start, stop):
+            col = columns[k]
+            for j, v, beta in reflectors[start:k]:
+                _reflect(col, j, v, beta)
+            v, beta, alpha = _house(col, k)
+            col[k] = alpha
+            for i in range(k + 1, m):
+                col[i] = 0.0
+            reflectors.append((k, v, beta))
+        # Update the trailing columns with the whole panel
+        panel = reflectors[start:stop]
+        for col in columns[stop:]:
+            for j, v, beta in panel:
+                _reflect(col, j, v, beta)
+    return reflectors
+
+
+def _pivoted_qr_rank(
+    columns: List[List[float]],
+    tol: float,
+) -> Tuple[int, List[int]]:
+    """
+    Householder QR with column pivoting (Businger-Golub) on a column-major
+    matrix, in place, stopped as soon as the largest remaining column norm
+    falls to tol * (first pivot). Returns the rank and the sorted indices
+    of the pivot columns.
+    """
+    m = len(columns[0]) if columns else 0
+    n = len(columns)
+    perm = list(range(n))
+    norms = []
+    for col in columns:
+        sq = 0.0
+        for x in col:
+            sq = fma(x, x, sq)
+        norms.append(sq)
+    # Reference squared norms, to detect cancellation in the downdates
+    exact = norms[:]
+    first = None
+    rank = 0
+    for k in range(min(m, n)):
+        p = max(range(k, n), key=norms.__getitem__)
+        if first is None:
+            first = sqrt(norms[p])
+        if sqrt(norms[p]) <= tol * first or norms[p] == 0.0:
+            break
+        columns[k], columns[p] = columns[p], columns[k]
+        norms[k], norms[p] = norms[p], norms[k]
+        exact[k], exact[p] = exact[p], exact[k]
+        perm[k], perm[p] = perm[p], perm[k]
+
+        v, beta, alpha = _house(columns[k], k)
+        columns[k][k] = alpha
+        rank += 1
+        for j in range(k + 1, n):
+            col = columns[j]
+            _reflect(col, k, v, beta)
+            # Downdate the remaining norm, recompute it when most of it
+            # has cancelled out
+            norms[j] -= col[k] * col[k]
+            if norms[j] <= 0.01 * exact[j]:
+                sq = 0.0
+                for x in col[k + 1:]:
+                    sq = fma(x, x, sq)
+                norms[j] = exact[j] = sq
+    return rank, sorted(perm[:rank])
+
+
+class QRFactorization:
+    """
+    Least-squares state of a tall system A * x = b kept as R
+    (n x n upper triangular) and Q^T * b, so that rows can be appended
+    later without refactoring A from scratch.
+    """
+
+    def __init__(self, A: Matrix, b: Vector = None, block: int = None):
+        rows, cols = A.shape()
+        if rows < cols:
+            raise ValueError("QR needs at least as many rows as columns.")
+        if b is not None and b.size() != rows:
+            raise ValueError("Vector size must match the matrix row size.")
+        self.m, self.n = rows, cols
+        columns = [list(col) for col in zip(*A.values)]
+        rhs = list(b.values) if b is not None else [0.0] * rows
+        columns.append(rhs)
+        _householder_qr(columns, cols, block)
+        self.r = [[columns[j][i] if j >= i else 0.0 for j in range(cols)]
+                  for i in range(cols)]
+        self.qtb = rhs[:cols]
+        # Squared norm of the part of b that A cannot reach
+        self.rss = 0.0
+        for x in rhs[cols:]:
+            self.rss = fma(x, x, self.rss)
+
+    def R(self) -> Matrix:
+        """Return a copy of the triangular factor."""
+        return Matrix([row[:] for row in self.r])
+
+    def residual_norm(self) -> float:
+        """Return ||A * x - b|| for the least-squares solution x."""
+        return sqrt(self.rss)
+
+    def append_rows(self, rows: Matrix, b: Vector = None):
+        """
+        Update the factorization for [A; rows] and [b; b_rows] in
+        O(k * n^2) for k new rows: each Householder reflector only
+        touches one row of R and the k appended rows.
+        """
+        if rows.shape()[1] != self.n:
+            raise ValueError("Appended rows must have the matrix width.")
+        E = [list(row) for row in rows.values]
+        f = list(b.values) if b is not None else [0.0] * len(E)
+        if len(f) != len(E):
+            raise ValueError("Vector size must match the appended rows.")
+        R, z = self.r, self.qtb
+        for k in range(self.n):
+            if all(row[k] == 0 for row in E):
+                continue
+            norm = fma(R[k][k], R[k][k], 0.0)
+            for row in E:
+                norm = fma(row[k], row[k], norm)
+            alpha = -sqrt(norm) if R[k][k] >= 0 else sqrt(norm)
+            v0 = R[k][k] - alpha
+            vs = [row[k] for row in E]
+            vtv = v0 * v0
+            for x in vs:
+                vtv = fma(x, x, vtv)
+            beta = 2.0 / vtv
+            R[k][k] = alpha
+            for row in E:
+                row[k] = 0.0
+            for j in range(k + 1, self.n):
+                s = v0 * R[k][j]
+                for x, row in zip(vs, E):
+                    s = fma(x, row[j], s)
+                s *= beta
+                R[k][j] -= s * v0
+                for x, row in zip(vs, E):
+                    row[j] -= s * x
+            s = v0 * z[k]
+            for x, y in zip(vs, f):
+                s = fma(x, y, s)
+            s *= beta
+            z[k] -= s * v0
+            f = [y - s * x for x, y in zip(vs, f)]
+        for y in f:
+            self.rss = fma(y, y, self.rss)
+        self.m += len(E)
+
+    def solve(self) -> Vector:
+        """Back substitution R * x = Q^T * b."""
+        n, R, z = self.n, self.r, self.qtb
+        # Diagonal entries this small are rounding noise of a zero
+        tol = max(self.m, n) * EPSILON * \
+            max((abs(R[i][i]) for i in range(n)), default=0.0)
+        x = [0.0] * n
+        for i in range(n - 1, -1, -1):
+            if abs(R[i][i]) <= tol:
+                raise ValueError("Matrix is rank deficient.")
+            s = z[i]
+            for j in range(i + 1, n):
+                s = fma(-R[i][j], x[j], s)
+            x[i] = s / R[i][i]
+        return Vector(x)
+
+
+# ===========================================================================
+# ============================== Eigenvalues ================================
+# ===========================================================================
+
+# Iteration limits of the QR algorithm (per eigenvalue) and Jacobi sweeps
+EIG_MAX_ITER = 100
+JACOBI_MAX_SWEEPS = 50
+
+
+def _dot_conj(u: List[T], v: List[T]) -> T:
+    """Hermitian product of two lists (conj(u) . v)."""
+    return sum(conj(x) * y for x, y in zip(u, v))
+
+
+def _orthonormalize(columns: List[List[T]]):
+    """Modified Gram-Schmidt on a list of vectors, in place."""
+    for i, col in enumerate(columns):
+        for prev in columns[:i]:
+            s = _dot_conj(prev, col)
+            col[:] = [x - s * y for x, y in zip(col, prev)]
+        norm = sqrt(sum(abs(x) ** 2 for x in col))
+        if norm == 0.0:
+            raise ValueError("Start vectors are linearly dependent.")
+        col[:] = [x / norm for x in col]
+
+
+def _real_if_close(col: List[complex], tol: float) -> List[T]:
+    """Rotate an eigenvector so its largest entry is real, drop ~0 imag."""
+    big = max(col, key=abs)
+    if big == 0:
+        return [x.real for x in col]
+    phase = abs(big) / big
+    col = [x * phase for x in col]
+    if all(abs(x.imag) <= tol for x in col):
+        return [x.real for x in col]
+    return col
+
+
+def _jacobi_eigh(a: List[List[float]]) -> Tuple[List[float], List[list]]:
+    """
+    Cyclic Jacobi method for a real symmetric matrix: plane rotations
+    zero the off-diagonal entries one by one until they are negligible.
+    Returns the eigenvalues in ascending order and the eigenvector columns.
+    """
+    n = len(a)
+    a = [[float(x) for x in row] for row in a]
+    v = [[1.0 if i == j else 0.0 for j in range(n)] for i in range(n)]
+    total = sum(x * x for row in a for x in row)
+    for _ in range(JACOBI_MAX_SWEEPS):
+        off = sum(a[p][q] ** 2 for p in range(n) for q in range(p + 1, n))
+        if off <= (EPSILON ** 2) * total:
+            break
+        for p in range(n):
+            for q in range(p + 1, n):
+                apq = a[p][q]
+                if apq == 0.0:
+                    continue
+                theta = (a[q][q] - a[p][p]) / (2 * apq)
+                t = 1.0 / (abs(theta) + sqrt(theta * theta + 1))
+                if theta < 0:
+                    t = -t
+                c = 1.0 / sqrt(t * t + 1)
+                s = t * c
+                for row in a:
+                    rp, rq = row[p], row[q]
+                    row[p] = c * rp - s * rq
+                    row[q] = s * rp + c * rq
+                ap, aq = a[p], a[q]
+                a[p] = [c * x - s * y for x, y in zip(ap, aq)]
+                a[q] = [s * x + c * y for x, y in zip(ap, aq)]
+                for row in v:
+                    vp, vq = row[p], row[q]
+                    row[p] = c * vp - s * vq
+                    row[q] = s * vp + c * vq
+    else:
+        raise ValueError("Jacobi method did not converge.")
+    order = sorted(range(n), key=lambda i: a[i][i])
+    return [a[i][i] for i in order], [[row[i] for row in v] for i in order]
+
+
+def _hessenberg(h: List[List[complex]], z: List[List[complex]] = None):
+    """
+    Reduce h to upper Hessenberg form (zeros below the first subdiagonal)
+    by Householder similarity transforms, in place. z, if given,
+    accumulates the transforms (h = z^H * A * z).
+    """
+    n = len(h)
+    for k in range(n - 2):
+        x = [h[i][k] for i in range(k + 1, n)]
+        if all(xi == 0 for xi in x[1:]):
+            continue
+        norm = sqrt(sum(abs(xi) ** 2 for xi in x))
+        phase = x[0] / abs(x[0]) if x[0] != 0 else 1
+        v = x[:]
+        v[0] += phase * norm
+        beta = 2.0 / sum(abs(vi) ** 2 for vi in v)
+        # Left: P * h on rows k+1..n-1
+        for j in range(k, n):
+            s = beta * sum(vi.conjugate() * h[k + 1 + i][j]
+                           for i, vi in enumerate(v))
+            for i, vi in enumerate(v):
+                h[k + 1 + i][j] -= s * vi
+        # Right: h * P on columns k+1..n-1
+        for m in (h, z) if z is not None else (h,):
+            for row in m:
+                s = beta * sum(row[k + 1 + i] * vi for i, vi in enumerate(v))
+                for i, vi in enumerate(v):
+                    row[k + 1 + i] -= s * vi.conjugate()
+        for i in range(k + 2, n):
+            h[i][k] = 0j
+
+
+def _schur(h: List[List[complex]], z: List[List[complex]] = None):
+    """
+    Shifted QR algorithm on a Hessenberg matrix, in place, until it is
+    upper triangular (Schur form): the eigenvalues end on the diagonal.
+    Each step factors h - mu*I = Q*R with Givens rotations and forms
+    R*Q + mu*I, mu being the Wilkinson shift. Converged eigenvalues are
+    deflated from the bottom. With z, the full Schur form is kept and the
+    rotations are accumulated for the eigenvectors.
+    """
+    n = len(h)
+    full = z is not None
+    hi = n - 1
+    iters = 0
+    while hi > 0:
+        # Look for a negligible subdiagonal entry to split the problem
+        lo = hi
+        while lo > 0:
+            scale = abs(h[lo - 1][lo - 1]) + abs(h[lo][lo])
+            if abs(h[lo][lo - 1]) <= EPSILON * (scale or 1.0):
+                h[lo][lo - 1] = 0j
+                break
+            lo -= 1
+        if lo == hi:
+            hi -= 1
+            iters = 0
+            continue
+        iters += 1
+        if iters > EIG_MAX_ITER:
+            raise ValueError("QR algorithm did not converge.")
+
+        # Wilkinson shift: eigenvalue of the trailing 2x2 closest to h[hi][hi]
+        a, b = h[hi - 1][hi - 1], h[hi - 1][hi]
+        c, d = h[hi][hi - 1], h[hi][hi]
+        half = (a + d) / 2
+        disc = csqrt(half * half - (a * d - b * c))
+        mu = half + disc if abs(half + disc - d) < abs(half - disc - d) \
+            else half - disc
+        if iters % 10 == 0:
+            # Exceptional shift to break a cycle
+            mu += abs(c)
+
+        col_end = n if full else hi + 1
+        row_start = 0 if full else lo
+        for k in range(lo, hi + 1):
+            h[k][k] -= mu
+        rotations = []
+        for k in range(lo, hi):
+            x, y = h[k][k], h[k + 1][k]
+            r = sqrt(abs(x) ** 2 + abs(y) ** 2)
+            cs, sn = (x / r, y / r) if r else (1 + 0j, 0j)
+            ccs, csn = cs.conjugate(), sn.conjugate()
+            rk, rk1 = h[k], h[k + 1]
+            for j in range(k, col_end):
+                u, w = rk[j], rk1[j]
+                rk[j] = ccs * u + csn * w
+                rk1[j] = cs * w - sn * u
+            rotations.append((cs, sn))
+        for k, (cs, sn) in enumerate(rotations, lo):
+            ccs, csn = cs.conjugate(), sn.conjugate()
+            for i in range(row_start, min(k + 2, hi) + 1):
+                row = h[i]
+                u, w = row[k], row[k + 1]
+                row[k] = u * cs + w * sn
+                row[k + 1] = w * ccs - u * csn
+            if full:
+                for row in z:
+                    u, w = row[k], row[k + 1]
+                    row[k] = u * cs + w * sn
+                    row[k + 1] = w * ccs - u * csn
+        for k in range(lo, hi + 1):
+            h[k][k] += mu
+
+
+def _schur_vectors(t: List[List[complex]], z: List[List[complex]]):
+    """
+    Eigenvectors from the Schur form A = Z * T * Z^H: back substitution
+    of (T - t_kk * I) * y = 0 with y_k = 1, then v = Z * y, normalized.
+    """
+    n = len(t)
+    scale = max(abs(x) for row in t for x in row) or 1.0
+    columns = []
+    for k in range(n):
+        lam = t[k][k]
+        y = [0j] * n
+        y[k] = 1 + 0j
+        for j in range(k - 1, -1, -1):
+            s = sum(t[j][m] * y[m] for m in range(j + 1, k + 1))
+            denom = t[j][j] - lam
+            if abs(denom) < EPSILON * scale:
+                # Repeated eigenvalue: perturb to keep y finite
+                denom = EPSILON * scale
+            y[j] = -s / denom
+        v = [sum(row[m] * y[m] for m in range(k + 1)) for row in z]
+        norm = sqrt(sum(abs(x) ** 2 for x in v))
+        columns.append([x / norm for x in v])
+    return columns
+
+
+# ===========================================================================
+# =========================== Rank-one updates ==============================
+# ===========================================================================
+
+
+def _gauss_jordan(
+    a: List[List[T]],
+    checkpoint: Callable = None,
+) -> Tuple[List[List[T]], T]:
+    """
+    Inverse and determinant of a square matrix in O(n^3) by Gauss-Jordan
+    elimination with partial pivoting (largest pivot in the column).
+    `checkpoint`, if given, is called before every column is eliminated.
+    """
+    n = len(a)
+    A = [list(row) for row in a]
+    inv = [[1.0 if i == j else 0.0 for j in range(n)] for i in range(n)]
+    det = 1.0
+    for i in range(n):
+        if checkpoint is not None:
+            checkpoint()
+        p = max(range(i, n), key=lambda r: abs(A[r][i]))
+        if A[p][i] == 0:
+            raise ValueError("Matrix cannot be inverted (singular).")
+        if p != i:
+            A[i], A[p] = A[p], A[i]
+            inv[i], inv[p] = inv[p], inv[i]
+            det = -det
+        pivot = A[i][i]
+        det *= pivot
+        A[i] = [x / pivot for x in A[i]]
+        inv[i] = [x / pivot for x in inv[i]]
+        for r in range(n):
+            factor = A[r][i]
+            if r == i or factor == 0:
+                continue
+            A[r] = [x - factor * y for x, y in zip(A[r], A[i])]
+            inv[r] = [x - factor * y for x, y in zip(inv[r], inv[i])]
+    return inv, det
+
+
+class IncrementalInverse:
+    """
+    Inverse and determinant of a square matrix kept up to date while
+    rows and columns are replaced (Sherman-Morrison and the matrix
+    determinant lemma), appended or removed (bordering with the Schur
+    complement), in O(n^2) per change instead of O(n^3).
+
+    Rounding errors accumulate with every update: the inverse is
+    recomputed from scratch every `refactor_every` updates. An update is
+    refused as singular when the new pivot is below `tol` relative to
+    the terms it was computed from.
+    """
+
+    def __init__(
+        self,
+        A: Matrix,
+        refactor_every: int = 100,
+        tol: float = 1e-10,
+    ):
+        if not A.is_square():
+            raise ValueError("Only square matrices have an inverse.")
+        self.a = [list(row) for row in A.values]
+        self.refactor_every = refactor_every
+        self.tol = tol
+        self.refactor()
+
+    def _check_pivot(self, pivot: T, scale: float):
+        if abs(pivot) <= self.tol * scale:
+            raise ValueError("Update makes the matrix singular.")
+
+    def refactor(self):
+        """Recompute the inverse and determinant from the matrix."""
+        if self.a:
+            self.inv, self.det = _gauss_jordan(self.a)
+        else:
+            self.inv, self.det = [], 1.0
+        self.updates = 0
+
+    def _updated(self):
+        self.updates += 1
+        if self.refactor_every and self.updates >= self.refactor_every:
+            self.refactor()
+
+    def size(self) -> int:
+        return len(self.a)
+
+    def matrix(self) -> Matrix:
+        return Matrix([row[:] for row in self.a])
+
+    def inverse(self) -> Matrix:
+        return Matrix([row[:] for row in self.inv])
+
+    def determinant(self) -> T:
+        return self.det
+
+    def drift(self) -> float:
+        """Largest entry of A * A^-1 - I: how far the inverse has drifted."""
+        n = len(self.a)
+        worst = 0.0
+        for i, row in enumerate(self.a):
+            for j in range(n):
+                s = -1.0 if i == j else 0.0
+                for k in range(n):
+                    s += row[k] * self.inv[k][j]
+                worst = max(worst, abs(s))
+        return worst
+
+    def _rank_one(self, u: List[T], v: List[T]):
+        """
+        A <- A + u * v^T.
+        A'^-1 = A^-1 - (A^-1 u)(v^T A^-1) / (1 + v^T A^-1 u)
+        det(A') = det(A) * (1 + v^T A^-1 u)
+        """
+        n = len(self.a)
+        inv = self.inv
+        x = [sum(inv[i][k] * u[k] for k in range(n)) for i in range(n)]
+        y = [sum(v[k] * inv[k][j] for k in range(n)) for j in range(n)]
+        terms = [v[k] * x[k] for k in range(n)]
+        denom = 1 + sum(terms)
+        self._check_pivot(denom, 1 + sum(abs(t) for t in terms))
+        for i in range(n):
+            if x[i] == 0:
+                continue
+            factor = x[i] / denom
+            inv[i] = [a - factor * b for a, b in zip(inv[i], y)]
+        self.det *= denom
+
+    def replace_row(self, i: int, row: List[T]):
+        """Replace row i of the matrix."""
+        if len(row) != len(self.a):
+            raise ValueError("Row size must match the matrix size.")
+        v = [new - old for new, old in zip(row, self.a[i])]
+        u = [0.0] * len(self.a)
+        u[i] = 1.0
+        self._rank_one(u, v)
+        self.a[i] = list(row)
+        self._updated()
+
+    def replace_column(self, j: int, col: List[T]):
+        """Replace column j of the matrix."""
+        if len(col) != len(self.a):
+            raise ValueError("Column size must match the matrix size.")
+        u = [new - row[j] for new, row in zip(col, self.a)]
+        v = [0.0] * len(self.a)
+        v[j] = 1.0
+        self._rank_one(u, v)
+        for row, new in zip(self.a, col):
+            row[j] = new
+        self._updated()
+
+    def append(self, row: List[T], col: List[T], corner: T):
+        """
+        Grow the matrix to [[A, col], [row, corner]].
+        With the Schur complement s = corner - row * A^-1 * col:
+        det' = det * s and the inverse is bordered in O(n^2).
+        """
+        n = len(self.a)
+        if len(row) != n or len(col) != n:
+            raise ValueError("Row and column sizes must match the matrix.")
+        inv = self.inv
+        x = [sum(inv[i][k] * col[k] for k in range(n)) for i in range(n)]
+        y = [sum(row[k] * inv[k][j] for k in range(n)) for j in range(n)]
+        terms = [row[k] * x[k] for k in range(n)]
+        s = corner - sum(terms)
+        self._check_pivot(s, abs(corner) + sum(abs(t) for t in terms))
+        for i in range(n):
+            factor = x[i] / s
+            inv[i] = [a + factor * b for a, b in zip(inv[i], y)]
+            inv[i].append(-factor)
+        inv.append([-b / s for b in y] + [1 / s])
+        for r, c in zip(self.a, col):
+            r.append(c)
+        self.a.append(list(row) + [corner])
+        self.det *= s
+        self._updated()
+
+    def remove(self, i: int, j: int = None):
+        """
+        Remove row i and column j (j = i by default).
+        With B = A^-1: det' = (-1)^(i+j) * det * B[j][i] and
+        M^-1 = B without row j and column i - B[:, i] * B[j, :] / B[j][i].
+        """
+        if j is None:
+            j = i
+        inv = self.inv
+        pivot = inv[j][i]
+        self._check_pivot(pivot, max(abs(x) for x in inv[j]))
+        pivot_row = inv[j][:i] + inv[j][i + 1:]
+        new_inv = []
+        for r, inv_row in enumerate(inv):
+            if r == j:
+                continue
+            factor = inv_row[i] / pivot
+            rest = inv_row[:i] + inv_row[i + 1:]
+            new_inv.append([a - factor * b for a, b in zip(rest, pivot_row)])
+        self.inv = new_inv
+        del self.a[i]
+        for row in self.a:
+            del row[j]
+        self.det *= pivot if (i + j) % 2 == 0 else -pivot
+        self._updated()
+
+
+# ===========================================================================
+# =========================== Incremental basis =============================
+# ===========================================================================
+
+# A second Gram-Schmidt pass is run when the first one removed more
+# than this share of the norm ("twice is enough", Kahan / Parlett)
+REORTHOGONALIZE = 0.5 ** 0.5
+
+
+class IncrementalBasis:
+    """
+    Orthonormal basis of the span of vectors seen one at a time.
+
+        basis = IncrementalBasis(n)
+        basis.add(v)        True if v is independent of the vectors
+                            added so far (the basis grows by one)
+        basis.project(v)    orthogonal projection of v on the span
+
+    A new vector is orthogonalized against the k basis vectors by
+    modified Gram-Schmidt, twice when the first pass cancelled most of
+    it: O(n * k) per vector, instead of a row echelon form of every
+    vector seen. v is dependent when what is left of it is below
+    tol * ||v|| (tol defaults to n * EPSILON, like rank_revealing).
+    """
+
+    def __init__(self, n: int, tol: float = None):
+        if n < 1:
+            raise ValueError("The vectors need at least one element.")
+        self.n = n
+        self.tol = n * EPSILON if tol is None else tol
+        # Orthonormal basis vectors, as lists
+        self.q = []
+        self.complex = False
+
+    def rank(self) -> int:
+        """Dimension of the span: number of independent vectors added."""
+        return len(self.q)
+
+    def basis(self) -> Matrix:
+        """The orthonormal basis vectors, as the rows of a Matrix."""
+        return Matrix([q[:] for q in self.q])
+
+    def _values(self, v: Vector) -> list:
+        if v.size() != self.n:
+            raise ValueError("Vector size must match the basis size.")
+        values = list(v.values)
+        self.complex = self.complex or is_complex(values)
+        return values
+
+    def _dot(self, q: list, r: list):
+        return _dot_conj(q, r) if self.complex else sum(map(mul, q, r))
+
+    def _norm(self, r: list) -> float:
+        # hypot scales: no overflow / underflow of the squares
+        return hypot(*map(abs, r)) if self.complex else hypot(*r)
+
+    def add(self, v: Vector) -> bool:
+        """
+        Add v to the span. Returns True, and extends the basis, if v is
+        linearly independent of the vectors added so far.
+        """
+        r = self._values(v)
+        norm = start = self._norm(r)
+        if norm == 0 or len(self.q) == self.n:
+            return False
+        for _ in range(2):
+            for q in self.q:
+                s = self._dot(q, r)
+                r = [x - s * y for x, y in zip(r, q)]
+            norm, prev = self._norm(r), norm
+            if norm > REORTHOGONALIZE * prev:
+                break
+        if norm <= self.tol * start:
+            return False
+        self.q.append([x / norm for x in r])
+        return True
+
+    def project(self, v: Vector) -> Vector:
+        """Orthogonal projection of v on the span: sum (q . v) q."""
+        values = self._values(v)
+        res = [0.0] * self.n
+        for q in self.q:
+            s = self._dot(q, values)
+            res = [x + s * y for x, y in zip(res, q)]
+        return Vector(res)
+
+    def residual(self, v: Vector) -> Vector:
+        """v minus its projection: the part of v outside the span."""
+        return Vector([x - y for x, y in zip(v.values,
+                                             self.project(v).values)])
+
+
+# ===========================================================================
+# ============================ Chained products =============================
+# ===========================================================================
+
+
+def _chain_order(dims: List[int]) -> List[List[int]]:
+    """
+    Matrix-chain dynamic programming.
+    Operand i has shape dims[i] x dims[i + 1]; split[i][j] is the index k
+    where the product of operands i..j is cheapest split into
+    (i..k) * (k + 1..j).
+    """
+    n = len(dims) - 1
+    cost = [[0] * n for _ in range(n)]
+    split = [[0] * n for _ in range(n)]
+    for length in range(1, n):
+        for i in range(n - length):
+            j = i + length
+            cost[i][j] = None
+            for k in range(i, j):
+                c = cost[i][k] + cost[k + 1][j] + \
+                    dims[i] * dims[k + 1] * dims[j + 1]
+                if cost[i][j] is None or c < cost[i][j]:
+                    cost[i][j] = c
+                    split[i][j] = k
+    return split
+
+
+def multi_dot(matrices: List[Matrix]) -> Matrix:
+    """
+    Multiply a chain of matrices A * B * C * ... choosing the
+    parenthesisation with the fewest scalar multiplications
+    (e.g. (A * B) * C or A * (B * C)) from the operand shapes.
+    """
+    if not matrices:
+        raise ValueError("multi_dot needs at least one matrix.")
+    dims = [matrices[0].shape()[0]]
+    for mat in matrices:
+        if mat.shape()[0] != dims[-1]:
+            raise ValueError("Dimensions are incompatible for multiplication.")
+        dims.append(mat.shape()[1])
+    split = _chain_order(dims)
+
+    def product(i: int, j: int) -> Matrix:
+        if i == j:
+            return matrices[i]
+        k = split[i][j]
+        return product(i, k).mul_mat(product(k + 1, j))
+
+    return product(0, len(matrices) - 1)
+
+
+# ===========================================================================
+# ========================= Small matrix batches ============================
+# ===========================================================================
+
+
+def _mul_mat2(a: array, b: array) -> List[float]:
+    out = []
+    push = out.extend
+    ia, ib = iter(a), iter(b)
+    for a0, a1, a2, a3, b0, b1, b2, b3 in zip(ia, ia, ia, ia,
+                                              ib, ib, ib, ib):
+        push((a0 * b0 + a1 * b2, a0 * b1 + a1 * b3,
+              a2 * b0 + a3 * b2, a2 * b1 + a3 * b3))
+    return out
+
+
+def _mul_mat3(a: array, b: array) -> List[float]:
+    out = []
+    push = out.extend
+    ia, ib = iter(a), iter(b)
+    for (a0, a1, a2, a3, a4, a5, a6, a7, a8,
+         b0, b1, b2, b3, b4, b5, b6, b7, b8) in zip(*(ia,) * 9, *(ib,) * 9):
+        push((a0 * b0 + a1 * b3 + a2 * b6,
+              a0 * b1 + a1 * b4 + a2 * b7,
+              a0 * b2 + a1 * b5 + a2 * b8,
+              a3 * b0 + a4 * b3 + a5 * b6,
+              a3 * b1 + a4 * b4 + a5 * b7,
+              a3 * b2 + a4 * b5 + a5 * b8,
+              a6 * b0 + a7 * b3 + a8 * b6,
+              a6 * b1 + a7 * b4 + a8 * b7,
+              a6 * b2 + a7 * b5 + a8 * b8))
+    return out
+
+
+def _mul_mat4(a: array, b: array) -> List[float]:
+    out = []
+    push = out.extend
+    ia, ib = iter(a), iter(b)
+    for (a0, a1, a2, a3, a4, a5, a6, a7,
+         a8, a9, a10, a11, a12, a13, a14, a15,
+         b0, b1, b2, b3, b4, b5, b6, b7,
+         b8, b9, b10, b11, b12, b13, b14, b15) in zip(*(ia,) * 16,
+                                                      *(ib,) * 16):
+        push((a0 * b0 + a1 * b4 + a2 * b8 + a3 * b12,
+              a0 * b1 + a1 * b5 + a2 * b9 + a3 * b13,
+              a0 * b2 + a1 * b6 + a2 * b10 + a3 * b14,
+              a0 * b3 + a1 * b7 + a2 * b11 + a3 * b15,
+              a4 * b0 + a5 * b4 + a6 * b8 + a7 * b12,
+              a4 * b1 + a5 * b5 + a6 * b9 + a7 * b13,
+              a4 * b2 + a5 * b6 + a6 * b10 + a7 * b14,
+              a4 * b3 + a5 * b7 + a6 * b11 + a7 * b15,
+              a8 * b0 + a9 * b4 + a10 * b8 + a11 * b12,
+              a8 * b1 + a9 * b5 + a10 * b9 + a11 * b13,
+              a8 * b2 + a9 * b6 + a10 * b10 + a11 * b14,
+              a8 * b3 + a9 * b7 + a10 * b11 + a11 * b15,
+              a12 * b0 + a13 * b4 + a14 * b8 + a15 * b12,
+              a12 * b1 + a13 * b5 + a14 * b9 + a15 * b13,
+              a12 * b2 + a13 * b6 + a14 * b10 + a15 * b14,
+              a12 * b3 + a13 * b7 + a14 * b11 + a15 * b15))
+    return out
+
+
+def _mul_vec2(a: array, x: array) -> List[float]:
+    out = []
+    push = out.extend
+    ia, ix = iter(a), iter(x)
+    for a0, a1, a2, a3, x0, x1 in zip(ia, ia, ia, ia, ix, ix):
+        push((a0 * x0 + a1 * x1, a2 * x0 + a3 * x1))
+    return out
+
+
+def _mul_vec3(a: array, x: array) -> List[float]:
+    out = []
+    push = out.extend
+    ia, ix = iter(a), iter(x)
+    for (a0, a1, a2, a3, a4, a5, a6, a7, a8,
+         x0, x1, x2) in zip(*(ia,) * 9, ix, ix, ix):
+        push((a0 * x0 + a1 * x1 + a2 * x2,
+              a3 * x0 + a4 * x1 + a5 * x2,
+              a6 * x0 + a7 * x1 + a8 * x2))
+    return out
+
+
+def _mul_vec4(a: array, x: array) -> List[float]:
+    out = []
+    push = out.extend
+    ia, ix = iter(a), iter(x)
+    for (a0, a1, a2, a3, a4, a5, a6, a7,
+         a8, a9, a10, a11, a12, a13, a14, a15,
+         x0, x1, x2, x3) in zip(*(ia,) * 16, ix, ix, ix, ix):
+        push((a0 * x0 + a1 * x1 + a2 * x2 + a3 * x3,
+              a4 * x0 + a5 * x1 + a6 * x2 + a7 * x3,
+              a8 * x0 + a9 * x1 + a10 * x2 + a11 * x3,
+              a12 * x0 + a13 * x1 + a14 * x2 + a15 * x3))
+    return out
+
+
+def _det2(a: array) -> List[float]:
+    ia = iter(a)
+    return [a0 * a3 - a1 * a2 for a0, a1, a2, a3 in zip(ia, ia, ia, ia)]
+
+
+def _det3(a: array) -> List[float]:
+    ia = iter(a)
+    return [a0 * (a4 * a8 - a5 * a7) - a1 * (a3 * a8 - a5 * a6)
+            + a2 * (a3 * a7 - a4 * a6)
+            for a0, a1, a2, a3, a4, a5, a6, a7, a8 in zip(*(ia,) * 9)]
+
+
+def _det4(a: array) -> List[float]:
+    out = []
+    push = out.append
+    ia = iter(a)
+    for (a0, a1, a2, a3, a4, a5, a6, a7,
+         a8, a9, a10, a11, a12, a13, a14, a15) in zip(*(ia,) * 16):
+        # 2 x 2 minors of the two top rows (s) and two bottom rows (c)
+        s0 = a0 * a5 - a4 * a1
+        s1 = a0 * a6 - a4 * a2
+        s2 = a0 * a7 - a4 * a3
+        s3 = a1 * a6 - a5 * a2
+        s4 = a1 * a7 - a5 * a3
+        s5 = a2 * a7 - a6 * a3
+        c0 = a8 * a13 - a12 * a9
+        c1 = a8 * a14 - a12 * a10
+        c2 = a8 * a15 - a12 * a11
+        c3 = a9 * a14 - a13 * a10
+        c4 = a9 * a15 - a13 * a11
+        c5 = a10 * a15 - a14 * a11
+        push(s0 * c5 - s1 * c4 + s2 * c3 + s3 * c2 - s4 * c1 + s5 * c0)
+    return out
+
+
+def _singular(index: int):
+    raise ValueError(
+        f"Matrix {index} of the batch cannot be inverted (singular).")
+
+
+def _inverse2(a: array) -> List[float]:
+    out = []
+    push = out.extend
+    ia = iter(a)
+    for i, (a0, a1, a2, a3) in enumerate(zip(ia, ia, ia, ia)):
+        det = a0 * a3 - a1 * a2
+        if det == 0:
+            _singular(i)
+        r = 1.0 / det
+        push((a3 * r, -a1 * r, -a2 * r, a0 * r))
+    return out
+
+
+def _inverse3(a: array) -> List[float]:
+    out = []
+    push = out.extend
+    ia = iter(a)
+    for i, (a0, a1, a2, a3, a4, a5, a6, a7, a8) in enumerate(
+            zip(*(ia,) * 9)):
+        # Adjugate (transposed cofactors)
+        i0 = a4 * a8 - a5 * a7
+        i3 = a5 * a6 - a3 * a8
+        i6 = a3 * a7 - a4 * a6
+        det = a0 * i0 + a1 * i3 + a2 * i6
+        if det == 0:
+            _singular(i)
+        r = 1.0 / det
+        push((i0 * r, (a2 * a7 - a1 * a8) * r, (a1 * a5 - a2 * a4) * r,
+              i3 * r, (a0 * a8 - a2 * a6) * r, (a2 * a3 - a0 * a5) * r,
+              i6 * r, (a1 * a6 - a0 * a7) * r, (a0 * a4 - a1 * a3) * r))
+    return out
+
+
+def _inverse4(a: array) -> List[float]:
+    out = []
+    push = out.extend
+    ia = iter(a)
+    for i, (a0, a1, a2, a3, a4, a5, a6, a7,
+            a8, a9, a10, a11, a12, a13, a14, a15) in enumerate(
+            zip(*(ia,) * 16)):
+        s0 = a0 * a5 - a4 * a1
+        s1 = a0 * a6 - a4 * a2
+        s2 = a0 * a7 - a4 * a3
+        s3 = a1 * a6 - a5 * a2
+        s4 = a1 * a7 - a5 * a3
+        s5 = a2 * a7 - a6 * a3
+        c0 = a8 * a13 - a12 * a9
+        c1 = a8 * a14 - a12 * a10
+        c2 = a8 * a15 - a12 * a11
+        c3 = a9 * a14 - a13 * a10
+        c4 = a9 * a15 - a13 * a11
+        c5 = a10 * a15 - a14 * a11
+        det = s0 * c5 - s1 * c4 + s2 * c3 + s3 * c2 - s4 * c1 + s5 * c0
+        if det == 0:
+            _singular(i)
+        r = 1.0 / det
+        push(((a5 * c5 - a6 * c4 + a7 * c3) * r,
+              (-a1 * c5 + a2 * c4 - a3 * c3) * r,
+              (a13 * s5 - a14 * s4 + a15 * s3) * r,
+              (-a9 * s5 + a10 * s4 - a11 * s3) * r,
+              (-a4 * c5 + a6 * c2 - a7 * c1) * r,
+              (a0 * c5 - a2 * c2 + a3 * c1) * r,
+              (-a12 * s5 + a14 * s2 - a15 * s1) * r,
+              (a8 * s5 - a10 * s2 + a11 * s1) * r,
+              (a4 * c4 - a5 * c2 + a7 * c0) * r,
+              (-a0 * c4 + a1 * c2 - a3 * c0) * r,
+              (a12 * s4 - a13 * s2 + a15 * s0) * r,
+              (-a8 * s4 + a9 * s2 - a11 * s0) * r,
+              (-a4 * c3 + a5 * c1 - a6 * c0) * r,
+              (a0 * c3 - a1 * c1 + a2 * c0) * r,
+              (-a12 * s3 + a13 * s1 - a14 * s0) * r,
+              (a8 * s3 - a9 * s1 + a10 * s0) * r))
+    return out
+
+
+# Unrolled kernels per matrix size
+_BATCH_KERNELS = {
+    2: (_mul_mat2, _mul_vec2, _det2, _inverse2),
+    3: (_mul_mat3, _mul_vec3, _det3, _inverse3),
+    4: (_mul_mat4, _mul_vec4, _det4, _inverse4),
+}
+
+
+class MatrixBatch:
+    """
+    N real matrices of the same size n x n (n = 2, 3 or 4), stored
+    row-major one after the other in one flat array of doubles:
+
+        data = [A0[0][0], A0[0][1], ..., A0[n-1][n-1], A1[0][0], ...]
+
+    Every operation runs a closed-form, unrolled kernel over the whole
+    batch in one call, with no Matrix object or shape check per matrix.
+    A single Matrix (or Vector) operand is broadcast to every matrix.
+    """
+
+    def __init__(self, n: int, data: Iterable[float] = ()):
+        if n not in _BATCH_KERNELS:
+            raise ValueError("Batches hold 2x2, 3x3 or 4x4 matrices.")
+        self.n = n
+        if not (isinstance(data, array) and data.typecode == "d"):
+            data = array("d", data)
+        self.data = data
+        if len(self.data) % (n * n):
+            raise ValueError(
+                f"Batch data is not a whole number of {n}x{n} matrices.")
+
+    @classmethod
+    def from_matrices(cls, matrices: Iterable[Matrix]) -> "MatrixBatch":
+        """Pack Matrix objects (all of the same size) into a batch."""
+        matrices = list(matrices)
+        if not matrices:
+            raise ValueError("Cannot infer the size of an empty batch.")
+        n = matrices[0].shape()[0]
+        data = array("d")
+        for mat in matrices:
+            if mat.shape() != (n, n):
+                raise ValueError("Matrices of a batch have the same size.")
+            for row in mat.values:
+                data.extend(row)
+        return cls(n, data)
+
+    def __len__(self) -> int:
+        return len(self.data) // (self.n * self.n)
+
+    def __getitem__(self, index: int) -> Matrix:
+        """Matrix `index` of the batch, as a Matrix."""
+        n = self.n
+        size = n * n
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Batch index out of range.")
+        flat = self.data[index * size:(index + 1) * size]
+        return Matrix([flat[i * n:(i + 1) * n].tolist() for i in range(n)])
+
+    def __eq__(self, other):
+        """== operator, with the tolerance of Matrix.__eq__."""
+        if not isinstance(other, MatrixBatch) or self.n != other.n or \
+                len(self.data) != len(other.data):
+            return False
+        return all(abs(x - y) <= 1e-8 for x, y in zip(self.data, other.data))
+
+    def to_matrices(self) -> List[Matrix]:
+        return [self[i] for i in range(len(self))]
+
+    def _operand(self, other, width: int) -> array:
+        """Flat data of `other`, repeated when it is a single object."""
+        if isinstance(other, MatrixBatch):
+            if other.n != self.n:
+                raise ValueError("Batches hold matrices of different sizes.")
+            data = other.data
+        elif isinstance(other, Matrix):
+            if other.shape() != (self.n, self.n):
+                raise ValueError("Matrix size does not match the batch.")
+            data = array("d", [x for row in other.values for x in row])
+        elif isinstance(other, Vector):
+            data = array("d", other.values)
+        else:
+            data = other if isinstance(other, array) else array("d", other)
+        if len(data) == width:
+            data = data * len(self)
+        if len(data) != width * len(self):
+            raise ValueError("Operand does not match the batch length.")
+        return data
+
+    def mul_mat(self, other) -> "MatrixBatch":
+        """
+        Products A_i * B_i. `other` is a MatrixBatch of the same length,
+        or a single Matrix applied to every A_i.
+        """
+        kernel = _BATCH_KERNELS[self.n][0]
+        b = self._operand(other, self.n * self.n)
+        return MatrixBatch(self.n, array("d", kernel(self.data, b)))
+
+    def mul_vec(self, vectors) -> array:
+        """
+        Products A_i * x_i. `vectors` is a flat sequence of
+        len(batch) * n values (x_0 then x_1, ...), or a single Vector
+        applied to every A_i. Returns the flat array of the results.
+        """
+        kernel = _BATCH_KERNELS[self.n][1]
+        return array("d", kernel(self.data, self._operand(vectors, self.n)))
+
+    def determinant(self) -> array:
+        """Determinant of every matrix, as an array of len(batch)."""
+        return array("d", _BATCH_KERNELS[self.n][2](self.data))
+
+    def inverse(self) -> "MatrixBatch":
+        """
+        Inverse of every matrix (adjugate / determinant).
+        Raises ValueError naming the first singular matrix.
+        """
+        kernel = _BATCH_KERNELS[self.n][3]
+        return MatrixBatch(self.n, array("d", kernel(self.data)))
+
+    def transpose(self) -> "MatrixBatch":
+        """
+        Transpose of every matrix: entry (i, j) of all the matrices is
+        one strided slice of the data, so swapping the slices of (i, j)
+        and (j, i) moves the whole batch.
+        """
+        n = self.n
+        size = n * n
+        out = array("d", self.data)
+        for i in range(n):
+            for j in range(i + 1, n):
+                out[i * n + j::size] = self.data[j * n + i::size]
+                out[j * n + i::size] = self.data[i * n + j::size]
+        return MatrixBatch(n, out)
+
+
+# ===========================================================================
+# =========================== Banded matrices ===============================
+# ===========================================================================
+
+
+class BandedMatrix:
+    """
+    Square n x n matrix whose non-zero entries lie on the `lower`
+    sub-diagonals, the main diagonal and the `upper` super-diagonals.
+    Only the band is stored, row by row:
+
+        rows[i][k] = A[i][i - lower + k]      k = 0 .. lower + upper
+
+    (entries outside the matrix, in the corners, are stored as 0).
+    Memory and mul_vec cost O(n * bandwidth), solve and determinant
+    O(n * lower * (lower + upper)), instead of O(n^2) and O(n^3).
+    """
+
+    def __init__(
+        self,
+        n: int,
+        lower: int,
+        upper: int,
+        rows: List[List[T]] = None,
+    ):
+        if n < 1 or lower < 0 or upper < 0:
+            raise ValueError("Invalid banded matrix dimensions.")
+        width = lower + upper + 1
+        if rows is None:
+            rows = [[0.0] * width for _ in range(n)]
+        if len(rows) != n or any(len(row) != width for row in rows):
+            raise ValueError(f"Expected {n} band rows of {width} entries.")
+        self.n = n
+        self.lower = lower
+        self.upper = upper
+        self.rows = rows
+
+    @classmethod
+    def from_diagonals(cls, diagonals: dict) -> "BandedMatrix":
+        """
+        Build from {offset: values}: offset 0 is the main diagonal
+        (n values), offset d > 0 the d-th super-diagonal and d < 0 the
+        d-th sub-diagonal (n - |d| values each).
+        """
+        if 0 not in diagonals:
+            raise ValueError("The main diagonal (offset 0) is required.")
+        n = len(diagonals[0])
+        lower = max(0, -min(diagonals))
+        upper = max(0, max(diagonals))
+        band = cls(n, lower, upper)
+        for d, values in diagonals.items():
+            if len(values) != n - abs(d):
+                raise ValueError(f"Diagonal {d} must have "
+                                 f"{n - abs(d)} values.")
+            start = max(0, -d)
+            for i, x in enumerate(values, start):
+                band.rows[i][lower + d] = x
+        return band
+
+    @classmethod
+    def tridiagonal(
+        cls,
+        sub: List[T],
+        diag: List[T],
+        sup: List[T],
+    ) -> "BandedMatrix":
+        """Tridiagonal matrix from its three diagonals."""
+        return cls.from_diagonals({-1: sub, 0: diag, 1: sup})
+
+    @classmethod
+    def identity(cls, n: int) -> "BandedMatrix":
+        """n x n identity, a band of width 1."""
+        return cls(n, 0, 0, [[1.0] for _ in range(n)])
+
+    @classmethod
+    def from_matrix(
+        cls,
+        mat: Matrix,
+        lower: int = None,
+        upper: int = None,
+    ) -> "BandedMatrix":
+        """
+        Band storage of a square Matrix. Without lower / upper, the
+        narrowest band holding every non-zero entry is used; with them,
+        a non-zero entry outside the band raises ValueError.
+        """
+        if not mat.is_square():
+            raise ValueError("Banded matrices are square.")
+        n = mat.shape()[0]
+        values = mat.values
+        nonzero = [j - i for i in range(n) for j in range(n) if values[i][j]]
+        lo = max([0] + [-d for d in nonzero])
+        up = max([0] + nonzero)
+        if lower is None:
+            lower = lo
+        if upper is None:
+            upper = up
+        if lo > lower or up > upper:
+            raise ValueError("Matrix has non-zero entries outside the band.")
+        band = cls(n, lower, upper)
+        for i, row in enumerate(band.rows):
+            for k in range(lower + upper + 1):
+                j = i - lower + k
+                if 0 <= j < n:
+                    row[k] = values[i][j]
+        return band
+
+    def to_matrix(self) -> Matrix:
+        """Dense copy, as a Matrix."""
+        n, lower = self.n, self.lower
+        dense = [[0.0] * n for _ in range(n)]
+        for i, row in enumerate(self.rows):
+            for k, x in enumerate(row):
+                j = i - lower + k
+                if 0 <= j < n:
+                    dense[i][j] = x
+        return Matrix(dense)
+
+    def shape(self) -> Tuple[int, int]:
+        return self.n, self.n
+
+    def transpose(self) -> "BandedMatrix":
+        """A^T: the sub-diagonals become super-diagonals."""
+        n, lower, upper = self.n, self.lower, self.upper
+        res = BandedMatrix(n, upper, lower)
+        # A[i][j] is rows[i][lower + j - i], A^T[j][i] is at
+        # rows[j][upper + i - j] of the result
+        for i, row in enumerate(self.rows):
+            for j in range(max(0, i - lower), min(n, i + upper + 1)):
+                res.rows[j][upper + i - j] = row[lower + j - i]
+        return res
+
+    def __getitem__(self, index: Tuple[int, int]) -> T:
+        """A[i, j], 0 outside the band."""
+        i, j = index
+        if not (0 <= i < self.n and 0 <= j < self.n):
+            raise IndexError("Matrix index out of range.")
+        k = j - i + self.lower
+        if 0 <= k <= self.lower + self.upper:
+            return self.rows[i][k]
+        return 0.0
+
+    def diagonal(self, offset: int = 0) -> List[T]:
+        """Values of the diagonal `offset` (see from_diagonals)."""
+        if not -self.lower <= offset <= self.upper:
+            return [0.0] * max(0, self.n - abs(offset))
+        k = self.lower + offset
+        return [self.rows[i][k] for i in range(max(0, -offset),
+                                                min(self.n, self.n - offset))]
+
+    def mul_vec(self, vec: Vector, out: Vector = None) -> Vector:
+        """A * x in O(n * bandwidth), into `out` when given."""
+        n, lower = self.n, self.lower
+        if vec.size() != n:
+            raise ValueError("Vector size must match the matrix column size.")
+        if out is None:
+            out = Vector([0.0] * n)
+        elif out.size() != n or out is vec:
+            raise ValueError("Output vector must not alias the input and "
+                             "must match the matrix row count.")
+        x = vec.values
+        mac = fma_for(x, self.rows)
+        res = [0.0] * n
+        for i, row in enumerate(self.rows):
+            # Columns i - lower .. i + upper, clipped to the matrix
+            start = max(0, lower - i)
+            stop = min(len(row), n - i + lower)
+            acc = 0.0
+            for a, y in zip(row[start:stop],
+                            x[i - lower + start:i - lower + stop]):
+                acc = mac(a, y, acc)
+            res[i] = acc
+        _write_out(out, res)
+        return out
+
+    def _is_tridiagonal_dominant(self) -> bool:
+        """Tridiagonal and diagonally dominant: Thomas needs no pivoting."""
+        if self.lower != 1 or self.upper != 1:
+            return False
+        return all(abs(row[1]) >= abs(row[0]) + abs(row[2])
+                   for row in self.rows) and \
+            all(row[1] != 0 for row in self.rows)
+
+    def _thomas(self, d: List[T]) -> List[T]:
+        """
+        Thomas algorithm: Gaussian elimination of a tridiagonal system
+        without pivoting, O(n).
+        """
+        n = self.n
+        c = [0.0] * n
+        y = [0.0] * n
+        a0, b0, c0 = self.rows[0]
+        c[0] = c0 / b0
+        y[0] = d[0] / b0
+        for i in range(1, n):
+            a, b, ci = self.rows[i]
+            m = b - a * c[i - 1]
+            c[i] = ci / m
+            y[i] = (d[i] - a * y[i - 1]) / m
+        for i in range(n - 2, -1, -1):
+            y[i] -= c[i] * y[i + 1]
+        return y
+
+    def _eliminate(self, b: List[T] = None):
+        """
+        Banded LU with partial pivoting, applied to b when given.
+        A row swap can push the upper band of U out to lower + upper
+        diagonals, so every working row keeps its own first column.
+        Returns (U rows as (first column, values), pivots sign), or None
+        when the matrix is singular.
+        """
+        n, lower = self.n, self.lower
+        rows = []
+        for i, row in enumerate(self.rows):
+            start = i - lower
+            if start < 0:
+                row = row[-start:]
+                start = 0
+            rows.append([start, row[:n - start]])
+        sign = 1
+        for k in range(n):
+            last = min(n - 1, k + lower)
+            p = max(range(k, last + 1),
+                    key=lambda r: abs(rows[r][1][k - rows[r][0]]))
+            if rows[p][1][k - rows[p][0]] == 0:
+                return None
+            if p != k:
+                rows[k], rows[p] = rows[p], rows[k]
+                if b is not None:
+                    b[k], b[p] = b[p], b[k]
+                sign = -sign
+            # Pivot row from column k on
+            start, values = rows[k]
+            pivot = values[k - start:]
+            rows[k] = [k, pivot]
+            for r in range(k + 1, last + 1):
+                start, values = rows[r]
+                values = values[k - start:]
+                if len(values) < len(pivot):
+                    values += [0.0] * (len(pivot) - len(values))
+                factor = values[0] / pivot[0]
+                if factor:
+                    values = [x - factor * y for x, y in zip(values, pivot)] \
+                        + values[len(pivot):]
+                    if b is not None:
+                        b[r] -= factor * b[k]
+                # Column k is now eliminated
+                rows[r] = [k + 1, values[1:]]
+        return rows, sign
+
+    def solve(self, b: Vector) -> Vector:
+        """
+        Solve A * x = b: Thomas algorithm for diagonally dominant
+        tridiagonal matrices, banded LU with partial pivoting otherwise.
+        """
+        n = self.n
+        if b.size() != n:
+            raise ValueError("Vector size must match the matrix row size.")
+        if self._is_tridiagonal_dominant():
+            try:
+                return Vector(self._thomas(b.values))
+            except ZeroDivisionError:
+                # Only weakly dominant and singular: let the LU report it
+                pass
+        y = list(b.values)
+        res = self._eliminate(y)
+        if res is None:
+            raise ValueError("Matrix is singular.")
+        rows = res[0]
+        x = [0.0] * n
+        for i in range(n - 1, -1, -1):
+            u = rows[i][1]
+            s = y[i]
+            for a, z in zip(u[1:], x[i + 1:i + len(u)]):
+                s -= a * z
+            x[i] = s / u[0]
+        return Vector(x)
+
+    def determinant(self) -> T:
+        """
+        Determinant in O(n * bandwidth^2). Tridiagonal matrices use the
+        three-term recurrence f(i) = b(i) f(i-1) - a(i) c(i-1) f(i-2),
+        exact for integers; other bands the pivots of the banded LU.
+        """
+        if self.lower == 1 and self.upper == 1 or \
+                self.lower + self.upper == 0:
+            f0, f1 = 1, 0
+            prev_c = 0
+            for row in self.rows:
+                a = row[0] if self.lower else 0
+                b = row[self.lower]
+                f0, f1 = b * f0 - a * prev_c * f1, f0
+                prev_c = row[-1] if self.upper else 0
+            return f0
+        res = self._eliminate()
+        if res is None:
+            return 0.0
+        rows, sign = res
+        det = sign
+        for _, u in rows:
+            det *= u[0]
+        return det
+
+
+# ===========================================================================
+# ========================== Symmetric matrices =============================
+# ===========================================================================
+
+
+class SymmetricMatrix:
+    """
+    Symmetric n x n matrix in packed storage: only the upper triangle
+    is kept, row by row, in one flat list of n * (n + 1) / 2 values
+
+        values = [A00, A01, .. A0n-1, A11, A12, .. A1n-1, .. An-1n-1]
+
+    so A[i][j] (i <= j) sits at offset(i) + j - i. Half the memory of
+    a Matrix, and mul_vec reads every stored entry once for both
+    triangles.
+    """
+
+    def __init__(self, n: int, values: List[T] = None):
+        if n < 1:
+            raise ValueError("Invalid symmetric matrix dimensions.")
+        size = n * (n + 1) // 2
+        if values is None:
+            values = [0.0] * size
+        if len(values) != size:
+            raise ValueError(f"Expected {size} packed values.")
+        self.n = n
+        self.values = values
+
+    @classmethod
+    def from_matrix(cls, mat: Matrix, tol: float = 0.0) -> "SymmetricMatrix":
+        """Pack a symmetric Matrix (ValueError if it is not, up to tol)."""
+        if not mat.is_symmetric(tol):
+            raise ValueError("Matrix is not symmetric.")
+        n = mat.shape()[0]
+        return cls(n, [x for i, row in enumerate(mat.values)
+                       for x in row[i:]])
+
+    def to_matrix(self) -> Matrix:
+        """Dense copy, as a Matrix."""
+        n = self.n
+        dense = [[0.0] * n for _ in range(n)]
+        start = 0
+        for i in range(n):
+            row = self.values[start:start + n - i]
+            dense[i][i:] = row
+            for j, x in enumerate(row[1:], i + 1):
+                dense[j][i] = x
+            start += n - i
+        return Matrix(dense)
+
+    def shape(self) -> Tuple[int, int]:
+        return self.n, self.n
+
+    def _offset(self, i: int, j: int) -> int:
+        if not (0 <= i < self.n and 0 <= j < self.n):
+            raise IndexError("Matrix index out of range.")
+        if i > j:
+            i, j = j, i
+        return i * self.n - i * (i - 1) // 2 + j - i
+
+    def __getitem__(self, index: Tuple[int, int]) -> T:
+        return self.values[self._offset(*index)]
+
+    def __setitem__(self, index: Tuple[int, int], value: T):
+        """A[i, j] = A[j, i] = value."""
+        self.values[self._offset(*index)] = value
+
+    def __eq__(self, other):
+        """== operator, with the tolerance of Matrix.__eq__."""
+        if not isinstance(other, SymmetricMatrix) or self.n != other.n:
+            return False
+        return all(abs(x - y) <= 1e-8
+                   for x, y in zip(self.values, other.values))
+
+    def mul_vec(self, vec: Vector, out: Vector = None) -> Vector:
+        """
+        A * x reading the packed triangle once: row i of the upper
+        triangle gives y[i] (with the diagonal) and, as column i of
+        the lower triangle, adds x[i] * A[i][j] to every y[j], j > i.
+        """
+        n = self.n
+        if vec.size() != n:
+            raise ValueError("Vector size must match the matrix column size.")
+        if out is None:
+            out = Vector([0.0] * n)
+        elif out.size() != n or out is vec:
+            raise ValueError("Output vector must not alias the input and "
+                             "must match the matrix row count.")
+        x = vec.values
+        mac = fma_for(x, self.values)
+        y = [0.0] * n
+        start = 0
+        for i in range(n):
+            stop = start + n - i
+            row = self.values[start:stop]
+            acc = y[i]
+            for a, z in zip(row, x[i:]):
+                acc = mac(a, z, acc)
+            y[i] = acc
+            xi = x[i]
+            if xi and i + 1 < n:
+                y[i + 1:] = map(mac, repeat(xi), row[1:], y[i + 1:])
+            start = stop
+        _write_out(out, y)
+        return out
+
+    def syrk(
+        self,
+        mat: Matrix,
+        alpha: T = 1,
+        rows: bool = False,
+    ) -> "SymmetricMatrix":
+        """
+        Symmetric rank-k update, in place: C += alpha * A^T * A, or
+        C += alpha * A * A^T with rows=True. Only the upper triangle is
+        updated. Accumulating the samples batch by batch this way gives
+        the same scatter matrix as one gram() of all of them.
+        """
+        values = mat.values
+        if (mat.shape()[0] if rows else mat.shape()[1]) != self.n:
+            raise ValueError("Dimensions are incompatible for the update.")
+        c = self.values
+        mac = fma_for(values, c)
+        n = self.n
+        if rows:
+            # C[i][j] += alpha * <row i, row j>, j >= i
+            k = 0
+            for i, u in enumerate(values):
+                for v in values[i:]:
+                    acc = 0.0
+                    for a, b in zip(u, v):
+                        acc = mac(a, b, acc)
+                    c[k] = mac(alpha, acc, c[k])
+                    k += 1
+            return self
+        # One rank-1 update a^T * a of the upper triangle per row of A
+        for a in values:
+            start = 0
+            for i, ai in enumerate(a):
+                stop = start + n - i
+                if ai:
+                    c[start:stop] = map(mac, repeat(alpha * ai), a[i:],
+                                        c[start:stop])
+                start = stop
+        return self
+
+
+# ===========================================================================
+# ============================ Block matrices ===============================
+# ===========================================================================
+
+
+def _dense(block) -> Matrix:
+    return block if isinstance(block, Matrix) else block.to_matrix()
+
+
+def _is_diagonal(block) -> bool:
+    return isinstance(block, BandedMatrix) and block.lower + block.upper == 0
+
+
+def _block_copy(block):
+    if isinstance(block, BandedMatrix):
+        return BandedMatrix(block.n, block.lower, block.upper,
+                            [row[:] for row in block.rows])
+    if isinstance(block, SymmetricMatrix):
+        return SymmetricMatrix(block.n, block.values[:])
+    return Matrix([row[:] for row in _dense(block).values])
+
+
+def _block_transpose(block):
+    if block is None:
+        return None
+    if isinstance(block, SymmetricMatrix):
+        return _block_copy(block)
+    if isinstance(block, BandedMatrix):
+        return block.transpose()
+    return _dense(block).transpose()
+
+
+def _block_mul(a, b):
+    """
+    Product of two blocks with the cheapest kernel for their types:
+    zero blocks (None) are skipped, diagonal blocks scale rows or
+    columns, banded and symmetric blocks use their mul_vec per column,
+    dense blocks Matrix.mul_mat.
+    """
+    if a is None or b is None:
+        return None
+    if _is_diagonal(a):
+        d = [row[0] for row in a.rows]
+        if all(x == 1 for x in d):
+            return _block_copy(b)
+        if isinstance(b, BandedMatrix):
+            return BandedMatrix(b.n, b.lower, b.upper,
+                                [[x * di for x in row]
+                                 for di, row in zip(d, b.rows)])
+        return Matrix([[x * di for x in row]
+                       for di, row in zip(d, _dense(b).values)])
+    if _is_diagonal(b):
+        d = [row[0] for row in b.rows]
+        if all(x == 1 for x in d):
+            return _block_copy(a)
+        return Matrix([[x * di for x, di in zip(row, d)]
+                       for row in _dense(a).values])
+    if isinstance(a, (BandedMatrix, SymmetricMatrix)):
+        columns = [a.mul_vec(Vector(list(col))).values
+                   for col in zip(*_dense(b).values)]
+        return Matrix([list(row) for row in zip(*columns)])
+    return _dense(a).mul_mat(_dense(b))
+
+
+def _block_add(a, b, sign: int = 1):
+    """a + sign * b, None standing for a zero block."""
+    if b is None:
+        return a
+    if a is None:
+        if sign == 1:
+            return b
+        return Matrix([[-x for x in row] for row in _dense(b).values])
+    return Matrix([[x + sign * y for x, y in zip(ra, rb)]
+                   for ra, rb in zip(_dense(a).values, _dense(b).values)])
+
+
+class _BlockPivot:
+    """Diagonal block of the block elimination: solves and determinant."""
+
+    def __init__(self, block):
+        self.block = block
+        if _is_diagonal(block):
+            self.diag = [row[0] for row in block.rows]
+            if not all(self.diag):
+                raise ValueError("Matrix is singular.")
+            self.det = 1.0
+            for x in self.diag:
+                self.det *= x
+        elif isinstance(block, BandedMatrix):
+            self.det = block.determinant()
+            if self.det == 0:
+                raise ValueError("Matrix is singular.")
+        else:
+            inv, self.det = _gauss_jordan(_dense(block).values)
+            self.inv = Matrix(inv)
+
+    def solve_vec(self, v: List[T]) -> List[T]:
+        if _is_diagonal(self.block):
+            return [x / d for x, d in zip(v, self.diag)]
+        if isinstance(self.block, BandedMatrix):
+            return self.block.solve(Vector(v)).values
+        return self.inv.mul_vec(Vector(v)).values
+
+    def solve_mat(self, block) -> Matrix:
+        """P^-1 * block."""
+        if _is_diagonal(self.block):
+            return Matrix([[x / d for x in row]
+                           for d, row in zip(self.diag, _dense(block).values)])
+        if isinstance(self.block, BandedMatrix):
+            columns = [self.solve_vec(list(col))
+                       for col in zip(*_dense(block).values)]
+            return Matrix([list(row) for row in zip(*columns)])
+        return self.inv.mul_mat(_dense(block))
+
+
+class BlockMatrix:
+    """
+    Matrix partitioned into a grid of blocks. A block is a Matrix, a
+    BandedMatrix (BandedMatrix.identity(n) for identities), a
+    SymmetricMatrix, or None for a zero block. Zero blocks are never
+    stored or multiplied and every block product uses the kernel of
+    its types (see _block_mul).
+
+        K = BlockMatrix([[A, B],
+                         [B.transpose(), None]])
+
+    row_sizes / col_sizes give the heights and widths of the block rows
+    and columns; they are only needed when a whole block row or column
+    is zero. Products may share blocks with their operands.
+    """
+
+    def __init__(
+        self,
+        blocks: List[list],
+        row_sizes: List[int] = None,
+        col_sizes: List[int] = None,
+    ):
+        if not blocks or not blocks[0] or \
+                any(len(row) != len(blocks[0]) for row in blocks):
+            raise ValueError("Blocks must form a non-empty grid.")
+        rows = list(row_sizes or [None] * len(blocks))
+        cols = list(col_sizes or [None] * len(blocks[0]))
+        if len(rows) != len(blocks) or len(cols) != len(blocks[0]):
+            raise ValueError("One size is needed per block row and column.")
+        for i, row in enumerate(blocks):
+            for j, block in enumerate(row):
+                if block is None:
+                    continue
+                h, w = block.shape()
+                if rows[i] is None:
+                    rows[i] = h
+                if cols[j] is None:
+                    cols[j] = w
+                if (h, w) != (rows[i], cols[j]):
+                    raise ValueError(f"Block ({i}, {j}) is {h} x {w}, "
+                                     f"expected {rows[i]} x {cols[j]}.")
+        if None in rows or None in cols:
+            raise ValueError("The size of a zero block row or column "
+                             "must be given.")
+        self.blocks = blocks
+        self.row_sizes = rows
+        self.col_sizes = cols
+
+    def shape(self) -> Tuple[int, int]:
+        return sum(self.row_sizes), sum(self.col_sizes)
+
+    def to_matrix(self) -> Matrix:
+        """Dense copy, as a Matrix."""
+        out = []
+        for i, row in enumerate(self.blocks):
+            dense = [[0.0] * self.shape()[1] for _ in range(self.row_sizes[i])]
+            start = 0
+            for j, block in enumerate(row):
+                if block is not None:
+                    for r, values in zip(dense, _dense(block).values):
+                        r[start:start + self.col_sizes[j]] = values
+                start += self.col_sizes[j]
+            out.extend(dense)
+        return Matrix(out)
+
+    def _split(self, values: List[T], sizes: List[int]) -> List[List[T]]:
+        parts = []
+        start = 0
+        for size in sizes:
+            parts.append(values[start:start + size])
+            start += size
+        return parts
+
+    def mul_vec(self, vec: Vector, out: Vector = None) -> Vector:
+        """A * x, one mul_vec per non-zero block."""
+        rows, cols = self.shape()
+        if vec.size() != cols:
+            raise ValueError("Vector size must match the matrix column size.")
+        if out is None:
+            out = Vector([0.0] * rows)
+        elif out.size() != rows or out is vec:
+            raise ValueError("Output vector must not alias the input and "
+                             "must match the matrix row count.")
+        parts = [Vector(x) for x in self._split(vec.values, self.col_sizes)]
+        res = []
+        for row, size in zip(self.blocks, self.row_sizes):
+            acc = [0.0] * size
+            for block, x in zip(row, parts):
+                if block is not None:
+                    acc = [a + b for a, b in zip(acc, block.mul_vec(x).values)]
+            res.extend(acc)
+        _write_out(out, res)
+        return out
+
+    def mul_mat(self, other: "BlockMatrix") -> "BlockMatrix":
+        """
+        Block product: C[i][j] = sum of A[i][k] * B[k][j] over the pairs
+        of non-zero blocks. The column partition of A must match the row
+        partition of B.
+        """
+        if self.col_sizes != other.row_sizes:
+            raise ValueError("Block partitions are incompatible for "
+                             "multiplication.")
+        grid = []
+        for row in self.blocks:
+            out_row = []
+            for j in range(len(other.col_sizes)):
+                acc = None
+                for k, a in enumerate(row):
+                    acc = _block_add(acc, _block_mul(a, other.blocks[k][j]))
+                out_row.append(acc)
+            grid.append(out_row)
+        return BlockMatrix(grid, self.row_sizes, other.col_sizes)
+
+    def transpose(self) -> "BlockMatrix":
+        return BlockMatrix([[_block_transpose(self.blocks[i][j])
+                             for i in range(len(self.blocks))]
+                            for j in range(len(self.col_sizes))],
+                           self.col_sizes, self.row_sizes)
+
+    def _eliminate(self, rhs: List[List[T]] = None):
+        """
+        Block LU without block pivoting: the blocks below each diagonal
+        block P are eliminated, A[i][j] -= A[i][k] * P^-1 * A[k][j]
+        (Schur complement), skipping zero blocks. Returns the reduced
+        upper block triangle and the pivots (_BlockPivot); ValueError
+        when a pivot block is zero or singular.
+        """
+        grid = [row[:] for row in self.blocks]
+        pivots = []
+        count = len(grid)
+        for k in range(count):
+            if grid[k][k] is None:
+                raise ValueError("Matrix is singular.")
+            pivot = _BlockPivot(grid[k][k])
+            pivots.append(pivot)
+            below = [i for i in range(k + 1, count) if grid[i][k] is not None]
+            if not below:
+                continue
+            # P^-1 * A[k][j], shared by every block row below
+            solved = {j: pivot.solve_mat(grid[k][j])
+                      for j in range(k + 1, count) if grid[k][j] is not None}
+            y = pivot.solve_vec(rhs[k]) if rhs is not None else None
+            for i in below:
+                factor = grid[i][k]
+                for j, block in solved.items():
+                    grid[i][j] = _block_add(grid[i][j],
+                                            _block_mul(factor, block), -1)
+                if rhs is not None:
+                    rhs[i] = [a - b for a, b in
+                              zip(rhs[i], factor.mul_vec(Vector(y)).values)]
+                grid[i][k] = None
+        return grid, pivots
+
+    def _square_blocks(self) -> bool:
+        if self.row_sizes != self.col_sizes:
+            if sum(self.row_sizes) != sum(self.col_sizes):
+                raise ValueError("Only square matrices can be solved.")
+            return False
+        return True
+
+    def solve(self, b: Vector) -> Vector:
+        """
+        Solve A * x = b by block elimination (Schur complements), then
+        block back substitution. Only the diagonal blocks are inverted.
+        Falls back to dense Gaussian elimination when a diagonal block
+        is zero or singular, or the diagonal blocks are not square.
+        """
+        if b.size() != self.shape()[0]:
+            raise ValueError("Vector size must match the matrix row size.")
+        if self._square_blocks():
+            rhs = self._split(list(b.values), self.row_sizes)
+            try:
+                grid, pivots = self._eliminate(rhs)
+            except ValueError:
+                grid = None
+            if grid is not None:
+                x = [None] * len(grid)
+                for k in range(len(grid) - 1, -1, -1):
+                    v = rhs[k]
+                    for j in range(k + 1, len(grid)):
+                        if grid[k][j] is not None:
+                            v = [a - c for a, c in zip(
+                                v, grid[k][j].mul_vec(Vector(x[j])).values)]
+                    x[k] = pivots[k].solve_vec(v)
+                return Vector([z for part in x for z in part])
+        return Vector(_gauss_solve(self.to_matrix().values, b.values))
+
+    def determinant(self) -> T:
+        """
+        Product of the determinants of the diagonal blocks after block
+        elimination: det [[A, B], [C, D]] = det(A) * det(D - C A^-1 B).
+        Falls back to dense elimination like solve.
+        """
+        if self._square_blocks():
+            try:
+                det = 1.0
+                for pivot in self._eliminate()[1]:
+                    det *= pivot.det
+                return det
+            except ValueError:
+                pass
+        try:
+            return _gauss_jordan(self.to_matrix().values)[1]
+        except ValueError:
+            return 0.0
+
+
+# ===========================================================================
+# =========================== Iterative solvers =============================
+# ===========================================================================
+
+SolveInfo = namedtuple("SolveInfo",
+                       ["converged", "iterations", "residuals", "time"])
+
+# Relative residual ||b - A x|| / ||b|| at which the solvers stop
+ITERATIVE_TOL = 1e-10
+
+# Krylov basis size of GMRES between two restarts
+GMRES_RESTART = 30
+
+
+@runtime_checkable
+class LinearOperator(Protocol):
+    """
+    Anything the iterative solvers can multiply a vector by: Matrix,
+    BandedMatrix, FunctionOperator or a user class. mul_vec writes
+    A * vec into `out` when given (or returns a new Vector holding it).
+    """
+
+    def shape(self) -> Tuple[int, int]:
+        ...
+
+    def mul_vec(self, vec: Vector, out: Vector = None) -> Vector:
+        ...
+
+
+class FunctionOperator:
+    """
+    Matrix-free operator: `func(vec) -> Vector` computes A * vec
+    without A ever being stored (stencils, products of operators...).
+    """
+
+    def __init__(self, shape: Tuple[int, int], func: Callable):
+        self._shape = tuple(shape)
+        self.func = func
+
+    def shape(self) -> Tuple[int, int]:
+        return self._shape
+
+    def mul_vec(self, vec: Vector, out: Vector = None) -> Vector:
+        res = self.func(vec)
+        if out is None:
+            return res
+        _write_out(out, list(res.values))
+        return out
+
+
+def _sparse_rows(op) -> List[dict]:
+    """Non-zero entries of a stored operator, as {column: value}."""
+    if isinstance(op, Matrix):
+        return [{j: x for j, x in enumerate(row) if x} for row in op.values]
+    if isinstance(op, BandedMatrix):
+        return [{i - op.lower + k: x for k, x in enumerate(row) if x}
+                for i, row in enumerate(op.rows)]
+    if isinstance(op, (SymmetricMatrix, BlockMatrix)):
+        return _sparse_rows(op.to_matrix())
+    raise ValueError("Preconditioners need a Matrix, BandedMatrix, "
+                     "SymmetricMatrix or BlockMatrix.")
+
+
+class JacobiPreconditioner:
+    """M = diag(A): z = r / A[i][i]. Cheap, helps badly scaled rows."""
+
+    def __init__(self, op):
+        diag = [row.get(i, 0) for i, row in enumerate(_sparse_rows(op))]
+        if not all(diag):
+            raise ValueError("Jacobi preconditioner needs a non-zero "
+                             "diagonal.")
+        self.inv_diag = [1.0 / d for d in diag]
+
+    def apply(self, r: Vector, out: Vector) -> Vector:
+        """Write M^-1 * r into out."""
+        _write_out(out, [x * d for x, d in zip(r.values, self.inv_diag)])
+        return out
+
+
+class ILUPreconditioner:
+    """
+    Incomplete LU, ILU(0): Gaussian elimination without pivoting that
+    only keeps the entries where A is non-zero, so L + U is as sparse
+    as A. Exact for tridiagonal matrices.
+    """
+
+    def __init__(self, op):
+        rows = _sparse_rows(op)
+        n = len(rows)
+        self.lower = [None] * n
+        self.upper = [None] * n
+        self.diag = [0.0] * n
+        for i, row in enumerate(rows):
+            for k in sorted(j for j in row if j < i):
+                f = row[k] = row[k] / self.diag[k]
+                for j, u in self.upper[k]:
+                    if j in row:
+                        row[j] -= f * u
+            if not row.get(i):
+                raise ValueError("Zero pivot in the incomplete LU.")
+            self.diag[i] = row[i]
+            self.lower[i] = [(j, x) for j, x in row.items() if j < i]
+            self.upper[i] = [(j, x) for j, x in row.items() if j > i]
+
+    def apply(self, r: Vector, out: Vector) -> Vector:
+        """Solve L * U * z = r into out (forward, then back substitution)."""
+        z = [0.0] * len(self.diag)
+        for i, lower in enumerate(self.lower):
+            s = r.values[i]
+            for j, x in lower:
+                s -= x * z[j]
+            z[i] = s
+        for i in range(len(z) - 1, -1, -1):
+            s = z[i]
+            for j, x in self.upper[i]:
+                s -= x * z[j]
+            z[i] = s / self.diag[i]
+        _write_out(out, z)
+        return out
+
+
+def _dot(u: List[float], v: List[float]) -> float:
+    acc = 0.0
+    for x, y in zip(u, v):
+        acc = fma(x, y, acc)
+    return acc
+
+
+def _product(op, vec: Vector, out: Vector):
+    """out = op * vec, for operators that may ignore `out`."""
+    # The solvers update their work vectors in place: an ndarray cached
+    # by the NumPy backend on an earlier product is stale
+    vec._array = None
+    res = op.mul_vec(vec, out)
+    if res is not out:
+        _write_out(out, list(res.values))
+
+
+def _start(op, b: Vector, x0: Vector):
+    """Check the system, return (n, ||b||, x, r = b - A x)."""
+    n, m = op.shape()
+    if n != m:
+        raise ValueError("Iterative solvers need a square operator.")
+    if b.size() != n or x0 is not None and x0.size() != n:
+        raise ValueError("Vector size must match the matrix row size.")
+    x = Vector([0.0] * n if x0 is None else list(x0.values))
+    r = Vector([0.0] * n)
+    _product(op, x, r)
+    r.values[:] = [y - z for y, z in zip(b.values, r.values)]
+    return n, sqrt(_dot(b.values, b.values)), x, r
+
+
+def cg(
+    op: LinearOperator,
+    b: Vector,
+    x0: Vector = None,
+    tol: float = None,
+    max_iter: int = None,
+    precond=None,
+) -> Tuple[Vector, SolveInfo]:
+    """
+    Conjugate gradient for symmetric positive definite operators.
+    Each iteration costs one mul_vec and a few O(n) vector updates, on
+    work vectors allocated once. Stops when ||b - A x|| <= tol * ||b||
+    or after max_iter iterations (10 n by default).
+    """
+    start = perf_counter()
+    n, bnorm, x, r = _start(op, b, x0)
+    tol = ITERATIVE_TOL if tol is None else tol
+    max_iter = 10 * n if max_iter is None else max_iter
+    z = r if precond is None else precond.apply(r, Vector([0.0] * n))
+    p = Vector(list(z.values))
+    q = Vector([0.0] * n)
+    rz = _dot(r.values, z.values)
+    residuals = [sqrt(_dot(r.values, r.values))]
+    it = 0
+    while residuals[-1] > tol * bnorm and it < max_iter:
+        _product(op, p, q)
+        pq = _dot(p.values, q.values)
+        if pq <= 0:
+            raise ValueError("Conjugate gradient needs a symmetric "
+                             "positive definite matrix.")
+        alpha = rz / pq
+        x.values[:] = [fma(alpha, y, w) for y, w in zip(p.values, x.values)]
+        r.values[:] = [fma(-alpha, y, w) for y, w in zip(q.values, r.values)]
+        residuals.append(sqrt(_dot(r.values, r.values)))
+        it += 1
+        if precond is not None:
+            precond.apply(r, z)
+        rz, prev = _dot(r.values, z.values), rz
+        beta = rz / prev
+        p.values[:] = [fma(beta, y, w) for y, w in zip(p.values, z.values)]
+    converged = residuals[-1] <= tol * bnorm
+    return x, SolveInfo(converged, it, residuals, perf_counter() - start)
+
+
+def _givens(a: float, b: float) -> Tuple[float, float, float]:
+    """Rotation (c, s) zeroing b in (a, b), and the rotated a."""
+    d = hypot(a, b)
+    if d == 0:
+        return 1.0, 0.0, 0.0
+    return a / d, b / d, d
+
+
+def gmres(
+    op: LinearOperator,
+    b: Vector,
+    x0: Vector = None,
+    tol: float = None,
+    max_iter: int = None,
+    precond=None,
+    restart: int = None,
+) -> Tuple[Vector, SolveInfo]:
+    """
+    Restarted GMRES(restart) for any non-singular operator. Builds an
+    orthonormal Krylov basis (modified Gram-Schmidt, the Hessenberg
+    matrix is reduced by Givens rotations as it grows) and picks the x
+    minimizing ||b - A x|| in it. The basis is dropped every `restart`
+    vectors (GMRES_RESTART) to bound memory to restart + 1 vectors.
+    The preconditioner is applied on the right, A M^-1 u = b, so the
+    reported residuals are those of the original system.
+    max_iter counts the inner iterations (10 n by default).
+    """
+    start = perf_counter()
+    n, bnorm, x, r = _start(op, b, x0)
+    tol = ITERATIVE_TOL if tol is None else tol
+    max_iter = 10 * n if max_iter is None else max_iter
+    m = min(n, GMRES_RESTART if restart is None else restart)
+    if m < 1:
+        raise ValueError("GMRES needs a restart length of at least 1.")
+    basis = [Vector([0.0] * n) for _ in range(m + 1)]
+    z = Vector([0.0] * n)
+    h = [[0.0] * m for _ in range(m + 1)]
+    cs = [0.0] * m
+    sn = [0.0] * m
+    beta = sqrt(_dot(r.values, r.values))
+    residuals = [beta]
+    it = 0
+    while beta > tol * bnorm and it < max_iter:
+        basis[0].values[:] = [y / beta for y in r.values]
+        g = [beta] + [0.0] * m
+        k = 0
+        while k < m and it < max_iter:
+            v = basis[k]
+            if precond is not None:
+                v = precond.apply(v, z)
+            w = basis[k + 1]
+            _product(op, v, w)
+            for i in range(k + 1):
+                hik = h[i][k] = _dot(w.values, basis[i].values)
+                w.values[:] = [fma(-hik, y, u) for y, u
+                               in zip(basis[i].values, w.values)]
+            norm = sqrt(_dot(w.values, w.values))
+            for i in range(k):
+                h[i][k], h[i + 1][k] = \
+                    cs[i] * h[i][k] + sn[i] * h[i + 1][k], \
+                    -sn[i] * h[i][k] + cs[i] * h[i + 1][k]
+            cs[k], sn[k], h[k][k] = _givens(h[k][k], norm)
+            g[k + 1] = -sn[k] * g[k]
+            g[k] *= cs[k]
+            k += 1
+            it += 1
+            residuals.append(abs(g[k]))
+            if residuals[-1] <= tol * bnorm or norm == 0:
+                break
+            w.values[:] = [y / norm for y in w.values]
+        # Least squares solution of the triangular system H y = g
+        y = [0.0] * k
+        for i in range(k - 1, -1, -1):
+            s = g[i] - _dot(h[i][i + 1:k], y[i + 1:])
+            y[i] = s / h[i][i] if h[i][i] else 0.0
+        u = z.values
+        u[:] = [0.0] * n
+        for yi, v in zip(y, basis):
+            u[:] = [fma(yi, a, c) for a, c in zip(v.values, u)]
+        if precond is not None:
+            u = precond.apply(Vector(u[:]), z).values
+        x.values[:] = [a + c for a, c in zip(x.values, u)]
+        # True residual at each restart, the rotations only estimate it
+        _product(op, x, r)
+        r.values[:] = [c - a for c, a in zip(b.values, r.values)]
+        beta = residuals[-1] = sqrt(_dot(r.values, r.values))
+    converged = beta <= tol * bnorm
+    return x, SolveInfo(converged, it, residuals, perf_counter() - start)
+
+
+def bicgstab(
+    op: LinearOperator,
+    b: Vector,
+    x0: Vector = None,
+    tol: float = None,
+    max_iter: int = None,
+    precond=None,
+) -> Tuple[Vector, SolveInfo]:
+    """
+    BiCGSTAB for non-symmetric operators: two mul_vec per iteration
+    and a fixed set of eight work vectors, unlike GMRES whose memory
+    grows with the basis. Convergence is not monotonic and the method
+    can break down (rho = 0), in which case converged is False.
+    The preconditioner is applied on the right.
+    """
+    start = perf_counter()
+    n, bnorm, x, r = _start(op, b, x0)
+    tol = ITERATIVE_TOL if tol is None else tol
+    max_iter = 10 * n if max_iter is None else max_iter
+    r_hat = list(r.values)
+    p = Vector([0.0] * n)
+    v = Vector([0.0] * n)
+    t = Vector([0.0] * n)
+    p_hat = Vector([0.0] * n) if precond is not None else p
+    s_hat = Vector([0.0] * n) if precond is not None else r
+    rho = alpha = omega = 1.0
+    residuals = [sqrt(_dot(r.values, r.values))]
+    it = 0
+    while residuals[-1] > tol * bnorm and it < max_iter:
+        rho, prev = _dot(r_hat, r.values), rho
+        if rho == 0 or omega == 0:
+            break
+        beta = rho / prev * alpha / omega
+        p.values[:] = [a + beta * (c - omega * d)
+                       for a, c, d in zip(r.values, p.values, v.values)]
+        if precond is not None:
+            precond.apply(p, p_hat)
+        _product(op, p_hat, v)
+        rv = _dot(r_hat, v.values)
+        if rv == 0:
+            break
+        alpha = rho / rv
+        # s = r - alpha v, kept in r
+        r.values[:] = [fma(-alpha, c, a) for c, a in zip(v.values, r.values)]
+        x.values[:] = [fma(alpha, c, a) for c, a in zip(p_hat.values,
+                                                        x.values)]
+        it += 1
+        norm = sqrt(_dot(r.values, r.values))
+        if norm <= tol * bnorm:
+            residuals.append(norm)
+            break
+        if precond is not None:
+            precond.apply(r, s_hat)
+        _product(op, s_hat, t)
+        tt = _dot(t.values, t.values)
+        omega = _dot(t.values, r.values) / tt if tt else 0.0
+        x.values[:] = [fma(omega, c, a) for c, a in zip(s_hat.values,
+                                                        x.values)]
+        r.values[:] = [fma(-omega, c, a) for c, a in zip(t.values, r.values)]
+        residuals.append(sqrt(_dot(r.values, r.values)))
+    converged = residuals[-1] <= tol * bnorm
+    return x, SolveInfo(converged, it, residuals, perf_counter() - start)
+
+
+# ===========================================================================
+# ========================== Pairwise distances =============================
+# ===========================================================================
+
+PAIRWISE_METRICS = ("euclidean", "euclidean_diff", "manhattan",
+                    "chebyshev", "cosine")
+
+# Rows of Y per tile, and default rows of X per streamed block: a tile
+# of Y is reused by every row of the block while it is still in cache
+PAIRWISE_TILE = 64
+
+
+def _euclidean(x, x_sq, y, y_sq) -> float:
+    # ||x - y||^2 = ||x||^2 + ||y||^2 - 2 x.y, clamped: the cancellation
+    # can leave a tiny negative number for close points
+    d = x_sq + y_sq - 2 * sum(map(mul, x, y))
+    return sqrt(d) if d > 0 else 0.0
+
+
+def _euclidean_diff(x, x_sq, y, y_sq) -> float:
+    # From the differences: no cancellation, for close points far from
+    # the origin
+    return hypot(*map(sub, x, y))
+
+
+def _manhattan(x, x_sq, y, y_sq):
+    return sum(map(abs, map(sub, x, y)))
+
+
+def _chebyshev(x, x_sq, y, y_sq):
+    return max(map(abs, map(sub, x, y)))
+
+
+def _cosine(x, x_norm, y, y_norm) -> float:
+    c = sum(map(mul, x, y)) / (x_norm * y_norm)
+    return -1.0 if c < -1 else 1.0 if c > 1 else c
+
+
+_PAIRWISE_KERNELS = {
+    "euclidean": _euclidean,
+    "euclidean_diff": _euclidean_diff,
+    "manhattan": _manhattan,
+    "chebyshev": _chebyshev,
+    "cosine": _cosine,
+}
+
+
+def _pairwise_norms(rows: List[List[float]], metric: str) -> list:
+    """Per row: squared norm (euclidean), norm (cosine), else None."""
+    if metric == "euclidean":
+        return [sum(map(mul, x, x)) for x in rows]
+    if metric == "cosine":
+        norms = [sqrt(sum(map(mul, x, x))) for x in rows]
+        if 0 in norms:
+            raise ValueError("The cosine of a zero vector is undefined.")
+        return norms
+    return [None] * len(rows)
+
+
+def _pairwise_check(X: Matrix, Y: Matrix, metric: str):
+    if metric not in PAIRWISE_METRICS:
+        raise ValueError(f"Unknown metric: {metric}")
+    if not X.values or not Y.values:
+        raise ValueError("pairwise needs at least one row in X and Y.")
+    if X.shape()[1] != Y.shape()[1]:
+        raise ValueError("X and Y rows must have the same size.")
+    if X.is_complex() or Y.is_complex():
+        raise ValueError("pairwise only supports real vectors.")
+
+
+def _pairwise_setup(X: Matrix, Y: Matrix, metric: str) -> tuple:
+    """Validate the operands: (x rows, x norms, y rows, y norms)."""
+    _pairwise_check(X, Y, metric)
+    x_norms = _pairwise_norms(X.values, metric)
+    y_norms = x_norms if Y is X else _pairwise_norms(Y.values, metric)
+    return X.values, x_norms, Y.values, y_norms
+
+
+def _pairwise_rows(
+    xs: List[List[float]],
+    x_norms: list,
+    ys: List[List[float]],
+    y_norms: list,
+    metric: str,
+) -> List[List[float]]:
+    """Rows of the distance matrix for the rows xs, tile by tile of ys."""
+    kernel = _PAIRWISE_KERNELS[metric]
+    out = [[] for _ in xs]
+    for j in range(0, len(ys), PAIRWISE_TILE):
+        tile = list(zip(ys[j:j + PAIRWISE_TILE],
+                        y_norms[j:j + PAIRWISE_TILE]))
+        for x, xn, row in zip(xs, x_norms, out):
+            row.extend([kernel(x, xn, y, yn) for y, yn in tile])
+    return out
+
+
+def pairwise_blocks(
+    X: Matrix,
+    Y: Matrix = None,
+    metric: str = "euclidean",
+    rows: int = None,
+):
+    """
+    Stream pairwise(X, Y, metric) by blocks of `rows` rows of X
+    (PAIRWISE_TILE by default): yields (start, Matrix of the distances
+    from X rows start, start + 1, ... to every row of Y). Only one
+    block is in memory at a time.
+    """
+    Y = X if Y is None else Y
+    rows = PAIRWISE_TILE if rows is None else rows
+    if rows < 1:
+        raise ValueError("Blocks need at least one row.")
+    if _use_numpy(X):
+        kernels = importlib.import_module("matrix.numpy_backend")
+        _pairwise_check(X, Y, metric)
+        for start in range(0, X.shape()[0], rows):
+            yield start, kernels.pairwise(X, Y, metric, start,
+                                          start + rows)
+        return
+    xs, x_norms, ys, y_norms = _pairwise_setup(X, Y, metric)
+    for start in range(0, len(xs), rows):
+        stop = start + rows
+        yield start, Matrix(_pairwise_rows(xs[start:stop],
+                                           x_norms[start:stop],
+                                           ys, y_norms, metric))
+
+
+def pairwise(
+    X: Matrix,
+    Y: Matrix = None,
+    metric: str = "euclidean",
+) -> Matrix:
+    """
+    Matrix D of the distances between the rows of X and the rows of Y
+    (X itself when Y is None): D[i][j] = metric(X[i], Y[j]).
+
+        "euclidean"       ||x - y||, from ||x||^2 + ||y||^2 - 2 x.y with
+                          the norms computed once per row. The error is
+                          in the square: about sqrt(eps) ||x|| on the
+                          distance
+        "euclidean_diff"  ||x - y|| from the differences: slower, but
+                          accurate for close points far from the origin
+        "manhattan"       ||x - y||_1 (Vector.norm_1)
+        "chebyshev"       ||x - y||_inf (Vector.norm_inf)
+        "cosine"          similarity x.y / (||x|| ||y||), in [-1, 1]
+
+    See pairwise_blocks to stream the rows, and Parallel.pairwise to
+    split them between worker processes.
+    """
+    Y = X if Y is None else Y
+    if _use_numpy(X):
+        kernels = importlib.import_module("matrix.numpy_backend")
+        _pairwise_check(X, Y, metric)
+        return kernels.pairwise(X, Y, metric)
+    return Matrix(_pairwise_rows(*_pairwise_setup(X, Y, metric), metric))
@@ -0,0 +1,11 @@
+"""
+Optional backends for lib.py.
+
+lib.py only imports modules that Python has already loaded at startup,
+so `import lib` stays fast for short scripts that only need Vector.dot.
+Everything heavier (NumPy, threads, processes, sockets, ...) lives in a
+submodule of this package and is imported the first time one of its
+names is used through lib (see lib._LAZY_ATTRS and lib.__getattr__).
+
+Submodules must not be imported by lib at module level.
+"""
@@ -0,0 +1,18 @@
+"""Detection of optional third-party dependencies without importing them."""
+
+from importlib.util import find_spec
+
+_available = {}
+
+
+def module_available(name: str) -> bool:
+    """
+    Return True if `name` can be imported.
+    Only looks the module up on sys.path, it is not imported.
+    """
+    if name not in _available:
+        try:
+            _available[name] = find_spec(name) is not None
+        except (ImportError, ValueError):
+            _available[name] = False
+    return _available[name]
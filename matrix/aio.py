@@ -0,0 +1,177 @@
+"""
+asyncio offloading of long Matrix computations.
+
+A large mul_mat / inverse / determinant called from a coroutine blocks
+the event loop until it returns. Offloader runs them on a pool of worker
+threads instead and gives back an awaitable:
+
+    C = await A.mul_mat_async(B)
+
+Bounded concurrency: at most `max_concurrency` computations are
+submitted at once per event loop, the other callers wait on a semaphore
+(backpressure) instead of piling work up in the executor.
+
+Cancellation: a thread cannot be interrupted, so the kernels call a
+checkpoint between blocks of ASYNC_BLOCK rows (or between pivot columns
+for the eliminations). When the awaiting task is cancelled the next
+checkpoint raises and the worker gives its slot back.
+
+The elimination kernels are O(n^3) with partial pivoting (Bareiss for
+integer matrices), like IncrementalInverse, instead of the cofactor
+expansion of Matrix.determinant.
+"""
+
+import asyncio
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+from lib import (Matrix, _bareiss, _gauss_jordan, _mul_classic, _use_numpy,
+                 fma_for)
+
+# Rows of the result computed between two cancellation checkpoints
+ASYNC_BLOCK = 16
+
+
+class _Cancelled(Exception):
+    """Raised by a checkpoint to stop a cancelled computation."""
+
+
+def _mul_mat(checkpoint: Callable, a: List[list], b: List[list]):
+    mac = fma_for(a, b)
+    out = []
+    for start in range(0, len(a), ASYNC_BLOCK):
+        checkpoint()
+        out.extend(_mul_classic(a[start:start + ASYNC_BLOCK], b, mac))
+    return out
+
+
+def _inverse(checkpoint: Callable, a: List[list]):
+    return _gauss_jordan(a, checkpoint)[0]
+
+
+def _determinant(checkpoint: Callable, a: List[list]):
+    """Forward elimination with partial pivoting, det = product of pivots."""
+    if all(isinstance(x, int) for row in a for x in row):
+        return _bareiss(a, checkpoint)[0]
+    m = [row[:] for row in a]
+    n = len(m)
+    det = 1.0
+    for i in range(n):
+        checkpoint()
+        p = max(range(i, n), key=lambda r: abs(m[r][i]))
+        if m[p][i] == 0:
+            return 0.0
+        if p != i:
+            m[i], m[p] = m[p], m[i]
+            det = -det
+        pivot = m[i]
+        det *= pivot[i]
+        for r in range(i + 1, n):
+            factor = m[r][i] / pivot[i]
+            if factor:
+                m[r] = [x - factor * y for x, y in zip(m[r], pivot)]
+    return det
+
+
+class Offloader:
+    """
+    Runs Matrix computations on `max_workers` threads, at most
+    `max_concurrency` of them at once per event loop (both default to
+    the number of CPUs).
+    """
+
+    def __init__(self, max_workers: int = None, max_concurrency: int = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_concurrency = max_concurrency or self.max_workers
+        if self.max_workers < 1 or self.max_concurrency < 1:
+            raise ValueError("Offloading needs at least one worker.")
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="matrix-aio")
+        # One semaphore per event loop: asyncio primitives are bound to
+        # the loop that first uses them
+        self._limits = weakref.WeakKeyDictionary()
+        self.running = 0
+
+    def shutdown(self):
+        """Stop the worker threads once the submitted work is done."""
+        self._executor.shutdown()
+
+    def _limit(self, loop) -> asyncio.Semaphore:
+        limit = self._limits.get(loop)
+        if limit is None:
+            limit = self._limits[loop] = \
+                asyncio.Semaphore(self.max_concurrency)
+        return limit
+
+    async def run(self, kernel: Callable, *args):
+        """
+        Await kernel(checkpoint, *args) run on a worker thread.
+        checkpoint() raises once the awaiting task has been cancelled,
+        the kernel must let that exception through.
+        """
+        loop = asyncio.get_running_loop()
+        async with self._limit(loop):
+            cancelled = threading.Event()
+
+            def checkpoint():
+                if cancelled.is_set():
+                    raise _Cancelled()
+
+            self.running += 1
+            job = self._executor.submit(kernel, checkpoint, *args)
+            future = asyncio.wrap_future(job, loop=loop)
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                cancelled.set()
+                job.cancel()
+                # Hold the slot until the worker reaches a checkpoint
+                await asyncio.wait([future])
+                if not future.cancelled():
+                    future.exception()
+                raise
+            finally:
+                self.running -= 1
+
+    async def mul_mat(self, a: Matrix, b: Matrix) -> Matrix:
+        if a.shape()[1] != b.shape()[0]:
+            raise ValueError("Dimensions are incompatible for multiplication.")
+        if _use_numpy(a):
+            return await self.run(lambda _, x, y: x.mul_mat(y), a, b)
+        return Matrix(await self.run(_mul_mat, a.values, b.values))
+
+    async def inverse(self, a: Matrix) -> Matrix:
+        if not a.is_square():
+            raise ValueError("Only square matrices have an inverse.")
+        if _use_numpy(a):
+            return await self.run(lambda _, x: x.inverse(), a)
+        return Matrix(await self.run(_inverse, a.values))
+
+    async def determinant(self, a: Matrix):
+        if not a.is_square():
+            raise ValueError("Only square matrices have a determinant.")
+        if _use_numpy(a) and not a.is_integer():
+            return await self.run(lambda _, x: x.determinant(), a)
+        return await self.run(_determinant, a.values)
+
+
+# Default offloader of the Matrix.*_async methods, created on first use
+_offloader = None
+
+
+def get_offloader() -> Offloader:
+    """Return the offloader used by the Matrix.*_async methods."""
+    global _offloader
+    if _offloader is None:
+        _offloader = Offloader()
+    return _offloader
+
+
+def set_offloader(offloader: Offloader):
+    """Replace the default offloader (the previous one is shut down)."""
+    global _offloader
+    if _offloader is not None and _offloader is not offloader:
+        _offloader.shutdown()
+    _offloader = offloader
@@ -0,0 +1,393 @@
+"""
+Distributed mul_mat over TCP for lib.Matrix.
+
+C = A * B is cut into a grid of tiles: tile (i, j) is the product of a
+block of rows of A by a block of columns of B. The tiles are dealt to
+the workers round robin, sent in the binary matrix format below, and
+every worker runs the local Matrix.mul_mat on its tiles.
+
+Every tile carries its own A and B blocks: for n x n operands and t x t
+tiles that is 2 n^3 / t values on the network, n / t times the size of
+the operands. Larger tiles send less and balance the load less well.
+
+    with Cluster.local(workers=4) as cluster:      localhost processes
+        C = cluster.mul_mat(A, B)
+
+    python -m matrix.distributed --port 9000        a worker, any host
+                                 [--backend python|numpy|auto]
+    Cluster([("10.0.0.2", 9000), ("10.0.0.3", 9000)])
+
+Fault tolerance: a worker that cannot be reached, closes the
+connection or does not answer within `timeout` seconds is dropped, and
+its unfinished tiles are dealt again to the remaining workers. Only the
+tile a worker was computing when it failed counts as lost, at most
+`retries` times per tile: the tiles it had not received yet are dealt
+again without penalty.
+
+Binary matrix format (little endian):
+
+    b"MTRX"  typecode (1 byte)  rows (uint32)  cols (uint32)
+    rows * cols values, row by row, as the array module stores them
+
+The typecode is one of lib.DTYPES: typed matrices keep their dtype,
+untyped ones are sent as int64 when every entry is an int (exact, a
+ValueError past the int64 range) and as float64 otherwise.
+
+Messages are framed by their length (uint64, big endian). A request is
+(op, i, j) followed by the A and B tiles, a reply (status, i, j)
+followed by the C tile or an error message.
+"""
+
+import argparse
+import os
+import socket
+import socketserver
+import struct
+import subprocess
+import sys
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from typing import List, Tuple
+import lib
+from lib import DTYPES, Matrix, _int_valued
+
+# Seconds to wait for a reply before the worker is considered lost
+DISTRIBUTED_TIMEOUT = 30.0
+# Times a tile is dealt again after being lost
+DISTRIBUTED_RETRIES = 3
+# Rows of A / columns of B per tile
+DISTRIBUTED_TILE = 64
+
+MAGIC = b"MTRX"
+_HEADER = struct.Struct("<4scII")
+_FRAME = struct.Struct("!Q")
+_MESSAGE = struct.Struct("!BII")
+_DTYPE_OF = {code: dtype for dtype, code in DTYPES.items()}
+
+OP_MUL = 1
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+
+# ============================== Binary format ==============================
+
+
+def pack_matrix(mat: Matrix) -> bytes:
+    """Encode a real Matrix in the binary matrix format."""
+    dtype = mat.dtype
+    if dtype is None:
+        # float64 would round the ints past 2^53
+        dtype = "int64" if _int_valued(mat.values) else "float64"
+    code = DTYPES[dtype]
+    rows, cols = mat.shape()
+    values = array(code)
+    try:
+        for row in mat.values:
+            # Typed rows of the same dtype are copied as raw memory
+            if isinstance(row, list):
+                values.fromlist(row)
+            else:
+                values.extend(row)
+    except TypeError:
+        raise ValueError("The binary format only stores real matrices.") \
+            from None
+    except OverflowError:
+        raise ValueError(f"Values out of the {dtype} range.") from None
+    if sys.byteorder == "big":
+        values.byteswap()
+    return _HEADER.pack(MAGIC, code.encode(), rows, cols) + values.tobytes()
+
+
+def unpack_matrix(data: bytes, offset: int = 0) -> Tuple[Matrix, int]:
+    """
+    Decode the matrix starting at data[offset:]: returns the Matrix
+    (with the dtype it was stored with) and the offset after it.
+    """
+    try:
+        magic, code, rows, cols = _HEADER.unpack_from(data, offset)
+    except struct.error:
+        raise ValueError("Truncated matrix header.") from None
+    code = code.decode("ascii", "replace")
+    if magic != MAGIC or code not in _DTYPE_OF:
+        raise ValueError("Not a binary matrix.")
+    start = offset + _HEADER.size
+    values = array(code)
+    end = start + rows * cols * values.itemsize
+    if end > len(data):
+        raise ValueError("Truncated matrix values.")
+    values.frombytes(data[start:end])
+    if sys.byteorder == "big":
+        values.byteswap()
+    mat = Matrix([values[i * cols:(i + 1) * cols] for i in range(rows)])
+    mat.dtype = _DTYPE_OF[code]
+    return mat, end
+
+
+# ================================ Framing ==================================
+
+
+def _send(sock: socket.socket, payload: bytes):
+    sock.sendall(_FRAME.pack(len(payload)) + payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Connection closed by the peer.")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _recv(sock: socket.socket) -> bytes:
+    (size,) = _FRAME.unpack(_recv_exact(sock, _FRAME.size))
+    return _recv_exact(sock, size)
+
+
+# ================================= Worker ==================================
+
+
+def _compute(request: bytes) -> bytes:
+    """Run one request, return the reply."""
+    op, i, j = _MESSAGE.unpack_from(request)
+    try:
+        if op != OP_MUL:
+            raise ValueError(f"Unknown operation: {op}")
+        a, offset = unpack_matrix(request, _MESSAGE.size)
+        b, _ = unpack_matrix(request, offset)
+        return _MESSAGE.pack(STATUS_OK, i, j) + pack_matrix(a.mul_mat(b))
+    except Exception as e:
+        # Sent back and raised by the coordinator: retrying elsewhere
+        # would fail the same way
+        message = f"{type(e).__name__}: {e}"
+        return _MESSAGE.pack(STATUS_ERROR, i, j) + message.encode()
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                request = _recv(self.request)
+            except ConnectionError:
+                return
+            _send(self.request, _compute(request))
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def serve(host: str = "127.0.0.1", port: int = 0):
+    """
+    Run a worker until interrupted. Prints "<host> <port>" once it
+    listens (port 0 picks a free port).
+    """
+    with _Server((host, port), _Handler) as server:
+        print(*server.server_address[:2], flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+# =============================== Coordinator ===============================
+
+
+class _Worker:
+    """Connection of the coordinator to one worker."""
+
+    def __init__(self, address: Tuple[str, int], timeout: float):
+        self.address = address
+        self.timeout = timeout
+        self.sock = None
+        self.alive = True
+
+    def run(self, tiles: List[tuple]) -> Tuple[dict, list, list]:
+        """
+        Compute the tiles ((i, j), A bytes, B bytes) in order. Returns
+        the C tiles computed and, if the worker fails, the tile it was
+        computing (lost) and those it had not received (unsent).
+        """
+        done = {}
+        for n, (key, a, b) in enumerate(tiles):
+            try:
+                if self.sock is None:
+                    self.sock = socket.create_connection(self.address,
+                                                         self.timeout)
+            except OSError:
+                self.alive = False
+                return done, [], tiles[n:]
+            try:
+                _send(self.sock, _MESSAGE.pack(OP_MUL, *key) + a + b)
+                reply = _recv(self.sock)
+            except OSError:
+                # Includes timeouts and closed connections
+                self.close()
+                self.alive = False
+                return done, tiles[n:n + 1], tiles[n + 1:]
+            status, i, j = _MESSAGE.unpack_from(reply)
+            if status != STATUS_OK:
+                raise ValueError("Worker error: "
+                                 + reply[_MESSAGE.size:].decode())
+            done[i, j] = unpack_matrix(reply, _MESSAGE.size)[0]
+        return done, [], []
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+class Cluster:
+    """
+    Coordinator of a set of workers, given as (host, port) addresses.
+
+        with Cluster(addresses) as cluster:
+            C = cluster.mul_mat(A, B)
+
+    Cluster.local(n) starts n workers as subprocesses of this machine
+    and stops them on close().
+    """
+
+    def __init__(
+        self,
+        addresses: List[Tuple[str, int]],
+        timeout: float = None,
+        retries: int = None,
+    ):
+        if not addresses:
+            raise ValueError("At least one worker is needed.")
+        timeout = DISTRIBUTED_TIMEOUT if timeout is None else timeout
+        self.retries = DISTRIBUTED_RETRIES if retries is None else retries
+        self.workers = [_Worker(tuple(a), timeout) for a in addresses]
+        self.processes = []
+
+    @classmethod
+    def local(
+        cls,
+        workers: int = 2,
+        backend: str = "auto",
+        **kwargs,
+    ) -> "Cluster":
+        """
+        Start `workers` worker processes on localhost, computing with
+        `backend` (see lib.set_backend).
+        """
+        if workers < 1:
+            raise ValueError("At least one worker is needed.")
+        lib._check_backend(backend)
+        root = os.path.dirname(os.path.abspath(lib.__file__))
+        command = [sys.executable, "-m", "matrix.distributed",
+                   "--backend", backend]
+        processes, addresses = [], []
+        try:
+            for _ in range(workers):
+                proc = subprocess.Popen(command, cwd=root,
+                                        stdout=subprocess.PIPE, text=True)
+                processes.append(proc)
+            for proc in processes:
+                line = proc.stdout.readline().split()
+                if len(line) != 2:
+                    raise ConnectionError("A worker failed to start.")
+                addresses.append((line[0], int(line[1])))
+        except BaseException:
+            _stop(processes)
+            raise
+        cluster = cls(addresses, **kwargs)
+        cluster.processes = processes
+        return cluster
+
+    def alive(self) -> int:
+        """Number of workers still in use."""
+        return sum(w.alive for w in self.workers)
+
+    def close(self):
+        """Close the connections and stop the local workers."""
+        for worker in self.workers:
+            worker.close()
+        _stop(self.processes)
+        self.processes = []
+
+    def __enter__(self) -> "Cluster":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def mul_mat(self, a: Matrix, b: Matrix, tile: int = None) -> Matrix:
+        """
+        A * B computed by the workers, by tiles of `tile` rows of A and
+        columns of B (DISTRIBUTED_TILE by default). The result has the
+        dtype of the operands (lib.result_dtype).
+        """
+        rows, inner = a.shape()
+        if inner != b.shape()[0]:
+            raise ValueError("Dimensions are incompatible for multiplication.")
+        cols = b.shape()[1]
+        tile = DISTRIBUTED_TILE if tile is None else tile
+        if tile < 1:
+            raise ValueError("Tiles need at least one row.")
+        # Each block of A rows / B columns is encoded once
+        a_blocks = [pack_matrix(Matrix(a.values[i:i + tile], dtype=a.dtype))
+                    for i in range(0, rows, tile)]
+        b_blocks = [pack_matrix(Matrix([row[j:j + tile] for row in b.values],
+                                       dtype=b.dtype))
+                    for j in range(0, cols, tile)]
+        pending = [((i, j), a_blocks[i], b_blocks[j])
+                   for i in range(len(a_blocks))
+                   for j in range(len(b_blocks))]
+        results = {}
+        lost = {}
+        while pending:
+            live = [w for w in self.workers if w.alive]
+            if not live:
+                raise ConnectionError("No worker left to compute the tiles.")
+            # Round robin: consecutive tiles go to different workers
+            batches = [pending[k::len(live)] for k in range(len(live))]
+            with ThreadPoolExecutor(len(live)) as executor:
+                runs = list(executor.map(_Worker.run, live, batches))
+            pending = []
+            for done, failed, unsent in runs:
+                results.update(done)
+                for task in failed:
+                    lost[task[0]] = lost.get(task[0], 0) + 1
+                    if lost[task[0]] > self.retries:
+                        raise ConnectionError(
+                            f"Tile {task[0]} was lost {lost[task[0]]} "
+                            f"times.")
+                pending.extend(failed)
+                pending.extend(unsent)
+        values = []
+        for i in range(len(a_blocks)):
+            tiles = [results[i, j].values for j in range(len(b_blocks))]
+            for parts in zip(*tiles):
+                values.append(list(chain.from_iterable(parts)))
+        return Matrix(values, a.backend,
+                      lib.result_dtype(a.dtype, b.dtype))
+
+
+def _stop(processes: List[subprocess.Popen]):
+    for proc in processes:
+        proc.terminate()
+    for proc in processes:
+        proc.wait()
+        proc.stdout.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Worker of the distributed Matrix.mul_mat.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--backend", default="auto", choices=lib.BACKENDS)
+    args = parser.parse_args()
+    lib.set_backend(args.backend)
+    serve(args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+NumPy kernels for lib.Vector and lib.Matrix.
+
+Every function has the name and signature of the method it replaces
+and is called by lib._dispatch when an object uses the NumPy backend.
+The .values (lists or typed arrays) stay the reference data: the
+ndarray is built from them on first use, kept on the object until it is
+mutated, and the results are returned as regular Vector / Matrix objects.
+"""
+
+import numpy as np
+import lib
+from lib import Matrix, SymmetricMatrix, Vector
+
+
+def _check_summation(summation: str):
+    if summation is not None:
+        lib._check_summation(summation)
+
+
+def as_array(obj) -> np.ndarray:
+    """Return the cached ndarray of a Vector or Matrix, building it once."""
+    if obj._array is None:
+        # Typed values (array module) are read without conversion
+        arr = np.asarray(obj.values)
+        # ints (and Python ints too big for int64) are computed as floats
+        # and float32 is accumulated in float64, like the pure-Python
+        # kernels do
+        if arr.dtype == np.float32:
+            arr = arr.astype(np.float64)
+        elif arr.dtype.kind not in "fc":
+            arr = arr.astype(np.complex128 if obj.dtype is None
+                             and obj.is_complex() else np.float64)
+        obj._array = arr
+    return obj._array
+
+
+def _scalar(value):
+    """Convert a NumPy scalar to the matching Python number."""
+    return value.item()
+
+
+def _vector(arr: np.ndarray, backend: str) -> Vector:
+    vec = Vector(arr.tolist(), backend)
+    vec._array = arr
+    return vec
+
+
+def _matrix(arr: np.ndarray, backend: str) -> Matrix:
+    mat = Matrix(arr.tolist(), backend)
+    mat._array = arr
+    return mat
+
+
+# ============================== Vector =====================================
+
+
+# NumPy sums with BLAS (dot, mul_vec, mul_mat) or pairwise summation
+# (norm): the summation argument is only validated.
+
+
+def dot(u: Vector, v: Vector, summation: str = None):
+    _check_summation(summation)
+    if u.size() != v.size():
+        raise AssertionError("Vectors must have the same size.")
+    # vdot conjugates its first argument: Hermitian product
+    return _scalar(np.vdot(as_array(u), as_array(v)))
+
+
+def norm_1(u: Vector) -> float:
+    return _scalar(np.abs(as_array(u)).sum())
+
+
+def norm(u: Vector, summation: str = None) -> float:
+    _check_summation(summation)
+    return _scalar(np.linalg.norm(as_array(u)))
+
+
+def norm_inf(u: Vector) -> float:
+    return _scalar(np.abs(as_array(u)).max())
+
+
+# ============================== Matrix =====================================
+
+
+def mul_vec(m: Matrix, vec: Vector, out: Vector = None,
+            summation: str = None) -> Vector:
+    _check_summation(summation)
+    if vec.size() != m.shape()[1]:
+        raise ValueError("Vector size must match the matrix column size.")
+    arr = as_array(m) @ as_array(vec)
+    if out is None:
+        return _vector(arr, m.backend)
+    if out.size() != m.shape()[0] or out is vec:
+        raise ValueError("Output vector must not alias the input and "
+                         "must match the matrix row count.")
+    if out.dtype is None:
+        out.values[:] = arr.tolist()
+        out._array = arr
+    else:
+        # Rounded to the dtype of out: the float64 result is not cached
+        out.values[:] = lib._to_array(arr.tolist(), out.dtype)
+        out._array = None
+    return out
+
+
+def mul_mat(m: Matrix, mat: Matrix, mode: str = "classic",
+            cutoff: int = None, summation: str = None) -> Matrix:
+    # BLAS picks its own blocking: mode and cutoff are only validated
+    _check_summation(summation)
+    if m.shape()[1] != mat.shape()[0]:
+        raise ValueError("Dimensions are incompatible for multiplication.")
+    if mode not in ("classic", "strassen"):
+        raise ValueError(f"Unknown multiplication mode: {mode}")
+    return _matrix(as_array(m) @ as_array(mat), m.backend)
+
+
+def transpose(m: Matrix) -> Matrix:
+    return _matrix(np.ascontiguousarray(as_array(m).T), m.backend)
+
+
+def determinant(m: Matrix):
+    if not m.is_square():
+        raise ValueError("Determinant is only available for squared matrices")
+    # LU factorisation: O(n^3) instead of the O(n!) cofactor expansion
+    return _scalar(np.linalg.det(as_array(m)))
+
+
+def inverse(m: Matrix) -> Matrix:
+    arr = as_array(m)
+    try:
+        inv = np.linalg.inv(arr)
+    except np.linalg.LinAlgError:
+        raise ValueError("Matrix cannot be inverted (singular).")
+    if np.array_equal(arr, arr.T):
+        # LU rounds the two triangles differently: mirror the upper one,
+        # the inverse of a symmetric matrix is symmetric (as on the
+        # Cholesky path of Matrix.inverse)
+        inv = np.triu(inv) + np.triu(inv, 1).T
+    return _matrix(inv, m.backend)
+
+
+def rank(m: Matrix, tol: float = None) -> int:
+    arr = as_array(m)
+    if arr.size == 0:
+        return 0
+    if tol is None:
+        # SVD based: singular values below a tolerance count as zero
+        return int(np.linalg.matrix_rank(arr))
+    # Same relative tolerance as Matrix.rank_revealing
+    s = np.linalg.svd(arr, compute_uv=False)
+    return int((s > tol * s[0]).sum())
+
+
+def cholesky(m: Matrix, block: int = None) -> Matrix:
+    # LAPACK picks its own blocking: block is ignored
+    if m.is_complex():
+        raise ValueError("Cholesky is only available for real matrices.")
+    if not m.is_symmetric():
+        raise ValueError("Matrix is not symmetric.")
+    try:
+        return _matrix(np.linalg.cholesky(as_array(m)), m.backend)
+    except np.linalg.LinAlgError:
+        raise ValueError("Matrix is not positive definite.") from None
+
+
+def solve(m: Matrix, b: Vector, spd: bool = None) -> Vector:
+    if not m.is_square():
+        raise ValueError("Only square systems can be solved.")
+    if b.size() != m.shape()[0]:
+        raise ValueError("Vector size must match the matrix row size.")
+    if spd:
+        cholesky(m)
+    try:
+        return _vector(np.linalg.solve(as_array(m), as_array(b)), m.backend)
+    except np.linalg.LinAlgError:
+        raise ValueError("Matrix is singular.") from None
+
+
+def gram(m: Matrix, rows: bool = False) -> SymmetricMatrix:
+    arr = as_array(m)
+    g = arr @ arr.T if rows else arr.T @ arr
+    return SymmetricMatrix(len(g), g[np.triu_indices(len(g))].tolist())
+
+
+# ============================== Functions ==================================
+
+
+def pairwise(x: Matrix, y: Matrix, metric: str, start: int = 0,
+             stop: int = None) -> Matrix:
+    """Rows start:stop of lib.pairwise(x, y, metric)."""
+    a = as_array(x)[start:stop]
+    b = as_array(y)
+    if metric in ("euclidean_diff", "manhattan", "chebyshev"):
+        # Row by row: a[:, None] - b would take len(a) * len(b) * n floats
+        reduce = {"euclidean_diff": np.linalg.norm, "manhattan": np.sum,
+                  "chebyshev": np.max}[metric]
+        d = np.empty((len(a), len(b)))
+        for i, row in enumerate(a):
+            d[i] = reduce(np.abs(b - row), axis=1)
+        return _matrix(d, x.backend)
+    d = a @ b.T
+    if metric == "euclidean":
+        d *= -2
+        d += np.einsum("ij,ij->i", a, a)[:, None]
+        d += np.einsum("ij,ij->i", b, b)
+        np.maximum(d, 0, out=d)
+        np.sqrt(d, out=d)
+    else:
+        na = np.linalg.norm(a, axis=1)
+        nb = np.linalg.norm(b, axis=1)
+        if not (na.all() and nb.all()):
+            raise ValueError("The cosine of a zero vector is undefined.")
+        d /= na[:, None]
+        d /= nb
+        np.clip(d, -1, 1, out=d)
+    return _matrix(d, x.backend)
@@ -0,0 +1,250 @@
+"""
+Parallel kernels for lib.Vector and lib.Matrix.
+
+The work is split into contiguous ranges of rows (or of vectors, or of
+elements), one task per worker. The executor is picked at runtime:
+
+    threads     when the GIL is disabled (free-threaded build, 3.13t):
+                the workers share the values (a range is a slice of
+                references, the numbers are not copied)
+    processes   when the GIL is enabled: pure-Python threads would run
+                one at a time, so the ranges are sent (pickled) to
+                worker processes instead
+
+Objects on the NumPy backend run the NumPy kernel directly, BLAS
+already uses every core.
+"""
+
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Tuple
+import lib
+from lib import (Matrix, Vector, _mul_classic, _pairwise_rows,
+                 _pairwise_setup, _store, _to_array, _use_numpy, fma_for,
+                 result_dtype)
+
+KINDS = ("auto", "threads", "processes")
+
+
+def gil_enabled() -> bool:
+    """Return False on a free-threaded interpreter running without GIL."""
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return True if is_gil_enabled is None else is_gil_enabled()
+
+
+def _ranges(n: int, parts: int) -> List[Tuple[int, int]]:
+    """Split range(n) into at most `parts` contiguous (start, stop)."""
+    parts = max(1, min(parts, n))
+    step, extra = divmod(n, parts)
+    ranges = []
+    start = 0
+    for i in range(parts):
+        stop = start + step + (i < extra)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+# Tasks run by the workers. They are module-level functions so that
+# worker processes can unpickle them.
+
+def _mul_rows(rows, b):
+    return _mul_classic(rows, b, fma_for(rows, b))
+
+
+def _mul_vectors(vectors, a):
+    mac = fma_for(a, vectors)
+    out = []
+    for x in vectors:
+        res = []
+        for row in a:
+            acc = 0.0
+            for y, z in zip(row, x):
+                acc = mac(y, z, acc)
+            res.append(acc)
+        out.append(res)
+    return out
+
+
+def _add(a, b):
+    return [x + y for x, y in zip(a, b)]
+
+
+def _sub(a, b):
+    return [x - y for x, y in zip(a, b)]
+
+
+def _scl(a, scalar):
+    return [x * scalar for x in a]
+
+
+def _add_rows(a, b):
+    return [_add(ra, rb) for ra, rb in zip(a, b)]
+
+
+def _sub_rows(a, b):
+    return [_sub(ra, rb) for ra, rb in zip(a, b)]
+
+
+def _scl_rows(a, scalar):
+    return [_scl(row, scalar) for row in a]
+
+
+class Parallel:
+    """
+    Pool of workers running Vector / Matrix kernels.
+
+        with lib.Parallel(workers=4) as par:
+            C = par.mul_mat(A, B)
+
+    kind="auto" picks threads when the GIL is disabled and processes
+    otherwise; "threads" and "processes" force one of them. The pool is
+    started once and reused by every call until close().
+    """
+
+    def __init__(self, workers: int = None, kind: str = "auto"):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown executor kind: {kind}")
+        if kind == "auto":
+            kind = "processes" if gil_enabled() else "threads"
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 1
+        if self.workers < 1:
+            raise ValueError("At least one worker is needed.")
+        executor = ThreadPoolExecutor if kind == "threads" \
+            else ProcessPoolExecutor
+        self._executor = executor(max_workers=self.workers)
+
+    def close(self):
+        """Stop the workers."""
+        self._executor.shutdown()
+
+    def __enter__(self) -> "Parallel":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self, task, split: tuple, *args) -> list:
+        """
+        Run task(*slices, *args) for every range of the sequences in
+        `split` (all of the same length), in parallel, and concatenate
+        the results in order. A single range runs in the calling thread.
+        """
+        ranges = _ranges(len(split[0]), self.workers)
+        if len(ranges) == 1:
+            return task(*split, *args)
+        futures = [
+            self._executor.submit(
+                task, *(seq[start:stop] for seq in split), *args)
+            for start, stop in ranges
+        ]
+        out = []
+        for future in futures:
+            out.extend(future.result())
+        return out
+
+    def mul_mat(self, a: Matrix, b: Matrix) -> Matrix:
+        """A * B, the rows of A split between the workers."""
+        if a.shape()[1] != b.shape()[0]:
+            raise ValueError("Dimensions are incompatible for multiplication.")
+        if _use_numpy(a):
+            return a.mul_mat(b)
+        res = Matrix(self._run(_mul_rows, (a.values,), b.values))
+        # Same result dtype as Matrix.mul_mat
+        _store(res, result_dtype(a.dtype, b.dtype))
+        return res
+
+    def mul_vec(self, a: Matrix, vectors: List[Vector]) -> List[Vector]:
+        """A * x for every vector x, the vectors split between the workers."""
+        if any(x.size() != a.shape()[1] for x in vectors):
+            raise ValueError("Vector size must match the matrix column size.")
+        if _use_numpy(a):
+            return [a.mul_vec(x) for x in vectors]
+        values = self._run(_mul_vectors, ([x.values for x in vectors],),
+                           a.values)
+        out = []
+        for x, v in zip(vectors, values):
+            res = Vector(v)
+            _store(res, result_dtype(a.dtype, x.dtype))
+            out.append(res)
+        return out
+
+    def pairwise(self, x: Matrix, y: Matrix = None,
+                 metric: str = "euclidean") -> Matrix:
+        """lib.pairwise(x, y, metric), the rows of x split between workers."""
+        y = x if y is None else y
+        if _use_numpy(x):
+            return lib.pairwise(x, y, metric)
+        xs, x_norms, ys, y_norms = _pairwise_setup(x, y, metric)
+        return Matrix(self._run(_pairwise_rows, (xs, x_norms),
+                                ys, y_norms, metric))
+
+    def pairwise_blocks(self, x: Matrix, y: Matrix = None,
+                        metric: str = "euclidean", rows: int = None):
+        """
+        lib.pairwise_blocks(x, y, metric, rows) computed by the workers,
+        yielded in order. At most two blocks per worker are in flight, so
+        memory stays bounded however many rows x has.
+        """
+        y = x if y is None else y
+        rows = lib.PAIRWISE_TILE if rows is None else rows
+        if _use_numpy(x) or rows < 1:
+            yield from lib.pairwise_blocks(x, y, metric, rows)
+            return
+        xs, x_norms, ys, y_norms = _pairwise_setup(x, y, metric)
+        pending = deque()
+        for start in range(0, len(xs), rows):
+            stop = start + rows
+            pending.append((start, self._executor.submit(
+                _pairwise_rows, xs[start:stop], x_norms[start:stop],
+                ys, y_norms, metric)))
+            if len(pending) >= 2 * self.workers:
+                start, future = pending.popleft()
+                yield start, Matrix(future.result())
+        while pending:
+            start, future = pending.popleft()
+            yield start, Matrix(future.result())
+
+    def _elementwise(self, obj, value_task, row_task, split, *args):
+        """
+        Run an elementwise task over obj and `split`, in place. Typed
+        objects keep their dtype, as with Vector.add / Matrix.add.
+        """
+        if isinstance(obj, Vector):
+            values = self._run(value_task, (obj.values, *split), *args)
+            if obj.dtype is not None:
+                values = _to_array(values, obj.dtype)
+            obj.values = values
+            obj._array = None
+            return obj
+        rows = self._run(row_task, (obj.values, *split), *args)
+        # Same in-place semantics as Matrix.add: the row objects are kept
+        obj._assign(rows)
+        obj._changed()
+        return obj
+
+    def add(self, obj, other):
+        """obj.add(other) on a Vector or Matrix, split between workers."""
+        _check_shapes(obj, other)
+        return self._elementwise(obj, _add, _add_rows, (other.values,))
+
+    def sub(self, obj, other):
+        """obj.sub(other) on a Vector or Matrix, split between workers."""
+        _check_shapes(obj, other)
+        return self._elementwise(obj, _sub, _sub_rows, (other.values,))
+
+    def scl(self, obj, scalar):
+        """obj.scl(scalar) on a Vector or Matrix, split between workers."""
+        return self._elementwise(obj, _scl, _scl_rows, (), scalar)
+
+
+def _check_shapes(obj, other):
+    if type(obj) is not type(other):
+        raise ValueError("Operands must both be vectors or matrices.")
+    same = obj.size() == other.size() if isinstance(obj, Vector) \
+        else obj.shape() == other.shape()
+    if not same:
+        raise ValueError("Operands must have the same shape.")